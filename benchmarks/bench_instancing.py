@@ -0,0 +1,64 @@
+# benchmarks/bench_instancing.py
+# Draws many copies of one synthetic mesh offscreen, once as a single instanced call per mesh and once with a draw call
+# per copy, and prints the frame time and draw calls of both.
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import offscreen
+from mesh_builder import load_mesh
+from scene import mesh_key
+from bench_suite import DATA_DIR
+from synthetic_meshes import synthetic_obj
+
+COPIES = (1, 10, 100, 1000)
+
+
+def frame_ms(widget, frames):
+    widget.draw()  # Warm-up; also uploads the instance transforms
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        widget.draw()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Instanced against per-copy drawing of scene copies.')
+    parser.add_argument('--faces', type=int, default=1000, help='approximate face count of the copied mesh')
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    file_path = synthetic_obj(DATA_DIR, 'sphere', args.faces, 'tri')
+    mesh = load_mesh(file_path)
+    key = mesh_key(file_path)
+    widget = offscreen.OffscreenWidget(640, 480)
+    if widget.instanced_program is None:
+        print('Instanced rendering is unavailable in this context')
+        return 1
+    print(f'{widget.renderer_name}, {len(mesh.indices) // 3} triangles per copy')
+    for copies in COPIES:
+        widget.clear_scene()
+        widget.add_scene_mesh(key, file_path, mesh, copies)
+        instanced = frame_ms(widget, args.frames)
+        instanced_calls = widget.scene_stats[1]
+        program, widget.instanced_program = widget.instanced_program, None
+        each = frame_ms(widget, args.frames)
+        each_calls = widget.scene_stats[1]
+        widget.instanced_program = program
+        print(f'{copies:5d} copies: instanced {instanced:8.2f} ms in {instanced_calls} call, '
+              f'one by one {each:8.2f} ms in {each_calls} calls')
+    widget.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
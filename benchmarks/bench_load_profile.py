@@ -0,0 +1,61 @@
+# benchmarks/bench_load_profile.py
+# Loads a synthetic mesh without profiling, with timing only and with memory tracing, to show what load_profile costs,
+# and prints the per-stage profile. --trace saves it as a Chrome trace (.json) or JSON lines (.jsonl).
+
+import argparse
+import os
+import sys
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import load_profile
+from load_profile import LoadProfile
+from mesh_builder import load_mesh
+from bench_suite import DATA_DIR
+from synthetic_meshes import synthetic_obj
+
+
+def timed_load(file_path, profile):
+    start = time.perf_counter()
+    with load_profile.activate(profile):
+        load_mesh(file_path, profile)
+    elapsed = time.perf_counter() - start
+    if profile is not None:
+        profile.finish()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Overhead and output of load profiling.')
+    parser.add_argument('--faces', type=int, default=100000, help='approximate face count of the synthetic scan')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--trace', help='write the memory-traced profile here')
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    file_path = synthetic_obj(DATA_DIR, 'scan', args.faces, 'mix')
+    # What every instrumented call site costs while no profile is active
+    idle_ns = min(timeit.repeat(lambda: load_profile.count(faces=1), number=100000, repeat=3)) / 100000 * 1e9
+    print(f'count() with profiling off: {idle_ns:.0f} ns per call')
+
+    baseline = min(timed_load(file_path, None) for _ in range(args.repeat))
+    timing = min(timed_load(file_path, LoadProfile(file_path, trace_memory=False)) for _ in range(args.repeat))
+    profile = LoadProfile(file_path)
+    traced = timed_load(file_path, profile)
+    print(f'load: {baseline * 1000:.1f} ms off, {timing * 1000:.1f} ms timing only '
+          f'({timing / baseline - 1:+.1%}), {traced * 1000:.1f} ms with memory ({traced / baseline - 1:+.1%})')
+
+    for name, seconds, allocated, counts in profile.summary():
+        counted = ', '.join(f'{value} {key}' for key, value in counts.items())
+        print(f'  {name:20s} {seconds * 1000:9.1f} ms {allocated / (1024 * 1024):8.1f} MB  {counted}')
+    if args.trace:
+        profile.save(args.trace)
+        print(f'Wrote {args.trace}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# benchmarks/bench_obj_parser.py
+# Measures OBJ parsing throughput on objs/gun.obj scaled up synthetically and checks it against a target in MB/s.
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obj_parser import parse_obj_bytes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_OBJ = os.path.join(ROOT, 'objs', 'gun.obj')
+TARGET_MB_PER_S = 30.0
+
+
+def scale_obj(text, copies):
+    # Repeat the mesh `copies` times, offsetting face indices so every copy references its own records
+    records = [line for line in text.splitlines() if line[:2] in ('v ', 'vn', 'vt', 'f ')]
+    data_lines = [line for line in records if not line.startswith('f ')]
+    face_lines = [line.split()[1:] for line in records if line.startswith('f ')]
+    counts = [sum(1 for line in data_lines if line.startswith(prefix)) for prefix in ('v ', 'vt', 'vn')]
+
+    chunks = []
+    for copy in range(copies):
+        offsets = [count * copy for count in counts]
+        chunks.append('\n'.join(data_lines))
+        for corners in face_lines:
+            formatted = []
+            for corner in corners:
+                fields = corner.split('/')
+                formatted.append('/'.join(str(int(value) + offsets[i]) if value else ''
+                                          for i, value in enumerate(fields)))
+            chunks.append('f ' + ' '.join(formatted))
+    return ('\n'.join(chunks) + '\n').encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--copies', type=int, default=64, help='number of copies of gun.obj to concatenate')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is reported')
+    parser.add_argument('--target', type=float, default=TARGET_MB_PER_S, help='minimum acceptable MB/s')
+    args = parser.parse_args()
+
+    with open(SOURCE_OBJ, 'r') as file:
+        data = scale_obj(file.read(), args.copies)
+    size_mb = len(data) / (1024 * 1024)
+
+    best = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        obj = parse_obj_bytes(data)
+        best = min(best, time.perf_counter() - start)
+
+    throughput = size_mb / best
+    print(f"{size_mb:.1f} MB, {len(obj.positions)} verts, {obj.face_count} faces: "
+          f"{best * 1000:.1f} ms, {throughput:.1f} MB/s (target {args.target:.1f} MB/s)")
+    return 0 if throughput >= args.target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+# benchmarks/bench_parallel_parse.py
+# Parses one OBJ file with obj_parser and then with obj_parallel on 2, 4, ... worker processes, checking the results match
+# and reporting the speedup for each worker count.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from obj_parser import parse_obj
+from obj_parallel import OBJ_FIELDS, parse_obj_parallel
+from inspect_models import worker_counts
+from bench_streaming import write_grid_obj
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(file_path, max_workers):
+    megabyte = 1024 * 1024
+    size = os.path.getsize(file_path) / megabyte
+    reference, baseline = timed(parse_obj, file_path)
+    print(f"{file_path}: {size:.0f} MB")
+    print(f"   1 worker : {baseline:6.2f} s  {size / baseline:6.0f} MB/s  (parse_obj)")
+    for workers in worker_counts(max_workers)[1:]:
+        obj, elapsed = timed(parse_obj_parallel, file_path, workers)
+        if not all(np.array_equal(getattr(obj, field), getattr(reference, field)) for field in OBJ_FIELDS):
+            print(f"{workers:4d} workers: result differs from parse_obj")
+            return 1
+        print(f"{workers:4d} workers: {elapsed:6.2f} s  {size / elapsed:6.0f} MB/s  ({baseline / elapsed:.2f}x)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure parallel OBJ parsing speedup against worker count.')
+    parser.add_argument('path', nargs='?', help='OBJ file to parse (default: a synthetic quad grid)')
+    parser.add_argument('--faces', type=int, default=2000000, help='quad count of the synthetic file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='largest worker count to try')
+    args = parser.parse_args()
+    if args.workers < 2:
+        print('Only one core available; pass --workers to try more processes anyway')
+
+    if args.path:
+        return run(args.path, max(2, args.workers))
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'grid.obj')
+        write_grid_obj(file_path, args.faces, False)
+        return run(file_path, max(2, args.workers))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# benchmarks/bench_startup.py
+# Checks startup against the budgets in startup.py: the import time of main.py from -X importtime, and the time from process
+# start to the first frame showing a cached synthetic scan, from the viewer's own startup timer. Needs a display with OpenGL
+# for the second part.
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from startup import FIRST_FRAME_BUDGET_MS, FIRST_FRAME_FACES, IMPORT_BUDGET_MS
+from bench_suite import DATA_DIR
+from synthetic_meshes import synthetic_obj
+
+SLOWEST_IMPORTS = 8
+LAUNCH_TIMEOUT = 120
+
+
+def import_times():
+    # {module: cumulative ms} of main.py and everything it imports directly, from one fresh interpreter
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT,
+                            capture_output=True, text=True, env=dict(os.environ, QT_QPA_PLATFORM='offscreen'))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    # A module's imports are listed before it, indented one level deeper
+    children = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$', line)
+        if match is None:
+            continue
+        depth, name, ms = len(match.group(2)) // 2, match.group(3), int(match.group(1)) / 1000.0
+        if depth == 1:
+            children[name] = ms
+        elif depth == 0:
+            if name == 'main':
+                return dict(children, main=ms)
+            children = {}
+    raise RuntimeError('main was not imported')
+
+
+def launch(file_path, cache_dir):
+    # (startup stages in ms, wall-clock ms) of one viewer run that quits after drawing the model
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, 'main.py', file_path, '--startup-timing', '--quit-after-first-frame'],
+                            cwd=ROOT, capture_output=True, text=True, timeout=LAUNCH_TIMEOUT,
+                            env=dict(os.environ, MESH_INSPECTOR_CACHE_DIR=cache_dir))
+    wall = (time.perf_counter() - start) * 1000.0
+    line = next((line for line in result.stderr.splitlines() if line.startswith('Startup: ')), '')
+    stages = {stage: float(ms) for stage, ms in re.findall(r'([a-zA-Z][a-zA-Z ]*?) (\d+) ms', line[len('Startup: '):])}
+    return stages, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check import time and time to first frame against their budgets.')
+    parser.add_argument('--runs', type=int, default=5, help='best of this many runs is compared')
+    parser.add_argument('--faces', type=int, default=FIRST_FRAME_FACES)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS, help='in ms')
+    parser.add_argument('--frame-budget', type=float, default=FIRST_FRAME_BUDGET_MS, help='in ms')
+    parser.add_argument('--imports-only', action='store_true', help='skip launching the viewer')
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(max(args.runs, 1))]
+    best = min(runs, key=lambda times: times['main'])
+    print(f"import main: {best['main']:.0f} ms (budget {args.import_budget:.0f} ms), slowest direct imports:")
+    for name, ms in sorted(best.items(), key=lambda item: item[1], reverse=True)[1:SLOWEST_IMPORTS + 1]:
+        print(f'  {name:24} {ms:8.1f} ms')
+    passed = best['main'] <= args.import_budget
+    if args.imports_only:
+        return 0 if passed else 1
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    file_path = synthetic_obj(DATA_DIR, 'scan', args.faces, 'tri')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold, cold_wall = launch(file_path, cache_dir)  # Parses the file and fills the cache
+        if 'first frame' not in cold:
+            print('The viewer did not draw a frame; it needs a display with OpenGL')
+            return 1
+        print(f"cold cache: first frame {cold['first frame']:.0f} ms, {cold_wall:.0f} ms wall")
+        warm = [launch(file_path, cache_dir) for _ in range(max(args.runs, 1))]
+    stages, wall = min(warm, key=lambda run: run[0].get('first frame', float('inf')))
+    print(f"warm cache: {', '.join(f'{stage} {ms:.0f} ms' for stage, ms in stages.items())}; {wall:.0f} ms wall "
+          f"(budget {args.frame_budget:.0f} ms to the first frame)")
+    passed = passed and stages.get('first frame', float('inf')) <= args.frame_budget
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
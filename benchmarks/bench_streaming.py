@@ -0,0 +1,76 @@
+# benchmarks/bench_streaming.py
+# Streams a synthetic OBJ file much larger than the memory budget through obj_stream and checks, with tracemalloc, that
+# everything beyond the vertex tables stays inside the budget.
+
+import argparse
+import collections
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from obj_stream import BLOCKS_IN_FLIGHT, scan_obj, triangle_blocks
+
+
+def write_grid_obj(file_path, face_count, with_normals):
+    # A wavy grid of quads written in row bands, so writing it does not need the whole file in memory
+    side = max(1, int(math.sqrt(face_count)))
+    with open(file_path, 'w') as file:
+        for y in range(side + 1):
+            xs = np.arange(side + 1, dtype=np.float64)
+            rows = np.column_stack([xs, np.full_like(xs, y), np.sin(xs * 0.1) * np.cos(y * 0.1)])
+            np.savetxt(file, rows, fmt='v %.5f %.5f %.5f')
+            if with_normals:
+                np.savetxt(file, np.tile([0.0, 0.0, 1.0], (side + 1, 1)), fmt='vn %.1f %.1f %.1f')
+        for y in range(side):
+            first = y * (side + 1) + np.arange(side) + 1
+            corners = np.column_stack([first, first + 1, first + side + 2, first + side + 1])
+            if with_normals:
+                np.savetxt(file, np.repeat(corners, 2, axis=1), fmt='f %d//%d %d//%d %d//%d %d//%d')
+            else:
+                np.savetxt(file, corners, fmt='f %d %d %d %d')
+    return side * side
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the streaming loader stays inside its memory budget.')
+    parser.add_argument('--faces', type=int, default=1000000, help='approximate quad count of the synthetic file')
+    parser.add_argument('--budget', type=float, default=16, help='memory budget in MB')
+    parser.add_argument('--normals', action='store_true', help='write vn records instead of generating normals')
+    args = parser.parse_args()
+    budget = int(args.budget * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'grid.obj')
+        faces = write_grid_obj(file_path, args.faces, args.normals)
+        file_size = os.path.getsize(file_path)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        scan = scan_obj(file_path, budget)
+        # Hold the last few blocks, as the GUI does while they wait for upload
+        in_flight = collections.deque(maxlen=BLOCKS_IN_FLIGHT)
+        triangles = 0
+        for block in triangle_blocks(scan):
+            in_flight.append(block)
+            triangles += len(block) // 3
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    megabyte = 1024 * 1024
+    working = peak - scan.table_bytes
+    print(f"{faces} faces, {file_size / megabyte:.0f} MB file, {triangles} triangles: {elapsed:.2f} s, "
+          f"{file_size / megabyte / elapsed:.0f} MB/s")
+    print(f"peak {peak / megabyte:.1f} MB = vertex tables {scan.table_bytes / megabyte:.1f} MB + "
+          f"{working / megabyte:.1f} MB working (budget {budget / megabyte:.0f} MB, block {scan.block_size // 1024} KB)")
+    return 0 if working <= budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# benchmarks/bench_suite.py
+# Times every load stage, the LOD and picking builds, GPU upload and offscreen frames (software Mesa through EGL) for synthetic
+# meshes and the bundled objs/*.obj, and records peak load memory. `run` writes the results as JSON; `compare` fails when
+# a metric is worse than a baseline by more than a threshold.
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from mesh_builder import load_mesh
+from lod import build_lods
+from picking import TriangleBVH
+from synthetic_meshes import synthetic_obj
+
+FACE_COUNTS = (1000, 10000, 100000, 1000000, 10000000)
+DEFAULT_MAX_FACES = 100000
+# (shape, face kind, with normals) generated at every size
+SYNTHETIC_CASES = (
+    ('grid', 'quad', True),
+    ('sphere', 'tri', False),
+    ('scan', 'mix', False),
+    ('grid', 'ngon', False),
+)
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'mesh_inspector_bench')
+FRAMES = 20
+DEFAULT_THRESHOLD = 0.10
+# Differences below these are noise whatever the ratio
+MIN_DELTAS = {'ms': 1.0, 'mb': 1.0}
+
+
+class StageTimer:
+    # progress callback that attributes wall time to the stage names load_mesh reports; 'Done' ends the last one
+    def __init__(self):
+        self.times = {}
+        self.stage = None
+        self.started = None
+
+    def __call__(self, percent, stage):
+        if stage != self.stage:
+            self.stop()
+            if stage != 'Done':
+                self.stage = stage
+                self.started = time.perf_counter()
+
+    def stop(self):
+        if self.stage is not None:
+            key = 'load.' + self.stage.lower().replace(' ', '_') + '_ms'
+            self.times[key] = self.times.get(key, 0.0) + (time.perf_counter() - self.started) * 1000.0
+        self.stage = None
+
+
+def best_of(repeat, function):
+    # Per-key minimum over repeated runs of function(), which returns (dict of timings, result),
+    # and the last result
+    best = {}
+    result = None
+    for _ in range(repeat):
+        times, result = function()
+        for key, value in times.items():
+            best[key] = min(value, best.get(key, value))
+    return best, result
+
+
+def time_load(file_path):
+    timer = StageTimer()
+    start = time.perf_counter()
+    mesh = load_mesh(file_path, timer)
+    timer.stop()
+    timer.times['load.total_ms'] = (time.perf_counter() - start) * 1000.0
+    return timer.times, mesh
+
+
+def time_builds(mesh):
+    times = {}
+    start = time.perf_counter()
+    build_lods(mesh)
+    times['lods_ms'] = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    TriangleBVH(mesh)
+    times['bvh_ms'] = (time.perf_counter() - start) * 1000.0
+    return times, None
+
+
+def load_peak(file_path):
+    tracemalloc.start()
+    load_mesh(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def time_render(widget, mesh, frames):
+    # Upload, then the median of `frames` solid frames and of `frames` wireframe frames
+    times = {}
+    start = time.perf_counter()
+    widget.upload_mesh(mesh)
+    times['render.upload_ms'] = (time.perf_counter() - start) * 1000.0
+    for name, wireframe in (('frame', False), ('wireframe_frame', True)):
+        widget.set_wireframe_mode(wireframe)
+        widget.draw()  # Warm-up: first-use shader and buffer work
+        samples = []
+        for _ in range(frames):
+            start = time.perf_counter()
+            widget.draw()
+            samples.append((time.perf_counter() - start) * 1000.0)
+        times[f'render.{name}_ms'] = statistics.median(samples)
+    widget.set_wireframe_mode(False)
+    return times, None
+
+
+def make_renderer():
+    # OffscreenWidget, or None with a note when EGL or OpenGL is unavailable here
+    try:
+        import offscreen
+        return offscreen.OffscreenWidget(640, 480)
+    except Exception as error:
+        print(f'Offscreen rendering unavailable, skipping frame timings: {error}', file=sys.stderr)
+        return None
+
+
+def benchmark_cases(max_faces, data_dir):
+    # (name, file path) of every case up to max_faces, synthetic files first
+    cases = []
+    for face_count in FACE_COUNTS:
+        if face_count > max_faces:
+            break
+        for shape, kind, with_normals in SYNTHETIC_CASES:
+            file_path = synthetic_obj(data_dir, shape, face_count, kind, with_normals)
+            cases.append((os.path.splitext(os.path.basename(file_path))[0], file_path))
+    for file_path in sorted(glob.glob(os.path.join(ROOT, 'objs', '*.obj'))):
+        cases.append(('objs/' + os.path.basename(file_path), file_path))
+    return cases
+
+
+def run(args):
+    os.makedirs(args.data_dir, exist_ok=True)
+    renderer = None if args.no_render else make_renderer()
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'renderer': renderer.renderer_name if renderer is not None else None,
+            'repeat': args.repeat,
+        },
+        'cases': {},
+    }
+    for name, file_path in benchmark_cases(args.max_faces, args.data_dir):
+        if args.filter and args.filter not in name:
+            continue
+        metrics, mesh = best_of(args.repeat, lambda: time_load(file_path))
+        metrics.update(best_of(args.repeat, lambda: time_builds(mesh))[0])
+        metrics['load.peak_mb'] = load_peak(file_path)
+        if renderer is not None:
+            metrics.update(best_of(args.repeat, lambda: time_render(renderer, mesh, args.frames))[0])
+        results['cases'][name] = {
+            'file_bytes': os.path.getsize(file_path),
+            'faces': int(mesh.face_count),
+            'triangles': int(len(mesh.indices) // 3),
+            'metrics': {key: round(value, 3) for key, value in sorted(metrics.items())},
+        }
+        print(f"{name:32s} load {metrics['load.total_ms']:9.1f} ms  peak {metrics['load.peak_mb']:7.1f} MB" +
+              (f"  frame {metrics['render.frame_ms']:7.2f} ms" if renderer is not None else ''), file=sys.stderr)
+        del mesh
+    if renderer is not None:
+        renderer.close()
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=1)
+    print(f'Wrote {args.output}', file=sys.stderr)
+    return 0
+
+
+def regressions(baseline, current, threshold):
+    # (case, metric, baseline value, current value, ratio) for every shared metric worse by more than threshold
+    found = []
+    for case, entry in baseline['cases'].items():
+        if case not in current['cases']:
+            continue
+        now = current['cases'][case]['metrics']
+        for metric, before in entry['metrics'].items():
+            if metric not in now:
+                continue
+            after = now[metric]
+            unit = metric.rsplit('_', 1)[-1]
+            if after - before > MIN_DELTAS.get(unit, 0.0) and after > before * (1.0 + threshold):
+                found.append((case, metric, before, after, after / before if before else float('inf')))
+    return found
+
+
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    missing = sorted(set(baseline['cases']) - set(current['cases']))
+    if missing:
+        print(f"Not in {args.current}: {', '.join(missing)}")
+    found = regressions(baseline, current, args.threshold)
+    for case, metric, before, after, ratio in found:
+        print(f'REGRESSION {case:32s} {metric:30s} {before:10.2f} -> {after:10.2f}  ({ratio:.2f}x)')
+    print(f'{len(found)} regressions beyond {args.threshold:.0%} in {len(current["cases"])} cases')
+    return 1 if found else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load and render benchmarks with a JSON baseline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and write JSON results')
+    run_parser.add_argument('--output', default='bench_results.json')
+    run_parser.add_argument('--max-faces', type=int, default=DEFAULT_MAX_FACES,
+                            help=f'largest synthetic size, from {FACE_COUNTS} (default {DEFAULT_MAX_FACES})')
+    run_parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the best is kept')
+    run_parser.add_argument('--frames', type=int, default=FRAMES, help='timed frames per render measurement')
+    run_parser.add_argument('--filter', help='only cases whose name contains this')
+    run_parser.add_argument('--no-render', action='store_true', help='skip the offscreen frame timings')
+    run_parser.add_argument('--data-dir', default=DATA_DIR, help='where generated OBJ files are kept between runs')
+
+    compare_parser = commands.add_parser('compare', help='fail when results regress against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help=f'allowed slowdown or growth as a fraction (default {DEFAULT_THRESHOLD})')
+
+    args = parser.parse_args()
+    return run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# benchmarks/bench_topology.py
+# Runs topology validation on a synthetic quad grid and checks its peak working memory, measured with tracemalloc, against the documented budget.
+
+import argparse
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from topology import MEMORY_BYTES_PER_CORNER, validate_topology
+
+
+def quad_grid(face_count):
+    # A wavy side x side grid of quads, the shape of a dense scan, as ObjData-style arrays
+    side = max(1, int(math.sqrt(face_count)))
+    xs, ys = np.meshgrid(np.arange(side + 1, dtype=np.float32), np.arange(side + 1, dtype=np.float32))
+    positions = np.stack([xs.ravel(), ys.ravel(), np.sin(xs.ravel() * 0.1)], axis=1)
+    first = (np.arange(side)[:, None] * (side + 1) + np.arange(side)[None, :]).ravel()
+    face_vertices = np.stack([first, first + 1, first + side + 2, first + side + 1], axis=1).ravel()
+    face_offsets = np.arange(0, len(face_vertices) + 1, 4)
+    return positions, face_vertices, face_offsets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--faces', type=int, default=1000000, help='approximate quad count (10M needs about 3 GB)')
+    parser.add_argument('--budget', type=float, default=MEMORY_BYTES_PER_CORNER,
+                        help='maximum bytes allocated per face corner')
+    args = parser.parse_args()
+
+    positions, face_vertices, face_offsets = quad_grid(args.faces)
+    corner_count = len(face_vertices)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    report = validate_topology(positions, face_vertices, face_offsets)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_corner = peak / corner_count
+    print(f"{len(face_offsets) - 1} faces, {corner_count} corners: {elapsed:.2f} s, "
+          f"peak {peak / (1024 * 1024):.0f} MB = {per_corner:.1f} bytes/corner (budget {args.budget:.0f})")
+    print(report.summary())
+    return 0 if per_corner <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# benchmarks/bench_vertex_cache.py
+# Builds synthetic scans in file order and reordered for the vertex cache (vertex_cache.py), then prints each order's
+# simulated ACMR/ATVR, the time the reordering took and the offscreen frame time, plus whether the images differ.
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import offscreen
+from mesh_builder import build_mesh, load_obj
+from vertex_cache import CACHE_SIZE, OPTIMIZE_MODES, cache_stats
+from bench_suite import DATA_DIR
+from bench_vertex_format import frame_ms
+from synthetic_meshes import synthetic_obj
+
+FACE_COUNTS = (10000, 100000, 1000000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='File-order against vertex-cache-optimized triangles.')
+    parser.add_argument('--max-faces', type=int, default=1000000)
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    widget = offscreen.OffscreenWidget(640, 480)
+    print(f'{widget.renderer_name}, FIFO cache of {CACHE_SIZE}')
+    for face_count in FACE_COUNTS:
+        if face_count > args.max_faces:
+            break
+        obj = load_obj(synthetic_obj(DATA_DIR, 'scan', face_count, 'tri'))
+        reference = None
+        for mode in (None,) + OPTIMIZE_MODES:
+            start = time.perf_counter()
+            mesh = build_mesh(obj, optimize=mode)
+            built = time.perf_counter() - start
+            acmr, atvr = cache_stats(mesh.indices)
+            widget.update_mesh(mesh)
+            ms, image = frame_ms(widget, args.frames)
+            if reference is None:
+                reference = image
+            changed = np.count_nonzero(np.abs(image.astype(int) - reference.astype(int)).max(axis=2) > 8)
+            line = (f"{face_count:8d} faces {mode or 'file':9}: ACMR {acmr:.3f} ATVR {atvr:.3f}, {ms:8.2f} ms, "
+                    f"built in {built:6.2f} s")
+            if mode:
+                line += f", {changed} pixels differ, reordering took {mesh.vertex_cache['seconds']:.2f} s"
+            print(line)
+    widget.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
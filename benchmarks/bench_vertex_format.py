@@ -0,0 +1,68 @@
+# benchmarks/bench_vertex_format.py
+# Renders synthetic meshes offscreen with float and with compact quantized vertices (vertex_format.py) and prints the vertex
+# buffer size, frame time and quantization error of both, plus whether the two images differ.
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import offscreen
+from mesh_builder import load_mesh
+from bench_suite import DATA_DIR
+from synthetic_meshes import synthetic_obj
+
+FACE_COUNTS = (10000, 100000, 1000000)
+MEGABYTE = 1024 * 1024
+
+
+def frame_ms(widget, frames):
+    # Median frame time, and the last frame's pixels
+    widget.draw()  # Warm-up
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        widget.draw()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples), widget.render()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Float against compact quantized vertex buffers.')
+    parser.add_argument('--max-faces', type=int, default=1000000)
+    parser.add_argument('--frames', type=int, default=20)
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    widget = offscreen.OffscreenWidget(640, 480)
+    if widget.compact_program is None:
+        print('Compact vertices are unavailable in this context')
+        return 1
+    print(widget.renderer_name)
+    for face_count in FACE_COUNTS:
+        if face_count > args.max_faces:
+            break
+        file_path = synthetic_obj(DATA_DIR, 'scan', face_count, 'tri')
+        mesh = load_mesh(file_path)
+        widget.set_compact_vertices(False)
+        widget.upload_mesh(mesh)
+        float_ms, float_image = frame_ms(widget, args.frames)
+        float_bytes = widget.vbo.data.nbytes
+        widget.set_compact_vertices(True)
+        compact_ms, compact_image = frame_ms(widget, args.frames)
+        compact = widget.compact
+        changed = np.count_nonzero(np.abs(float_image.astype(int) - compact_image.astype(int)).max(axis=2) > 8)
+        print(f'{face_count:8d} faces: float {float_bytes / MEGABYTE:7.2f} MB {float_ms:8.2f} ms, '
+              f'compact {compact.compact_bytes / MEGABYTE:7.2f} MB {compact_ms:8.2f} ms, '
+              f'error {compact.position_error:.2g} units {compact.normal_error:.3f} deg, {changed} pixels differ')
+    widget.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# benchmarks/bench_wireframe.py
+# Renders synthetic quad scans offscreen with the wireframe off, drawn as a second pass of lines, and drawn in one pass by the
+# geometry shader (shaders.py), and prints the frame time of each plus how many pixels the two wireframes differ by.
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import offscreen
+from mesh_builder import load_mesh
+from bench_suite import DATA_DIR
+from synthetic_meshes import synthetic_obj
+
+FACE_COUNTS = (10000, 100000, 1000000)
+
+
+def frame_ms(widget, frames):
+    # Median frame time, and the last frame's pixels
+    widget.draw()  # Warm-up
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        widget.draw()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples), widget.render()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Two-pass line wireframe against the single-pass geometry shader.')
+    parser.add_argument('--max-faces', type=int, default=1000000)
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--thickness', type=int, default=1, help='wireframe width in pixels')
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    widget = offscreen.OffscreenWidget(640, 480)
+    if not widget.wireframe_programs:
+        print('Single-pass wireframe is unavailable in this context')
+        return 1
+    print(widget.renderer_name)
+    widget.set_wireframe_thickness(args.thickness)
+    for face_count in FACE_COUNTS:
+        if face_count > args.max_faces:
+            break
+        file_path = synthetic_obj(DATA_DIR, 'scan', face_count, 'quad')
+        widget.upload_mesh(load_mesh(file_path))
+        widget.set_wireframe_mode(False)
+        off_ms, _ = frame_ms(widget, args.frames)
+        widget.set_wireframe_mode(True)
+        widget.set_single_pass_wireframe(False)
+        two_pass_ms, two_pass_image = frame_ms(widget, args.frames)
+        widget.set_single_pass_wireframe(True)
+        single_pass_ms, single_pass_image = frame_ms(widget, args.frames)
+        changed = np.count_nonzero(np.abs(two_pass_image.astype(int) - single_pass_image.astype(int)).max(axis=2) > 64)
+        print(f'{face_count:8d} faces: off {off_ms:8.2f} ms, two-pass {two_pass_ms:8.2f} ms, '
+              f'single-pass {single_pass_ms:8.2f} ms, {changed} pixels differ')
+    widget.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/synthetic_meshes.py
+# Deterministic synthetic OBJ files for the benchmarks: grids, spheres and noisy scans with triangle, quad, ngon or mixed faces,
+# with or without vn records. The same arguments always produce the same bytes.
+
+import math
+import os
+import numpy as np
+
+SHAPES = ('grid', 'sphere', 'scan')
+FACE_KINDS = ('tri', 'quad', 'ngon', 'mix')
+SEED = 1234
+
+
+def grid_faces(columns, rows, kind):
+    # (face_vertices, face_offsets) over a (columns + 1) x (rows + 1) vertex lattice, row by row.
+    # 'tri' splits each quad, 'ngon' merges quad pairs into hexagons, 'mix' cycles tri/quad/ngon rows.
+    stride = columns + 1
+    faces = []
+    for row in range(rows):
+        row_kind = FACE_KINDS[row % 3] if kind == 'mix' else kind
+        a = row * stride + np.arange(columns)
+        b, c, d = a + 1, a + stride + 1, a + stride
+        if row_kind == 'tri':
+            corners = np.stack([np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)], axis=1).reshape(-1, 3)
+        elif row_kind == 'ngon':
+            pairs = columns // 2
+            corners = np.stack([a[0:2 * pairs:2], b[0:2 * pairs:2], b[1:2 * pairs:2], c[1:2 * pairs:2],
+                                c[0:2 * pairs:2], d[0:2 * pairs:2]], axis=1)
+            if columns % 2:
+                faces.append((np.stack([a[-1:], b[-1:], c[-1:], d[-1:]], axis=1), 4))
+        else:
+            corners = np.stack([a, b, c, d], axis=1)
+        faces.append((corners, corners.shape[1]))
+    face_vertices = np.concatenate([corners.ravel() for corners, _ in faces])
+    sizes = np.concatenate([np.full(len(corners), size) for corners, size in faces])
+    face_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=face_offsets[1:])
+    return face_vertices, face_offsets
+
+
+def lattice_size(face_count, kind):
+    # Columns and rows of quads giving roughly face_count faces of the given kind
+    faces_per_quad = {'tri': 2.0, 'quad': 1.0, 'ngon': 0.5, 'mix': 3.5 / 3}[kind]
+    side = max(2, int(round(math.sqrt(face_count / faces_per_quad))))
+    return side, side
+
+
+def synthetic_mesh(shape, face_count, kind='quad'):
+    # (positions, vertex normals, face_vertices, face_offsets) of about face_count faces
+    columns, rows = lattice_size(face_count, kind)
+    u, v = np.meshgrid(np.linspace(0.0, 1.0, columns + 1), np.linspace(0.0, 1.0, rows + 1))
+    u = u.ravel()
+    v = v.ravel()
+    if shape == 'grid':
+        height = 0.05 * np.sin(u * 12.0) * np.cos(v * 9.0)
+        positions = np.stack([u * 2.0 - 1.0, v * 2.0 - 1.0, height], axis=1)
+        normals = np.stack([-0.6 * np.cos(u * 12.0) * np.cos(v * 9.0), 0.45 * np.sin(u * 12.0) * np.sin(v * 9.0),
+                            np.ones_like(u)], axis=1)
+    elif shape in ('sphere', 'scan'):
+        # Latitude bands short of the poles, so no face collapses
+        theta = u * 2.0 * math.pi
+        phi = 0.05 * math.pi + v * 0.9 * math.pi
+        normals = np.stack([np.sin(phi) * np.cos(theta), np.sin(phi) * np.sin(theta), np.cos(phi)], axis=1)
+        positions = normals.copy()
+        if shape == 'scan':
+            positions *= 1.0 + 0.01 * np.random.default_rng(SEED).standard_normal(len(positions))[:, None]
+    else:
+        raise ValueError(f"Unknown shape '{shape}', expected one of {SHAPES}")
+    normals /= np.linalg.norm(normals, axis=1)[:, None]
+
+    face_vertices, face_offsets = grid_faces(columns, rows, kind)
+    if shape == 'scan':
+        # Scanners write vertices in no useful order; shuffle them so locality is poor
+        order = np.random.default_rng(SEED + 1).permutation(len(positions))
+        positions = positions[order]
+        normals = normals[order]
+        face_vertices = np.argsort(order)[face_vertices]
+    return positions.astype(np.float32), normals.astype(np.float32), face_vertices, face_offsets
+
+
+def write_obj(file_path, positions, normals, face_vertices, face_offsets):
+    # Faces are written in order; each run of equal-sized faces goes through one savetxt call.
+    # normals=None writes no vn records; otherwise vertex i uses normal i.
+    with open(file_path, 'w') as file:
+        file.write('# synthetic mesh\n')
+        np.savetxt(file, positions, fmt='v %.6f %.6f %.6f')
+        if normals is not None:
+            np.savetxt(file, normals, fmt='vn %.4f %.4f %.4f')
+        sizes = np.diff(face_offsets)
+        run_starts = np.flatnonzero(np.concatenate([[True], sizes[1:] != sizes[:-1]]))
+        run_ends = np.append(run_starts[1:], len(sizes))
+        for first, last in zip(run_starts, run_ends):
+            size = int(sizes[first])
+            corners = face_vertices[face_offsets[first]:face_offsets[last]].reshape(-1, size) + 1
+            if normals is not None:
+                np.savetxt(file, np.repeat(corners, 2, axis=1), fmt='f' + ' %d//%d' * size)
+            else:
+                np.savetxt(file, corners, fmt='f' + ' %d' * size)
+
+
+def case_name(shape, face_count, kind, with_normals):
+    return f"{shape}-{kind}-{face_count}{'-vn' if with_normals else ''}"
+
+
+def synthetic_obj(directory, shape, face_count, kind='quad', with_normals=False):
+    # Path of the OBJ file for these parameters in directory, writing it the first time
+    file_path = os.path.join(directory, case_name(shape, face_count, kind, with_normals) + '.obj')
+    if not os.path.exists(file_path):
+        positions, normals, face_vertices, face_offsets = synthetic_mesh(shape, face_count, kind)
+        partial_path = file_path + '.partial'
+        write_obj(partial_path, positions, normals if with_normals else None, face_vertices, face_offsets)
+        os.replace(partial_path, file_path)
+    return file_path
@@ -0,0 +1,38 @@
+# buffer_updates.py
+# Finds the parts of a GPU buffer's array that changed between two versions of a model, so a reloaded file patches them with
+# glBufferSubData instead of reallocating every buffer.
+
+import numpy as np
+
+MERGE_GAP = 4096  # Unchanged rows between two changes below which both go in one range
+MAX_RANGES = 64  # Beyond this many ranges the whole span between the first and last change is sent
+
+
+class BufferUpdate:
+    # What updating the model's buffers from a reloaded version of it did
+    def __init__(self):
+        self.ranges = 0  # glBufferSubData calls
+        self.patched_bytes = 0
+        self.reallocated = []  # Names of buffers whose size or type changed
+        self.unchanged = []  # Names of buffers left as they were
+        self.total_bytes = 0  # Size of all buffers after the update
+
+    def add_ranges(self, name, ranges, itemsize):
+        if not ranges:
+            self.unchanged.append(name)
+        self.ranges += len(ranges)
+        self.patched_bytes += sum(stop - start for start, stop in ranges) * itemsize
+
+
+def changed_ranges(old, new, row_size, merge_gap=MERGE_GAP, max_ranges=MAX_RANGES):
+    # [(start, stop)] element ranges where new differs from old, compared a row (a vertex, triangle
+    # or edge) at a time; old and new have the same shape and type
+    changed = np.flatnonzero(np.any(old.reshape(-1, row_size) != new.reshape(-1, row_size), axis=1))
+    if not len(changed):
+        return []
+    breaks = np.flatnonzero(np.diff(changed) > merge_gap)
+    starts = changed[np.concatenate([[0], breaks + 1])]
+    stops = changed[np.concatenate([breaks, [len(changed) - 1]])] + 1
+    if len(starts) > max_ranges:
+        starts, stops = starts[:1], stops[-1:]
+    return [(int(start) * row_size, int(stop) * row_size) for start, stop in zip(starts, stops)]
@@ -0,0 +1,70 @@
+# culling.py
+# Splits a mesh's triangles into spatial grid chunks with bounding boxes, and tests those boxes against the view frustum so off-screen chunks are never drawn.
+
+import math
+import numpy as np
+
+CHUNK_TARGET_TRIANGLES = 16384  # Rough triangle count per chunk on a surface mesh
+MAX_CHUNK_RESOLUTION = 64
+
+
+def chunk_order(corner_positions, target=CHUNK_TARGET_TRIANGLES):
+    # corner_positions is (T, 3, 3). Returns the triangle order that makes every chunk contiguous,
+    # and the triangle offsets of the chunks in that order (chunk i owns offsets[i]:offsets[i + 1]).
+    # No triangles make no chunks.
+    triangle_count = len(corner_positions)
+    if triangle_count == 0:
+        return np.arange(0), np.zeros(1, dtype=np.int64)
+    if triangle_count <= target:
+        return np.arange(triangle_count), np.array([0, triangle_count], dtype=np.int64)
+
+    # Surfaces occupy about resolution^2 cells of the grid, hence the square root
+    resolution = min(MAX_CHUNK_RESOLUTION, max(2, math.ceil(math.sqrt(triangle_count / target))))
+    centroids = corner_positions.mean(axis=1)
+    low = centroids.min(axis=0)
+    extent = np.maximum(centroids.max(axis=0) - low, 1e-12)
+    cells = np.minimum((resolution * (centroids - low) / extent).astype(np.int64), resolution - 1)
+    keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+    return order, np.append(starts, triangle_count).astype(np.int64)
+
+
+def chunk_bounds(corner_positions, offsets):
+    # (C, 2, 3) float32 min and max corner of every chunk's triangles
+    flat = corner_positions.reshape(-1, 3)
+    starts = offsets[:-1] * 3
+    bounds = np.empty((len(starts), 2, 3), dtype=np.float32)
+    if len(starts):
+        bounds[:, 0] = np.minimum.reduceat(flat, starts, axis=0)
+        bounds[:, 1] = np.maximum.reduceat(flat, starts, axis=0)
+    return bounds
+
+
+def frustum_planes(clip_matrix):
+    # Six (a, b, c, d) planes, inside where a*x + b*y + c*z + d >= 0, in the space clip_matrix maps
+    # from (Gribb & Hartmann). clip_matrix is row-major, projection @ view @ model.
+    rows = np.asarray(clip_matrix, dtype=np.float64)
+    return np.array([rows[3] + rows[0], rows[3] - rows[0],
+                     rows[3] + rows[1], rows[3] - rows[1],
+                     rows[3] + rows[2], rows[3] - rows[2]])
+
+
+def visible_chunks(planes, bounds):
+    # Boolean mask of the chunks whose box is not entirely outside any plane. For each plane only
+    # the box corner furthest along its normal needs testing.
+    normals = planes[:, :3]
+    corners = np.where(normals[None] >= 0, bounds[:, 1][:, None], bounds[:, 0][:, None])
+    distances = np.einsum('cpk,pk->cp', corners, normals) + planes[:, 3]
+    return np.all(distances >= 0, axis=1)
+
+
+def visible_ranges(visible, offsets):
+    # Merge runs of adjacent visible chunks into (first index, index count) ranges for one
+    # glMultiDrawElements call; offsets are in indices
+    edges = np.diff(np.concatenate([[0], visible.astype(np.int8), [0]]))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    return offsets[run_starts], offsets[run_ends] - offsets[run_starts]
@@ -0,0 +1,80 @@
+# face_arrays.py
+# Helpers for faces stored the way obj_parser.py returns them: one flat array of corners plus CSR offsets per face.
+
+import numpy as np
+
+
+def corner_faces(face_offsets):
+    # Face index owning each corner
+    return np.repeat(np.arange(len(face_offsets) - 1), np.diff(face_offsets))
+
+
+def next_corners(face_offsets):
+    # Index of the corner following each corner within its face, wrapping to the first
+    corners = np.arange(face_offsets[-1])
+    following = corners + 1
+    following[face_offsets[1:] - 1] = face_offsets[:-1]
+    return following
+
+
+def previous_corners(face_offsets):
+    corners = np.arange(face_offsets[-1])
+    preceding = corners - 1
+    preceding[face_offsets[:-1]] = face_offsets[1:] - 1
+    return preceding
+
+
+def triangulate(face_offsets):
+    # Fan triangulation: face corners (0, i, i + 1) for i in 1..n-2, as corner indices
+    sizes = np.diff(face_offsets)
+    tri_counts = np.maximum(sizes - 2, 0)
+    owner = np.repeat(np.arange(len(sizes)), tri_counts)
+    first_tri = np.cumsum(tri_counts) - tri_counts
+    local = np.arange(tri_counts.sum()) - first_tri[owner]
+    base = face_offsets[:-1][owner]
+    return np.stack([base, base + local + 1, base + local + 2], axis=1)
+
+
+def triangle_faces(face_offsets):
+    # Face index owning each triangle produced by triangulate()
+    tri_counts = np.maximum(np.diff(face_offsets) - 2, 0)
+    return np.repeat(np.arange(len(tri_counts)), tri_counts)
+
+
+def triangle_edge_mask(triangles, face_offsets):
+    # Bit e set when triangle edge (corner e, corner e + 1) is a real face edge rather than a diagonal
+    following = next_corners(face_offsets)
+    mask = np.zeros(len(triangles), dtype=np.uint8)
+    for edge in range(3):
+        start = triangles[:, edge]
+        end = triangles[:, (edge + 1) % 3]
+        mask |= (((following[start] == end) | (following[end] == start)) << edge).astype(np.uint8)
+    return mask
+
+
+def complete_face_mask(face_vertices, face_offsets, vertex_count):
+    # Faces whose corners all reference one of the first vertex_count vertices
+    sizes = np.diff(face_offsets)
+    valid = (face_vertices >= 0) & (face_vertices < vertex_count)
+    if np.all(valid):
+        return np.ones(len(sizes), dtype=bool)
+    valid_corners = np.add.reduceat(np.append(valid, False), face_offsets[:-1]) * (sizes > 0)
+    return valid_corners == sizes
+
+
+def complete_faces(face_vertices, face_offsets, vertex_count):
+    # The faces complete_face_mask keeps, as (vertices, offsets)
+    complete = complete_face_mask(face_vertices, face_offsets, vertex_count)
+    if np.all(complete):
+        return face_vertices, face_offsets
+    sizes = np.diff(face_offsets)
+    offsets = np.zeros(np.count_nonzero(complete) + 1, dtype=np.int64)
+    np.cumsum(sizes[complete], out=offsets[1:])
+    return face_vertices[np.repeat(complete, sizes)], offsets
+
+
+def normalize_rows(vectors):
+    # Unit length rows; zero-length rows (degenerate faces, unused vertices) stay zero instead of NaN
+    lengths = np.linalg.norm(vectors, axis=1)
+    safe = np.where(lengths > 0, lengths, 1)
+    return vectors / safe[:, None]
@@ -0,0 +1,75 @@
+# file_watcher.py
+# Watches the open model's file and reports it changed once writes have settled, so an exporter saving in several steps
+# or an editor replacing the file triggers one reload.
+
+import os
+import time
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+DEBOUNCE_MS = 300  # Quiet time after the last change before the file is reloaded
+MISSING_RETRIES = 20  # Debounce periods to wait for a replaced file to reappear
+
+
+def file_signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class FileWatcher(QObject):
+    changed = pyqtSignal(str, float)  # File path, time.perf_counter() of the first change in the burst
+
+    def __init__(self, parent=None, debounce_ms=DEBOUNCE_MS):
+        super(FileWatcher, self).__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.on_settled)
+        self.file_path = None
+        self.signature = None
+        self.first_change = None
+        self.missing = 0
+
+    def watch(self, file_path):
+        if file_path == self.file_path:
+            return
+        self.stop()
+        self.file_path = file_path
+        self.signature = file_signature(file_path)
+        self.watcher.addPath(file_path)
+
+    def stop(self):
+        self.timer.stop()
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        self.file_path = None
+        self.first_change = None
+
+    def on_file_changed(self, file_path):
+        if file_path != self.file_path:
+            return
+        if self.first_change is None:
+            self.first_change = time.perf_counter()
+            self.missing = 0
+        self.timer.start()  # Restarted by every change until the writes settle
+
+    def on_settled(self):
+        # Editors that save by replacing the file drop it from the watcher; add it back once it exists
+        signature = file_signature(self.file_path)
+        if signature is None:
+            self.missing += 1
+            if self.missing < MISSING_RETRIES:
+                self.timer.start()
+            else:
+                self.first_change = None
+            return
+        if self.file_path not in self.watcher.files():
+            self.watcher.addPath(self.file_path)
+        first_change, self.first_change = self.first_change, None
+        if signature != self.signature:
+            self.signature = signature
+            self.changed.emit(self.file_path, first_change)
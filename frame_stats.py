@@ -0,0 +1,141 @@
+# frame_stats.py
+# Frame-time instrumentation for the viewport: CPU time per paintGL call, GPU time from GL_TIME_ELAPSED queries, rolling percentiles and an optional CSV/JSON trace.
+
+import csv
+import ctypes
+import json
+import time
+from collections import deque
+import numpy as np
+from OpenGL.GL import (glGenQueries, glDeleteQueries, glBeginQuery, glEndQuery, glGetQueryObjectiv,
+                       GLuint64, GL_TIME_ELAPSED, GL_QUERY_RESULT, GL_QUERY_RESULT_AVAILABLE)
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v  # The wrapped version cannot size its output
+from OpenGL.error import GLError, NullFunctionError
+
+PERCENTILES = (50, 95, 99)
+TRACE_FIELDS = ('frame', 'time', 'cpu_ms', 'gpu_ms', 'path')
+
+
+class GpuTimer:
+    # A small ring of timer queries so reading a result never waits on the frame that produced it
+    def __init__(self, ring_size=4):
+        self.available = False
+        self.queries = []
+        self.pending = deque()
+        try:
+            self.queries = list(glGenQueries(ring_size))
+            self.available = True
+        except (GLError, NullFunctionError):
+            pass
+        self.free = deque(self.queries)
+        self.active = None
+        self.warmed_up = False  # Some drivers (llvmpipe) report garbage for the very first query
+
+    def begin(self):
+        if not self.available or not self.free:
+            return
+        self.active = self.free.popleft()
+        try:
+            glBeginQuery(GL_TIME_ELAPSED, self.active)
+        except GLError:
+            # Timer queries unsupported by this context; stop trying
+            self.available = False
+            self.active = None
+
+    def end(self, frame):
+        if self.active is None:
+            return
+        glEndQuery(GL_TIME_ELAPSED)
+        self.pending.append((self.active, frame))
+        self.active = None
+
+    def collect(self):
+        # (frame, GPU milliseconds) for every finished query, oldest first
+        results = []
+        while self.pending and glGetQueryObjectiv(self.pending[0][0], GL_QUERY_RESULT_AVAILABLE):
+            query, frame = self.pending.popleft()
+            elapsed = GLuint64(0)
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(elapsed))
+            self.free.append(query)
+            if self.warmed_up:
+                results.append((frame, elapsed.value / 1e6))
+            self.warmed_up = True
+        return results
+
+    def release(self):
+        if self.queries:
+            glDeleteQueries(len(self.queries), self.queries)
+        self.queries = []
+        self.available = False
+
+
+class FrameStats:
+    def __init__(self, window=240):
+        self.cpu_times = deque(maxlen=window)
+        self.gpu_times = deque(maxlen=window)
+        self.paint_times = deque(maxlen=window)
+        self.frame_count = 0
+        self.recording = False
+        self.trace = []
+        self.trace_by_frame = {}  # Trace rows still waiting for their GPU time
+
+    def begin_frame(self):
+        # Number of the frame about to be painted, used to match late GPU results
+        self.frame_count += 1
+        return self.frame_count
+
+    def record_frame(self, frame, cpu_ms, path=''):
+        now = time.perf_counter()
+        self.cpu_times.append(cpu_ms)
+        self.paint_times.append(now)
+        if self.recording:
+            row = {'frame': frame, 'time': now, 'cpu_ms': cpu_ms, 'gpu_ms': None, 'path': path}
+            self.trace.append(row)
+            self.trace_by_frame[frame] = row
+
+    def record_gpu(self, results):
+        for frame, gpu_ms in results:
+            self.gpu_times.append(gpu_ms)
+            row = self.trace_by_frame.pop(frame, None)
+            if row is not None:
+                row['gpu_ms'] = gpu_ms
+        # Frames whose query was skipped never get a GPU time; stop waiting after a while
+        for frame in [frame for frame in self.trace_by_frame if frame < self.frame_count - 64]:
+            del self.trace_by_frame[frame]
+
+    def clear_times(self):
+        # Starts a fresh percentile window, e.g. after switching what is being measured
+        self.cpu_times.clear()
+        self.gpu_times.clear()
+
+    def fps(self, span=1.0):
+        # Frames actually painted during the last `span` seconds
+        cutoff = time.perf_counter() - span
+        return sum(1 for painted in self.paint_times if painted >= cutoff) / span
+
+    def percentiles(self, samples):
+        if not samples:
+            return None
+        return np.percentile(np.fromiter(samples, dtype=np.float64), PERCENTILES)
+
+    def cpu_percentiles(self):
+        return self.percentiles(self.cpu_times)
+
+    def gpu_percentiles(self):
+        return self.percentiles(self.gpu_times)
+
+    def set_recording(self, enabled):
+        self.recording = enabled
+        if enabled:
+            self.trace = []
+        self.trace_by_frame.clear()
+
+    def save_trace(self, file_path):
+        if file_path.lower().endswith('.json'):
+            with open(file_path, 'w') as file:
+                json.dump({'fields': TRACE_FIELDS, 'frames': self.trace}, file, indent=1)
+        else:
+            with open(file_path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=TRACE_FIELDS)
+                writer.writeheader()
+                writer.writerows(self.trace)
@@ -0,0 +1,123 @@
+# inspect_models.py
+# Headless batch inspection: the counts the viewer's HUD shows, plus face-size breakdown and bounds, for many OBJ files at once.
+# Imports neither Qt nor OpenGL, so it runs on build machines. Results stream to stdout as JSON lines; the summary goes to stderr.
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from obj_parser import parse_obj
+from mesh_builder import unique_edges
+from mesh_cache import find_obj_files
+
+MAX_BATCH_SIZE = 16
+
+
+def inspect_file(file_path):
+    # One JSON-ready record; failures become a record with an 'error' instead of raising
+    start = time.perf_counter()
+    try:
+        obj = parse_obj(file_path)
+        sizes = obj.face_sizes
+        positions = obj.positions
+        if len(positions):
+            bounds = {'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()}
+        else:
+            bounds = None
+        record = {
+            'path': file_path,
+            'vertex_count': len(positions),
+            'edge_count': len(unique_edges(obj.face_vertices, obj.face_offsets)),
+            'face_count': obj.face_count,
+            'triangles': int(np.count_nonzero(sizes == 3)),
+            'quads': int(np.count_nonzero(sizes == 4)),
+            'ngons': int(np.count_nonzero(sizes > 4)),
+            'degenerate_faces': int(np.count_nonzero(sizes < 3)),
+            'bounds': bounds,
+            'bytes': os.path.getsize(file_path),
+        }
+    except Exception as error:
+        record = {'path': file_path, 'error': f'{type(error).__name__}: {error}'}
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def inspect_batch(file_paths):
+    # Several files per task, so small files are not dominated by inter-process overhead
+    return [inspect_file(file_path) for file_path in file_paths]
+
+
+def inspect_files(file_paths, jobs, output=None):
+    # Inspect every file on `jobs` worker processes, writing records as they finish.
+    # Returns (records written, failures, elapsed seconds).
+    written = failures = 0
+    start = time.perf_counter()
+    batch_size = max(1, min(MAX_BATCH_SIZE, len(file_paths) // (jobs * 4)))
+    batches = [file_paths[first:first + batch_size] for first in range(0, len(file_paths), batch_size)]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(inspect_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                records = future.result()
+            except Exception as error:
+                # The worker process itself died (e.g. killed for memory); report and carry on
+                records = [{'path': file_path, 'error': f'{type(error).__name__}: {error}'}
+                           for file_path in futures[future]]
+            for record in records:
+                failures += 'error' in record
+                written += 1
+                if output is not None:
+                    output.write(json.dumps(record) + '\n')
+            if output is not None:
+                output.flush()
+    return written, failures, time.perf_counter() - start
+
+
+def worker_counts(maximum):
+    # 1, 2, 4, ... up to and including maximum
+    counts = []
+    count = 1
+    while count < maximum:
+        counts.append(count)
+        count *= 2
+    return counts + [maximum]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect OBJ files without opening the viewer.')
+    parser.add_argument('paths', nargs='+', help='OBJ files or directories to scan')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (default: all cores)')
+    parser.add_argument('--output', help='write JSON lines here instead of stdout')
+    parser.add_argument('--scaling', action='store_true',
+                        help='rerun with 1, 2, 4, ... --jobs workers and report files per second for each')
+    args = parser.parse_args(argv)
+
+    file_paths = list(find_obj_files(args.paths))
+    if not file_paths:
+        print('No OBJ files found', file=sys.stderr)
+        return 1
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        written, failures, elapsed = inspect_files(file_paths, args.jobs, output)
+    finally:
+        if args.output:
+            output.close()
+    print(f'{written} files, {failures} failed, {elapsed:.2f} s, '
+          f'{written / elapsed:.1f} files/s with {args.jobs} workers', file=sys.stderr)
+
+    if args.scaling:
+        baseline = None
+        for jobs in worker_counts(args.jobs):
+            _, _, elapsed = inspect_files(file_paths, jobs)
+            rate = len(file_paths) / elapsed
+            baseline = baseline or rate
+            print(f'{jobs:4d} workers: {rate:8.1f} files/s  ({rate / baseline:.2f}x)', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# load_profile.py
+# Optional load-pipeline profiling: wall time, traced allocations and element counts per load stage, for the HUD and
+# for saving as a Chrome trace (chrome://tracing, Perfetto) or as one JSON object per stage.
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_LOADS = os.environ.get('MESH_INSPECTOR_PROFILE_LOADS', '') not in ('', '0')
+END_STAGES = ('Done',)
+
+_local = threading.local()  # .profile: the LoadProfile the current thread records into, if any
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def start_tracing():
+    # tracemalloc is shared by every profile alive at once; only the first starts it
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            return False  # Someone else (a benchmark) owns tracing; leave it alone
+        if _tracing_users == 0:
+            tracemalloc.start()
+        _tracing_users += 1
+        return True
+
+
+def stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+class Stage:
+    def __init__(self, name, thread_name, start, memory_start):
+        self.name = name
+        self.thread = thread_name
+        self.start = start
+        self.end = None
+        self.memory_start = memory_start  # Traced bytes when the stage began, None without tracing
+        self.allocated = None  # Peak traced bytes above memory_start during the stage
+        self.retained = None  # Traced bytes still held when it ended
+        self.counts = {}
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class LoadProfile:
+    # Stages are timed per thread: the worker's parse and build stages, then the GUI thread's upload.
+    # Traced memory is process-wide, so stages overlapping on two threads see each other's allocations.
+    def __init__(self, label, trace_memory=True):
+        self.label = label
+        self.started = time.perf_counter()
+        self.stages = []
+        self.open = {}  # thread id -> Stage being timed on that thread
+        self.lock = threading.Lock()
+        self.trace_memory = trace_memory and start_tracing()
+        self.finished = False
+
+    def __call__(self, percent, stage):
+        # A progress callback: a new stage name ends the thread's previous stage
+        self.mark(stage)
+
+    def mark(self, name):
+        thread_id = threading.get_ident()
+        current = self.open.get(thread_id)
+        if current is not None and current.name == name:
+            return
+        if current is not None:
+            self.close(current)
+            del self.open[thread_id]
+        if name is not None and name not in END_STAGES and not self.finished:
+            self.open[thread_id] = self.begin(name)
+
+    def begin(self, name):
+        memory_start = None
+        if self.trace_memory and not self.finished:
+            memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        stage = Stage(name, threading.current_thread().name, time.perf_counter(), memory_start)
+        with self.lock:
+            self.stages.append(stage)
+        return stage
+
+    def close(self, stage):
+        stage.end = time.perf_counter()
+        if stage.memory_start is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stage.allocated = max(peak - stage.memory_start, 0)
+            stage.retained = current - stage.memory_start
+
+    def count(self, counts):
+        # Added to the thread's open stage; blocks parsed one after another sum up
+        stage = self.open.get(threading.get_ident())
+        if stage is not None:
+            for key, value in counts.items():
+                stage.counts[key] = stage.counts.get(key, 0) + int(value)
+
+    def finish(self):
+        # Ends every open stage and stops memory tracing; later marks are ignored
+        if self.finished:
+            return
+        for stage in list(self.open.values()):
+            self.close(stage)
+        self.open.clear()
+        if self.trace_memory:
+            stop_tracing()
+        self.finished = True
+
+    @property
+    def total(self):
+        ends = [stage.start + stage.duration for stage in self.stages]
+        return max(ends) - self.started if ends else 0.0
+
+    def summary(self):
+        # (name, seconds, peak allocated bytes or None, counts) per stage name in first-seen order;
+        # repeated stages (streamed blocks) are added up
+        rows = {}
+        for stage in self.stages:
+            seconds, allocated, counts = rows.get(stage.name, (0.0, None, {}))
+            if stage.allocated is not None:
+                allocated = max(allocated or 0, stage.allocated)
+            for key, value in stage.counts.items():
+                counts[key] = counts.get(key, 0) + value
+            rows[stage.name] = (seconds + stage.duration, allocated, counts)
+        return [(name, seconds, allocated, counts) for name, (seconds, allocated, counts) in rows.items()]
+
+    def records(self):
+        # One structured log record per stage, times in milliseconds from the start of the load
+        return [{'load': self.label, 'stage': stage.name, 'thread': stage.thread,
+                 'start_ms': round((stage.start - self.started) * 1000.0, 3),
+                 'duration_ms': round(stage.duration * 1000.0, 3),
+                 'allocated_bytes': stage.allocated, 'retained_bytes': stage.retained,
+                 'counts': stage.counts} for stage in self.stages]
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for stage in self.stages:
+            tid = threads.setdefault(stage.thread, len(threads) + 1)
+            args = dict(stage.counts)
+            if stage.allocated is not None:
+                args['allocated_bytes'] = stage.allocated
+                args['retained_bytes'] = stage.retained
+            events.append({'name': stage.name, 'cat': 'load', 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (stage.start - self.started) * 1e6, 'dur': stage.duration * 1e6, 'args': args})
+        for thread_name, tid in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}})
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': os.path.basename(self.label)}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, file_path):
+        # .jsonl writes one record per line, anything else a Chrome trace
+        with open(file_path, 'w') as file:
+            if file_path.lower().endswith('.jsonl'):
+                for record in self.records():
+                    file.write(json.dumps(record) + '\n')
+            else:
+                json.dump(self.chrome_trace(), file, indent=1)
+
+
+@contextmanager
+def activate(profile):
+    # Makes count() and stage() on this thread record into profile; None records nothing
+    previous = getattr(_local, 'profile', None)
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+
+
+def count(**counts):
+    # Element counts for the current stage; a no-op unless a profile is active on this thread
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.count(counts)
+
+
+@contextmanager
+def stage(name, **counts):
+    # Times the block as its own stage when a profile is active on this thread
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    profile.mark(name)
+    profile.count(counts)
+    try:
+        yield
+    finally:
+        profile.mark(None)
@@ -0,0 +1,145 @@
+# lod.py
+# Level-of-detail meshes by vectorized vertex clustering, and the screen-size rule that picks which level to draw.
+
+import math
+import numpy as np
+from face_arrays import normalize_rows
+from obj_parser import report_progress
+
+LOD_RATIOS = (0.5, 0.2, 0.05)  # Target triangle counts of levels 1-3, relative to the full mesh
+LOD_SCREEN_FRACTIONS = (0.5, 0.25, 0.1)  # Level k is drawn once the model covers less than entry k - 1
+LOD_MIN_TRIANGLES = 20000  # Smaller meshes draw fast enough at full detail
+SEARCH_STEPS = 4
+
+
+class LodChain:
+    # Fields persisted by mesh_cache.py, like MeshData's
+    ARRAY_FIELDS = ('vertex_data', 'indices', 'index_offsets')
+    COUNT_FIELDS = ()
+
+    def __init__(self, vertex_data, indices, index_offsets):
+        self.vertex_data = vertex_data  # (N * 6,) float32 for every level, position then normal
+        self.indices = indices  # uint16 or uint32 into vertex_data, levels one after another
+        # Level k + 1 owns indices[index_offsets[k]:index_offsets[k + 1]]; level 0 is the full mesh
+        self.index_offsets = index_offsets
+
+    @property
+    def level_count(self):
+        return len(self.index_offsets) - 1
+
+    def triangle_count(self, level):
+        return int(self.index_offsets[level] - self.index_offsets[level - 1]) // 3
+
+
+def cluster_triangles(positions, normals, triangles, resolution):
+    # Snap vertices to a grid with `resolution` cells along the longest axis, merge each cell into
+    # one vertex at the mean position, and keep the distinct triangles that still span three cells
+    low = positions.min(axis=0)
+    extent = float((positions.max(axis=0) - low).max()) or 1.0
+    cells = np.minimum(((positions - low) * (resolution / extent)).astype(np.int64), resolution - 1)
+    keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+    _, cluster = np.unique(keys, return_inverse=True)
+
+    clustered = cluster[triangles]
+    keep = ((clustered[:, 0] != clustered[:, 1]) & (clustered[:, 1] != clustered[:, 2]) &
+            (clustered[:, 2] != clustered[:, 0]))
+    clustered = clustered[keep]
+
+    # Triangles collapsing onto the same three cells survive once, keeping the first winding
+    ordered = np.sort(clustered, axis=1)
+    if len(ordered) and ordered.max() < 1 << 21:
+        _, first = np.unique(ordered[:, 0] << 42 | ordered[:, 1] << 21 | ordered[:, 2], return_index=True)
+    else:
+        _, first = np.unique(ordered, axis=0, return_index=True)
+    clustered = clustered[np.sort(first)]
+
+    # Only cells some triangle still uses become vertices
+    used, remapped = np.unique(clustered, return_inverse=True)
+    lookup = np.full(cluster.max() + 1 if len(cluster) else 0, -1, dtype=np.int64)
+    lookup[used] = np.arange(len(used))
+    vertex_cluster = lookup[cluster]
+    members = vertex_cluster >= 0
+
+    counts = np.bincount(vertex_cluster[members], minlength=len(used)).astype(np.float32)
+    new_positions = np.empty((len(used), 3), dtype=np.float32)
+    new_normals = np.empty((len(used), 3), dtype=np.float32)
+    for axis in range(3):
+        new_positions[:, axis] = np.bincount(vertex_cluster[members], positions[members, axis],
+                                             minlength=len(used)) / counts
+        new_normals[:, axis] = np.bincount(vertex_cluster[members], normals[members, axis],
+                                           minlength=len(used))
+    new_normals = normalize_rows(new_normals)
+
+    # Clustering folds some triangles over; wind each one to agree with its merged vertex normals
+    triangles = remapped.reshape(-1, 3)
+    corners = new_positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    flipped = np.einsum('ij,ij->i', face_normals, new_normals[triangles].sum(axis=1)) < 0
+    triangles[flipped] = triangles[flipped][:, ::-1]
+    return new_positions, new_normals, triangles
+
+
+def decimate(positions, normals, triangles, target_triangles):
+    # Search the grid resolution whose clustering lands closest to target_triangles. On a surface
+    # the surviving triangle count grows roughly with the square of the resolution.
+    resolution = max(2, int(math.sqrt(len(triangles)) / 2))
+    best = None
+    for _ in range(SEARCH_STEPS):
+        result = cluster_triangles(positions, normals, triangles, resolution)
+        error = abs(math.log(max(len(result[2]), 1) / target_triangles))
+        if best is None or error < best[0]:
+            best = (error, result)
+        if error < 0.1 or len(result[2]) == 0:
+            break
+        scale = math.sqrt(target_triangles / max(len(result[2]), 1))
+        resolution = max(2, int(round(resolution * min(max(scale, 0.25), 4.0))))
+    return best[1]
+
+
+def build_lods(mesh, progress=None, ratios=LOD_RATIOS):
+    # LodChain for a MeshData, or None when the mesh is small enough to always draw in full.
+    # Each level is clustered from the previous one, so later levels work on ever smaller inputs.
+    # progress(percent, stage) is called before every level.
+    triangle_count = len(mesh.indices) // 3
+    if triangle_count < LOD_MIN_TRIANGLES:
+        return None
+
+    vertex_data = mesh.vertex_data.reshape(-1, 6)
+    positions = np.ascontiguousarray(vertex_data[:, :3])
+    normals = np.ascontiguousarray(vertex_data[:, 3:])
+    triangles = np.asarray(mesh.indices, dtype=np.int64).reshape(-1, 3)
+
+    level_vertices = []
+    level_triangles = []
+    for level, ratio in enumerate(ratios):
+        report_progress(progress, int(100 * level / len(ratios)), f'Building LOD {level + 1}')
+        target = max(int(triangle_count * ratio), 1)
+        positions, normals, triangles = decimate(positions, normals, triangles, target)
+        if len(triangles) == 0:
+            break
+        level_vertices.append(np.hstack([positions, normals]))
+        level_triangles.append(triangles)
+    if not level_triangles:
+        return None
+
+    # Concatenate the levels into one vertex and one index buffer, indices made global
+    bases = np.cumsum([0] + [len(vertices) for vertices in level_vertices])
+    index_dtype = np.uint16 if bases[-1] <= 65536 else np.uint32
+    indices = np.concatenate([tris.ravel() + base for tris, base in zip(level_triangles, bases)]).astype(index_dtype)
+    index_offsets = np.cumsum([0] + [tris.size for tris in level_triangles]).astype(np.int64)
+    report_progress(progress, 100, 'LODs ready')
+    return LodChain(np.concatenate(level_vertices).astype(np.float32).ravel(), indices, index_offsets)
+
+
+def screen_fraction(radius, distance, fov_degrees):
+    # Bounding sphere radius over the half-height of the view at that distance; 1 fills the view
+    if distance <= radius:
+        return float('inf')
+    return radius / (distance * math.tan(math.radians(fov_degrees) / 2))
+
+
+def select_level(fraction, level_count):
+    level = 0
+    while level < level_count and fraction < LOD_SCREEN_FRACTIONS[level]:
+        level += 1
+    return level
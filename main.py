@@ -1,13 +1,27 @@
 # main.py
 # Responsible for initializing and running the main application window, managing user interactions, and orchestrating the overall functionality of the 3D viewer.
 
+import os
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QSlider, QDockWidget, QVBoxLayout, QWidget, QLabel, QHBoxLayout, QDoubleSpinBox, QCheckBox, QGroupBox
+import time
+import startup  # Starts the startup timer
+if __name__ == "__main__":
+    startup.begin(sys.argv)  # A file given on the command line starts loading before Qt and OpenGL are imported
+from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog, QSlider, QDockWidget, QVBoxLayout, QWidget, QLabel, QHBoxLayout, QDoubleSpinBox, QCheckBox, QGroupBox, QComboBox, QPushButton, QSpinBox
 from PyQt5.QtCore import Qt
 from opengl_widget import OpenGLWidget
+from model_loader import ModelLoader, SceneLoader, TopologyChecker
+from mesh_cache import MeshCache
+from file_watcher import FileWatcher
+from recent_models import MEGABYTE, RecentModels
+from mesh_builder import DEFAULT_BUILD_OPTIONS
+from vertex_cache import OPTIMIZE_MODES
+import load_profile
 from apply_dark_theme import apply_dark_theme
 from PyQt5.QtGui import QFont,  QIcon
 
+HUD_PROFILE_STAGES = 8  # The slowest load stages are listed in the HUD
+
 
 class SimpleObjViewer(QMainWindow):
     def __init__(self):
@@ -16,11 +30,112 @@ class SimpleObjViewer(QMainWindow):
         self.setWindowIcon(QIcon('graphics/icon.png'))  
         self.near_clip = 0.1
         self.far_clip = 100.0
-        self.init_gui()
         self.obj_file = None
+        # Normal generation settings for files without vn records, see normals.py, and the vertex
+        # cache reordering, see vertex_cache.py
+        self.build_options = dict(DEFAULT_BUILD_OPTIONS)
+        self.model_loader = ModelLoader(self, MeshCache())
+        self.model_loader.progress.connect(self.update_load_progress)
+        self.model_loader.loaded.connect(self.on_model_loaded)
+        self.model_loader.lods_ready.connect(self.on_lods_ready)
+        self.model_loader.bvh_ready.connect(self.on_bvh_ready)
+        self.model_loader.stream_started.connect(self.on_stream_started)
+        self.model_loader.stream_block.connect(self.on_stream_block)
+        self.model_loader.stream_finished.connect(self.on_stream_finished)
+        self.model_loader.profiled.connect(self.on_load_profiled)
+        self.load_profile = None  # LoadProfile of the last load, when profiling
+        self.model_loader.failed.connect(self.on_model_load_failed)
+        self.model_loader.cancelled.connect(self.on_model_load_cancelled)
+        self.scene_loader = SceneLoader(self, self.model_loader.cache)
+        self.scene_loader.progress.connect(self.update_scene_progress)
+        self.scene_loader.loaded.connect(self.on_scene_mesh_loaded)
+        self.scene_loader.failed.connect(self.on_scene_load_failed)
+        self.topology_checker = TopologyChecker(self)
+        self.format_frame_times = {}  # Vertex format -> (CPU, GPU) frame time percentiles when it was last left
+        self.order_frame_times = {}  # The same per triangle order of the displayed file, kept across its reloads
+        self.wireframe_frame_times = {}  # The same per wireframe path
+        self.file_watcher = FileWatcher(self)
+        self.file_watcher.changed.connect(self.on_watched_file_changed)
+        self.watch_file = False
+        self.pending_reload = None  # (file path, time its change was first seen) of a watched reload in progress
+        self.recent_models = RecentModels()
+        self.displayed_options = None  # build_options the displayed model was built with
+        self.displayed_signature = None  # file_signature of the displayed model's file when it was read
+        self.topology_checker.progress.connect(self.update_topology_progress)
+        self.topology_checker.validated.connect(self.on_topology_validated)
+        self.topology_checker.failed.connect(self.on_topology_failed)
+        self.init_gui()
+        self.model_loader.busy_changed.connect(self.cancel_load_action.setEnabled)
+        self.topology_checker.busy_changed.connect(lambda busy: self.validate_button.setEnabled(not busy))
+        self.scene_loader.busy_changed.connect(self.on_scene_busy_changed)
 
     def update_fps(self, fps):
         self.fps_label.setText(f"FPS: {fps:.2f}")
+
+    def update_frame_stats(self, stats):
+        self.cpu_time_label.setText(f"CPU ms: {self.format_percentiles(stats.cpu_percentiles())}")
+        self.gpu_time_label.setText(f"GPU ms: {self.format_percentiles(stats.gpu_percentiles())}")
+        self.update_vertex_format_hud()
+        self.update_vertex_cache_hud()
+        self.update_wireframe_hud()
+
+    def format_percentiles(self, values):
+        # p50 / p95 / p99
+        if values is None:
+            return "n/a"
+        return " / ".join(f"{value:.2f}" for value in values)
+
+    def toggle_continuous_redraw(self, state):
+        self.opengl_widget.set_continuous_redraw(state == Qt.Checked)
+
+    def toggle_frame_trace(self, state):
+        self.opengl_widget.frame_stats.set_recording(state == Qt.Checked)
+
+    def save_frame_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Frame Trace", "frame_trace.csv",
+                                                   "CSV Files (*.csv);;JSON Files (*.json)")
+        if file_path:
+            self.opengl_widget.frame_stats.save_trace(file_path)
+
+    def toggle_load_profiling(self, state):
+        # Applies from the next load on
+        self.model_loader.profile_loads = state == Qt.Checked
+        self.load_profile_header.setVisible(self.model_loader.profile_loads)
+        self.load_profile_label.setVisible(self.model_loader.profile_loads)
+        self.hud_widget.adjustSize()
+
+    def save_load_trace(self):
+        if self.load_profile is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Load Trace", "load_trace.json",
+                                                   "Chrome Trace (*.json);;JSON Lines (*.jsonl)")
+        if file_path:
+            self.load_profile.save(file_path)
+
+    def on_load_profiled(self, file_path, profile):
+        self.load_profile = profile
+        # The slowest stages in pipeline order; the saved trace has them all
+        rows = profile.summary()
+        slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:HUD_PROFILE_STAGES]
+        lines = [f"Total: {profile.total * 1000:.0f} ms in {len(rows)} stages"]
+        for name, seconds, allocated, counts in rows:
+            if (name, seconds, allocated, counts) not in slowest:
+                continue
+            line = f"{name}: {seconds * 1000:.0f} ms"
+            if allocated is not None:
+                line += f", {allocated / (1024 * 1024):.1f} MB"
+            counted = [f"{self.format_count(value)} {key}" for key, value in counts.items() if value]
+            if counted:
+                line += ", " + ", ".join(counted)
+            lines.append(line)
+        self.load_profile_label.setText("\n".join(lines))
+        self.hud_widget.adjustSize()
+
+    def format_count(self, value):
+        for limit, suffix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+            if value >= limit:
+                return f"{value / limit:.1f}{suffix}"
+        return str(value)
         
     
     def change_background_shade(self, value):
@@ -37,8 +152,119 @@ class SimpleObjViewer(QMainWindow):
         self.opengl_widget.change_far_clip(value)
 
     def toggle_wireframe_mode(self, state):
+        self.leave_wireframe_path()
         self.opengl_widget.set_wireframe_mode(state == Qt.Checked)
 
+    def toggle_single_pass_wireframe(self, state):
+        self.leave_wireframe_path()
+        self.opengl_widget.set_single_pass_wireframe(state == Qt.Checked)
+
+    def leave_wireframe_path(self):
+        # Keep the outgoing path's frame times and start a fresh window, as for vertex formats
+        stats = self.opengl_widget.frame_stats
+        self.wireframe_frame_times[self.opengl_widget.wireframe_path()] = (stats.cpu_percentiles(),
+                                                                           stats.gpu_percentiles())
+        stats.clear_times()
+
+    def update_wireframe_hud(self):
+        # How the wireframe is drawn, and p50 frame times of both paths once each has been drawn
+        path = self.opengl_widget.wireframe_path()
+        lines = [f"Wireframe: {path}"]
+        stats = self.opengl_widget.frame_stats
+        times = dict(self.wireframe_frame_times)
+        times[path] = (stats.cpu_percentiles(), stats.gpu_percentiles())
+        if "two-pass" in times and "single-pass" in times:
+            lines.append("p50 ms: " + ", ".join(f"{name} {self.format_p50(*times[name])}"
+                                                 for name in ("two-pass", "single-pass")))
+        text = "\n".join(lines)
+        if text != self.wireframe_label.text():
+            self.wireframe_label.setText(text)
+            self.hud_widget.adjustSize()
+
+    def toggle_shader_rendering(self, state):
+        self.opengl_widget.set_shader_rendering(state == Qt.Checked)
+
+    def toggle_compact_vertices(self, state):
+        # Keep the outgoing format's frame times and start a fresh window, so the two can be compared
+        stats = self.opengl_widget.frame_stats
+        self.format_frame_times[self.vertex_format_name()] = (stats.cpu_percentiles(), stats.gpu_percentiles())
+        stats.clear_times()
+        self.opengl_widget.set_compact_vertices(state == Qt.Checked)
+
+    def vertex_format_name(self):
+        return "compact" if self.opengl_widget.compact is not None else "float"
+
+    def on_vertex_format_changed(self, compact):
+        self.update_memory_hud(*self.opengl_widget.memory_totals())
+        self.update_vertex_format_hud()
+
+    def update_vertex_format_hud(self):
+        # Buffer size and quantization error of the model's vertices, and p50 frame times per format
+        megabyte = 1024 * 1024
+        compact = self.opengl_widget.compact
+        mesh = self.opengl_widget.mesh
+        if compact is not None:
+            lines = [f"Vertices: {compact.compact_bytes / megabyte:.2f} MB "
+                     f"(float {compact.float_bytes / megabyte:.2f} MB)",
+                     f"Error: {compact.position_error:.2g} units, {compact.normal_error:.3f}\u00b0"]
+        elif mesh is not None:
+            lines = [f"Vertices: float {mesh.vertex_data.nbytes / megabyte:.2f} MB"]
+        else:
+            lines = ["Vertices: float"]
+        stats = self.opengl_widget.frame_stats
+        times = dict(self.format_frame_times)
+        times[self.vertex_format_name()] = (stats.cpu_percentiles(), stats.gpu_percentiles())
+        if len(times) > 1:
+            lines.append("p50 ms: " + ", ".join(f"{name} {self.format_p50(*times[name])}"
+                                                 for name in ("float", "compact")))
+        text = "\n".join(lines)
+        if text != self.vertex_format_label.text():
+            self.vertex_format_label.setText(text)
+            self.hud_widget.adjustSize()
+
+    def change_vertex_order(self, text):
+        # Rebuilds the model in the new order; the outgoing order's frame times stay for comparison
+        stats = self.opengl_widget.frame_stats
+        self.order_frame_times[self.vertex_order_name()] = (stats.cpu_percentiles(), stats.gpu_percentiles())
+        self.build_options['optimize'] = None if text == "File" else text.lower()
+        self.reload_obj()
+
+    def vertex_order_name(self):
+        mesh = self.opengl_widget.mesh
+        return mesh.vertex_cache['mode'] if mesh is not None and mesh.vertex_cache else "file"
+
+    def reset_order_frame_times(self, file_path):
+        # Orders are only compared on one file, each over frames of its own
+        if file_path != self.obj_file:
+            self.order_frame_times.clear()
+        self.opengl_widget.frame_stats.clear_times()
+
+    def update_vertex_cache_hud(self):
+        # Simulated vertex cache efficiency of the displayed order, and p50 frame times per order
+        mesh = self.opengl_widget.mesh
+        if mesh is not None and mesh.vertex_cache:
+            info = mesh.vertex_cache
+            lines = [f"ACMR: {info['acmr_before']:.2f} \u2192 {info['acmr_after']:.2f}, "
+                     f"ATVR: {info['atvr_before']:.2f} \u2192 {info['atvr_after']:.2f} ({info['mode']})"]
+        else:
+            lines = ["Triangle order: file"]
+        stats = self.opengl_widget.frame_stats
+        times = dict(self.order_frame_times)
+        times[self.vertex_order_name()] = (stats.cpu_percentiles(), stats.gpu_percentiles())
+        if len(times) > 1:
+            lines.append("p50 ms: " + ", ".join(f"{name} {self.format_p50(*times[name])}"
+                                                 for name in ("file",) + OPTIMIZE_MODES if name in times))
+        text = "\n".join(lines)
+        if text != self.vertex_cache_label.text():
+            self.vertex_cache_label.setText(text)
+            self.hud_widget.adjustSize()
+
+    def format_p50(self, cpu, gpu):
+        # GPU time when the timer queries work, CPU time otherwise
+        if gpu is not None:
+            return f"{gpu[0]:.2f} GPU"
+        return f"{cpu[0]:.2f} CPU" if cpu is not None else "n/a"
+
     def change_wireframe_thickness(self, value):
         self.opengl_widget.set_wireframe_thickness(value)
 
@@ -50,6 +276,13 @@ class SimpleObjViewer(QMainWindow):
     def init_gui(self):
         self.opengl_widget = OpenGLWidget(self)
         self.opengl_widget.fps_updated.connect(self.update_fps)
+        self.opengl_widget.frame_stats_updated.connect(self.update_frame_stats)
+        self.opengl_widget.lod_changed.connect(self.update_lod_hud)
+        self.opengl_widget.culling_changed.connect(self.update_culling_hud)
+        self.opengl_widget.picked.connect(self.update_pick_hud)
+        self.opengl_widget.scene_drawn.connect(self.update_scene_hud)
+        self.opengl_widget.vertex_format_changed.connect(self.on_vertex_format_changed)
+        self.opengl_widget.model_drawn.connect(self.on_model_drawn)
         self.setCentralWidget(self.opengl_widget)
         self.resize(1280, 720)
         self.create_menu_bar()
@@ -66,18 +299,317 @@ class SimpleObjViewer(QMainWindow):
         file_menu = menu_bar.addMenu("File")
         open_action = file_menu.addAction("Open")
         open_action.triggered.connect(self.load_obj)
+        self.cancel_load_action = file_menu.addAction("Cancel Loading")
+        self.cancel_load_action.setShortcut(Qt.Key_Escape)
+        self.cancel_load_action.setEnabled(False)
+        self.cancel_load_action.triggered.connect(self.model_loader.cancel)
+        add_to_scene_action = file_menu.addAction("Add to Scene...")
+        add_to_scene_action.triggered.connect(self.add_to_scene)
+        self.recent_menu = file_menu.addMenu("Recent")
+        self.recent_menu.aboutToShow.connect(self.populate_recent_menu)
+        watch_action = file_menu.addAction("Watch for Changes")
+        watch_action.setCheckable(True)
+        watch_action.toggled.connect(self.toggle_watch_file)
 
     def load_obj(self):
-        self.obj_file, _ = QFileDialog.getOpenFileName(self, "Open OBJ File", "", "OBJ Files (*.obj)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open OBJ File", "", "OBJ Files (*.obj)")
+        if file_path:
+            self.open_file(file_path)
+
+    def open_file(self, file_path):
+        # A recently displayed model comes back from memory; anything else is parsed on a worker
+        # thread, cancelling a load already in progress
+        self.pending_reload = None
+        buffers, outdated = self.recent_models.take(file_path, self.build_options)
+        if outdated is not None:
+            self.opengl_widget.release_model(outdated)
+        if buffers is None:
+            self.model_loader.load(file_path, self.build_options)
+        else:
+            self.switch_to_model(file_path, buffers)
+        self.update_recent_hud()
+
+    def switch_to_model(self, file_path, buffers):
+        start = time.perf_counter()
+        self.model_loader.stop_current()
+        self.stash_displayed_model()
+        self.opengl_widget.attach_model(buffers)
+        self.reset_order_frame_times(file_path)
+        self.obj_file = file_path
+        self.displayed_options = dict(self.build_options)
+        self.displayed_signature = buffers.signature
+        self.format_frame_times.clear()
+        self.wireframe_frame_times.clear()
+        if self.watch_file:
+            self.file_watcher.watch(file_path)
+        self.topology_checker.cancel()
+        self.topology_label.setText("Not validated")
+        self.update_hud(*self.opengl_widget.model_counts())
+        self.update_memory_hud(*self.opengl_widget.memory_totals())
+        self.load_status_label.setText(f"Switched in {(time.perf_counter() - start) * 1000.0:.1f} ms "
+                                       f"({'GPU' if buffers.resident else 'RAM'})")
+
+    def stash_displayed_model(self):
+        # Keeps the model being replaced in the recent list, releasing whatever goes over budget
+        if self.obj_file is None or self.displayed_options is None:
+            return
+        buffers = self.opengl_widget.detach_model()
+        if buffers is not None:
+            buffers.signature = self.displayed_signature
+            self.apply_evictions(*self.recent_models.put(self.obj_file, self.displayed_options, buffers))
+        self.displayed_options = None
+
+    def apply_evictions(self, released, dropped):
+        for buffers in released + dropped:
+            self.opengl_widget.release_model(buffers)
+        self.update_recent_hud()
+
+    def change_recent_budget(self, gpu_mb, cpu_mb):
+        self.recent_models.gpu_budget = int(gpu_mb * MEGABYTE)
+        self.recent_models.cpu_budget = int(cpu_mb * MEGABYTE)
+        self.apply_evictions(*self.recent_models.enforce_budgets())
+
+    def populate_recent_menu(self):
+        self.recent_menu.clear()
+        recent = self.recent_models.recent()
+        for file_path, resident in recent:
+            action = self.recent_menu.addAction(f"{os.path.basename(file_path)}  ({'GPU' if resident else 'RAM'})")
+            action.triggered.connect(lambda checked, file_path=file_path: self.open_file(file_path))
+        if not recent:
+            self.recent_menu.addAction("No recent models").setEnabled(False)
+        self.recent_menu.addSeparator()
+        clear_action = self.recent_menu.addAction("Clear Recent")
+        clear_action.setEnabled(bool(recent))
+        clear_action.triggered.connect(self.clear_recent)
+
+    def clear_recent(self):
+        self.apply_evictions([], self.recent_models.clear())
+
+    def update_recent_hud(self):
+        recent = self.recent_models
+        self.recent_label.setText(
+            f"Recent: {recent.hits} hits, {recent.misses} misses, {len(recent)} kept\n"
+            f"GPU {recent.gpu_bytes / MEGABYTE:.1f} / {recent.gpu_budget / MEGABYTE:.0f} MB, "
+            f"RAM {recent.cpu_bytes / MEGABYTE:.1f} / {recent.cpu_budget / MEGABYTE:.0f} MB")
+
+    def reload_obj(self):
+        if self.obj_file:
+            self.open_file(self.obj_file)
+
+    def toggle_watch_file(self, checked):
+        self.watch_file = checked
+        if checked and self.obj_file:
+            self.file_watcher.watch(self.obj_file)
+        elif not checked:
+            self.file_watcher.stop()
+            self.reload_label.setText("")
+
+    def on_watched_file_changed(self, file_path, first_change):
+        # Reparse in the background and patch the GPU buffers in place, keeping the camera. Streamed
+        # models stream again, everything else comes back whole so its arrays can be compared.
+        if file_path != self.obj_file:
+            return
+        self.pending_reload = (file_path, first_change)
+        self.reload_label.setText("Reloading...")
+        self.model_loader.load(file_path, self.build_options, stream=self.opengl_widget.stream_buffer is not None)
+
+    def take_reload(self, file_path):
+        # Time the change of file_path was first seen when this load is a watched reload, else None
+        reload, self.pending_reload = self.pending_reload, None
+        return reload[1] if reload is not None and reload[0] == file_path else None
+
+    def show_reload(self, first_change, upload_ms, update=None):
+        text = f"Reload: {(time.perf_counter() - first_change) * 1000.0:.0f} ms after save, upload {upload_ms:.1f} ms"
+        if update is not None:
+            kilobyte = 1024
+            text += f"\n{update.ranges} ranges, {update.patched_bytes / kilobyte:.1f} KB patched"
+            if update.reallocated:
+                text += f", reallocated {', '.join(update.reallocated)}"
+        self.reload_label.setText(text)
+        self.hud_widget.adjustSize()
+
+    def change_normal_weighting(self, text):
+        self.build_options['normal_weighting'] = text.lower()
+        self.reload_obj()
+
+    def change_crease_angle(self, value: float):
+        # 0 disables the crease split and gives fully smooth normals
+        self.build_options['crease_angle'] = value if value > 0 else None
+        self.reload_obj()
+
+    def update_load_progress(self, percent, stage):
+        self.load_status_label.setText(f"Loading {percent}%: {stage}")
+
+    def on_model_loaded(self, file_path, mesh):
+        first_change = self.take_reload(file_path)
+        if first_change is None:
+            self.stash_displayed_model()
+        self.reset_order_frame_times(file_path)
+        self.obj_file = file_path
+        self.load_status_label.setText("")
+        self.format_frame_times.clear()
+        self.wireframe_frame_times.clear()
+        start = time.perf_counter()
+        with load_profile.activate(self.model_loader.active_profile()):
+            if first_change is not None:
+                update = self.opengl_widget.update_mesh(mesh)
+                self.show_reload(first_change, (time.perf_counter() - start) * 1000.0, update)
+            else:
+                self.opengl_widget.upload_mesh(mesh)
+        self.displayed_options = dict(self.model_loader.displayed.build_options)
+        self.displayed_signature = self.model_loader.displayed.signature
+        if self.watch_file:
+            self.file_watcher.watch(file_path)
+        self.topology_checker.cancel()
+        self.topology_label.setText("Not validated")
+        self.update_hud(*self.opengl_widget.model_counts())
+        self.update_memory_hud(*self.opengl_widget.memory_totals())
+
+    def add_to_scene(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Add OBJ Files to Scene", "", "OBJ Files (*.obj)")
+        if file_paths:
+            self.scene_loader.add(file_paths, lambda: list(self.opengl_widget.scene.meshes),
+                                  dict(self.build_options), self.copies_spinbox.value())
+
+    def clear_scene(self):
+        self.scene_loader.cancel()
+        self.opengl_widget.clear_scene()
+        self.refresh_scene_hud()
+
+    def update_scene_progress(self, percent, stage):
+        self.scene_status_label.setText(f"Adding {percent}%: {stage}")
+
+    def on_scene_mesh_loaded(self, file_path, key, mesh, copies):
+        self.opengl_widget.add_scene_mesh(key, file_path, mesh, copies)
+        self.refresh_scene_hud()
+
+    def on_scene_load_failed(self, file_path, message):
+        print(f'Could not add {file_path} to the scene: {message}')
+
+    def on_scene_busy_changed(self, busy):
+        if not busy:
+            self.refresh_scene_hud()
+
+    def refresh_scene_hud(self):
+        scene = self.opengl_widget.scene
+        self.scene_status_label.setText(f"{scene.instance_count} instances of {len(scene.meshes)} meshes")
+        self.update_scene_hud(*self.opengl_widget.scene_stats)
+        self.update_hud(*self.opengl_widget.model_counts())
+        self.update_memory_hud(*self.opengl_widget.memory_totals())
+
+    def update_scene_hud(self, drawn, calls):
+        scene = self.opengl_widget.scene
+        if not scene.meshes:
+            self.scene_label.setText("Scene: empty")
+            return
+        self.scene_label.setText(f"Scene: {drawn} of {scene.instance_count} drawn, {len(scene.meshes)} meshes, {calls} calls")
+
+    def validate_topology(self):
         if self.obj_file:
-            self.opengl_widget.load_model(self.obj_file)
-            self.update_hud(self.opengl_widget.vertex_count, 
-                self.opengl_widget.edge_count, 
-                self.opengl_widget.face_count)
+            self.topology_checker.validate(self.obj_file)
+
+    def update_topology_progress(self, percent, stage):
+        self.topology_label.setText(f"Validating {percent}%: {stage}")
+
+    def on_topology_validated(self, file_path, report):
+        if file_path != self.obj_file:
+            return
+        self.topology_label.setText("\n".join(f"{name.capitalize()}: {count}" for name, count in report.summary().items()))
+        self.opengl_widget.set_topology_report(report)
+
+    def on_topology_failed(self, file_path, message):
+        self.topology_label.setText(f"Validation failed: {message}")
+
+    def toggle_topology_overlay(self, state):
+        self.opengl_widget.set_topology_overlay(state == Qt.Checked)
+
+    def on_stream_started(self, file_path, scan):
+        # Large files arrive progressively; the model grows on screen as blocks are uploaded
+        first_change = self.take_reload(file_path)
+        if first_change is None:
+            self.stash_displayed_model()
+        self.displayed_options = None  # Streamed models are not kept
+        self.reset_order_frame_times(file_path)
+        self.obj_file = file_path
+        self.format_frame_times.clear()
+        self.wireframe_frame_times.clear()
+        start = time.perf_counter()
+        with load_profile.activate(self.model_loader.active_profile()):
+            self.opengl_widget.begin_stream(scan, focus=first_change is None)
+        if first_change is not None:
+            self.show_reload(first_change, (time.perf_counter() - start) * 1000.0)
+        if self.watch_file:
+            self.file_watcher.watch(file_path)
+        self.topology_checker.cancel()
+        self.topology_label.setText("Not validated")
+        self.update_hud(*self.opengl_widget.model_counts())
+        self.update_memory_hud(*self.opengl_widget.memory_totals())
+        self.update_vertex_format_hud()
+
+    def on_stream_block(self, file_path, block):
+        with load_profile.activate(self.model_loader.active_profile()):
+            self.opengl_widget.append_stream(block)
+
+    def on_stream_finished(self, file_path):
+        self.load_status_label.setText("")
+
+    def on_lods_ready(self, file_path, lods):
+        self.opengl_widget.upload_lods(lods)
+        self.update_memory_hud(*self.opengl_widget.memory_totals())
+
+    def on_bvh_ready(self, file_path, bvh):
+        self.opengl_widget.set_bvh(bvh)
+
+    def update_pick_hud(self, pick):
+        if pick is None:
+            self.pick_face_label.setText("Face: -")
+            self.pick_vertex_label.setText("Vertex: -")
+            self.pick_edge_label.setText("Edge: -")
+            return
+        x, y, z = pick.vertex_position
+        self.pick_face_label.setText(f"Face: {pick.face}")
+        self.pick_vertex_label.setText(f"Vertex: {pick.vertex} ({x:.3f}, {y:.3f}, {z:.3f})")
+        self.pick_edge_label.setText(f"Edge: {pick.edge[0]} - {pick.edge[1]}")
+
+    def toggle_hover_picking(self, state):
+        self.opengl_widget.set_hover_picking(state == Qt.Checked)
+
+    def update_lod_hud(self, level, triangles):
+        self.lod_label.setText(f"LOD {level}: {triangles} tris")
+
+    def update_culling_hud(self, drawn, culled):
+        self.chunks_label.setText(f"Chunks: {drawn} drawn, {culled} culled")
+
+    def toggle_frustum_culling(self, state):
+        self.opengl_widget.set_frustum_culling(state == Qt.Checked)
+
+    def toggle_auto_lod(self, state):
+        self.opengl_widget.set_auto_lod(state == Qt.Checked)
+
+    def on_model_drawn(self):
+        if startup.first_model_frame():
+            QApplication.instance().quit()
+
+    def on_model_load_failed(self, file_path, message):
+        # A half-written file fails to parse; the next change of a watched file retries
+        self.pending_reload = None
+        self.load_status_label.setText(f"Load failed: {message}")
+        if startup.first_model_failed(message):
+            QApplication.instance().exit(1)
+
+    def on_model_load_cancelled(self, file_path):
+        self.load_status_label.setText("Loading cancelled")
+
+    def closeEvent(self, event):
+        self.file_watcher.stop()
+        self.model_loader.shutdown()
+        self.scene_loader.shutdown()
+        self.topology_checker.shutdown()
+        super(SimpleObjViewer, self).closeEvent(event)
 
     def init_hud(self):
         self.hud_widget = QWidget(self.opengl_widget)
-        self.hud_widget.setFixedSize(200, 150)  # Increase the height as needed
+        self.hud_widget.setFixedWidth(320)  # The height follows the visible sections
         self.hud_widget.move(0, 0)  # Position it on the top-left
         self.hud_widget.setAttribute(Qt.WA_TransparentForMouseEvents)
         self.hud_widget.setStyleSheet("background: transparent;")
@@ -106,6 +638,49 @@ class SimpleObjViewer(QMainWindow):
         self.faces_count_label.setStyleSheet("color: white;")
         self.hud_layout.addWidget(self.faces_count_label)
 
+        # Level of detail being drawn, see lod.py
+        self.lod_label = QLabel("LOD 0: 0 tris")
+        self.lod_label.setFont(QFont("Arial", 10))
+        self.lod_label.setStyleSheet("color: white;")
+        self.hud_layout.addWidget(self.lod_label)
+
+        # Spatial chunks inside and outside the view frustum, see culling.py
+        self.chunks_label = QLabel("Chunks: 0 drawn, 0 culled")
+        self.chunks_label.setFont(QFont("Arial", 10))
+        self.chunks_label.setStyleSheet("color: white;")
+        self.hud_layout.addWidget(self.chunks_label)
+
+        # Instances beside the main model, see scene.py
+        self.scene_label = QLabel("Scene: empty")
+        self.scene_label.setFont(QFont("Arial", 10))
+        self.scene_label.setStyleSheet("color: white;")
+        self.hud_layout.addWidget(self.scene_label)
+
+        # Separator
+        separator = QLabel(" ")
+        self.hud_layout.addWidget(separator)
+
+        # Header for the picked element; click the model, or hover with Hover Picking on
+        selection_header = QLabel("Selection")
+        selection_header.setFont(QFont("Arial", 10, QFont.Bold))
+        selection_header.setStyleSheet("color: yellow;")
+        self.hud_layout.addWidget(selection_header)
+
+        self.pick_face_label = QLabel("Face: -")
+        self.pick_face_label.setFont(QFont("Arial", 10))
+        self.pick_face_label.setStyleSheet("color: orange;")
+        self.hud_layout.addWidget(self.pick_face_label)
+
+        self.pick_vertex_label = QLabel("Vertex: -")
+        self.pick_vertex_label.setFont(QFont("Arial", 10))
+        self.pick_vertex_label.setStyleSheet("color: orange;")
+        self.hud_layout.addWidget(self.pick_vertex_label)
+
+        self.pick_edge_label = QLabel("Edge: -")
+        self.pick_edge_label.setFont(QFont("Arial", 10))
+        self.pick_edge_label.setStyleSheet("color: orange;")
+        self.hud_layout.addWidget(self.pick_edge_label)
+
         # Separator
         separator = QLabel(" ")
         self.hud_layout.addWidget(separator)
@@ -122,11 +697,85 @@ class SimpleObjViewer(QMainWindow):
         self.fps_label.setStyleSheet("color: lightblue;")
         self.hud_layout.addWidget(self.fps_label)
 
+        # Rolling p50 / p95 / p99 frame times
+        self.cpu_time_label = QLabel("CPU ms: n/a")
+        self.cpu_time_label.setFont(QFont("Arial", 10))
+        self.cpu_time_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.cpu_time_label)
+
+        self.gpu_time_label = QLabel("GPU ms: n/a")
+        self.gpu_time_label.setFont(QFont("Arial", 10))
+        self.gpu_time_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.gpu_time_label)
+
+        # Mesh bytes uploaded with indexed geometry, and what a flat triangle list would take
+        self.gpu_memory_label = QLabel("Mesh: 0 MB")
+        self.gpu_memory_label.setFont(QFont("Arial", 10))
+        self.gpu_memory_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.gpu_memory_label)
+
+        # Vertex buffer format, see vertex_format.py
+        self.vertex_format_label = QLabel("Vertices: float")
+        self.vertex_format_label.setFont(QFont("Arial", 10))
+        self.vertex_format_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.vertex_format_label)
+
+        # Triangle order and its simulated vertex cache efficiency, see vertex_cache.py
+        self.vertex_cache_label = QLabel("Triangle order: file")
+        self.vertex_cache_label.setFont(QFont("Arial", 10))
+        self.vertex_cache_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.vertex_cache_label)
+
+        # Wireframe path, see wireframe_geometry_shader_source in shaders.py
+        self.wireframe_label = QLabel("Wireframe: off")
+        self.wireframe_label.setFont(QFont("Arial", 10))
+        self.wireframe_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.wireframe_label)
+
+        # Background load progress, empty when idle
+        self.load_status_label = QLabel("")
+        self.load_status_label.setFont(QFont("Arial", 10))
+        self.load_status_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.load_status_label)
+
+        # Latency and buffer updates of the last reload of a watched file, empty when not watching
+        self.reload_label = QLabel("")
+        self.reload_label.setFont(QFont("Arial", 10))
+        self.reload_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.reload_label)
+
+        # Hits, misses and memory of the recently displayed models kept for switching back
+        self.recent_label = QLabel("")
+        self.recent_label.setFont(QFont("Arial", 10))
+        self.recent_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.recent_label)
+        self.update_recent_hud()
+
+        # Per-stage time, peak traced memory and element counts of the last load, see load_profile.py
+        self.load_profile_header = QLabel("Load Profile")
+        self.load_profile_header.setFont(QFont("Arial", 10, QFont.Bold))
+        self.load_profile_header.setStyleSheet("color: yellow;")
+        self.hud_layout.addWidget(self.load_profile_header)
+
+        self.load_profile_label = QLabel("No load profiled yet")
+        self.load_profile_label.setFont(QFont("Arial", 9))
+        self.load_profile_label.setStyleSheet("color: lightblue;")
+        self.hud_layout.addWidget(self.load_profile_label)
+
+        self.load_profile_header.setVisible(self.model_loader.profile_loads)
+        self.load_profile_label.setVisible(self.model_loader.profile_loads)
+        self.hud_widget.adjustSize()
+
     def update_hud(self, verts, edges, faces):
         self.vertex_count_label.setText(f"Verts: {verts}")
         self.edges_count_label.setText(f"Edges: {edges}")
         self.faces_count_label.setText(f"Faces: {faces}")
 
+    def update_memory_hud(self, uploaded_bytes, unindexed_bytes):
+        megabyte = 1024 * 1024
+        self.gpu_memory_label.setText(
+            f"Mesh: {uploaded_bytes / megabyte:.2f} MB (was {unindexed_bytes / megabyte:.2f} MB)")
+
     def create_dock_widgets(self):
         # Creating a dock widget
         dock = QDockWidget("Controls", self)
@@ -167,6 +816,11 @@ class SimpleObjViewer(QMainWindow):
         viewport_layout.addWidget(far_clip_label)
         viewport_layout.addWidget(far_clip_spinbox)
 
+        self.shader_checkbox = QCheckBox("Shader Rendering")
+        self.shader_checkbox.setChecked(True)
+        self.shader_checkbox.stateChanged.connect(self.toggle_shader_rendering)
+        viewport_layout.addWidget(self.shader_checkbox)
+
         viewport_group_box.setLayout(viewport_layout)
         layout.addWidget(viewport_group_box)
 
@@ -178,6 +832,20 @@ class SimpleObjViewer(QMainWindow):
         self.wireframe_checkbox.stateChanged.connect(self.toggle_wireframe_mode)
         geometry_layout.addWidget(self.wireframe_checkbox)
 
+        self.auto_lod_checkbox = QCheckBox("Automatic LOD")
+        self.auto_lod_checkbox.setChecked(True)
+        self.auto_lod_checkbox.stateChanged.connect(self.toggle_auto_lod)
+        geometry_layout.addWidget(self.auto_lod_checkbox)
+
+        self.frustum_culling_checkbox = QCheckBox("Frustum Culling")
+        self.frustum_culling_checkbox.setChecked(True)
+        self.frustum_culling_checkbox.stateChanged.connect(self.toggle_frustum_culling)
+        geometry_layout.addWidget(self.frustum_culling_checkbox)
+
+        self.hover_picking_checkbox = QCheckBox("Hover Picking")
+        self.hover_picking_checkbox.stateChanged.connect(self.toggle_hover_picking)
+        geometry_layout.addWidget(self.hover_picking_checkbox)
+
         wireframe_thickness_label = QLabel("Wireframe Thickness")
         self.wireframe_thickness_slider = QSlider(Qt.Horizontal)
         self.wireframe_thickness_slider.setMinimum(1)
@@ -187,9 +855,75 @@ class SimpleObjViewer(QMainWindow):
         geometry_layout.addWidget(wireframe_thickness_label)
         geometry_layout.addWidget(self.wireframe_thickness_slider)
 
+        self.single_pass_wireframe_checkbox = QCheckBox("Single-Pass Wireframe")
+        self.single_pass_wireframe_checkbox.setChecked(True)
+        self.single_pass_wireframe_checkbox.stateChanged.connect(self.toggle_single_pass_wireframe)
+        geometry_layout.addWidget(self.single_pass_wireframe_checkbox)
+
+        normals_label = QLabel("Generated Normals")
+        normals_combo = QComboBox()
+        normals_combo.addItems(["Area", "Angle", "Uniform"])
+        normals_combo.currentTextChanged.connect(self.change_normal_weighting)
+        geometry_layout.addWidget(normals_label)
+        geometry_layout.addWidget(normals_combo)
+
+        crease_label = QLabel("Crease Angle")
+        crease_spinbox = QDoubleSpinBox()
+        crease_spinbox.setRange(0.0, 180.0)
+        crease_spinbox.setSingleStep(5.0)
+        crease_spinbox.setSpecialValueText("Off")
+        crease_spinbox.setValue(0.0)
+        crease_spinbox.valueChanged.connect(self.change_crease_angle)
+        geometry_layout.addWidget(crease_label)
+        geometry_layout.addWidget(crease_spinbox)
+
         geometry_group_box.setLayout(geometry_layout)
         layout.addWidget(geometry_group_box)
 
+        # Topology
+        topology_group_box = QGroupBox("Topology")
+        topology_layout = QVBoxLayout()
+
+        self.validate_button = QPushButton("Validate Topology")
+        self.validate_button.clicked.connect(self.validate_topology)
+        topology_layout.addWidget(self.validate_button)
+
+        self.topology_label = QLabel("Not validated")
+        topology_layout.addWidget(self.topology_label)
+
+        topology_overlay_checkbox = QCheckBox("Show Topology Overlay")
+        topology_overlay_checkbox.setChecked(True)
+        topology_overlay_checkbox.stateChanged.connect(self.toggle_topology_overlay)
+        topology_layout.addWidget(topology_overlay_checkbox)
+
+        topology_group_box.setLayout(topology_layout)
+        layout.addWidget(topology_group_box)
+
+        # Scene
+        scene_group_box = QGroupBox("Scene")
+        scene_layout = QVBoxLayout()
+
+        copies_label = QLabel("Copies per File")
+        self.copies_spinbox = QSpinBox()
+        self.copies_spinbox.setRange(1, 1000)
+        self.copies_spinbox.setValue(1)
+        scene_layout.addWidget(copies_label)
+        scene_layout.addWidget(self.copies_spinbox)
+
+        add_to_scene_button = QPushButton("Add to Scene...")
+        add_to_scene_button.clicked.connect(self.add_to_scene)
+        scene_layout.addWidget(add_to_scene_button)
+
+        clear_scene_button = QPushButton("Clear Scene")
+        clear_scene_button.clicked.connect(self.clear_scene)
+        scene_layout.addWidget(clear_scene_button)
+
+        self.scene_status_label = QLabel("0 instances of 0 meshes")
+        scene_layout.addWidget(self.scene_status_label)
+
+        scene_group_box.setLayout(scene_layout)
+        layout.addWidget(scene_group_box)
+
         # HUD Control
         hud_group_box = QGroupBox("HUD Control")
         hud_layout = QVBoxLayout()
@@ -202,6 +936,62 @@ class SimpleObjViewer(QMainWindow):
         hud_group_box.setLayout(hud_layout)
         layout.addWidget(hud_group_box)
 
+        # Performance Controls
+        performance_group_box = QGroupBox("Performance")
+        performance_layout = QVBoxLayout()
+
+        continuous_redraw_checkbox = QCheckBox("Continuous Redraw")
+        continuous_redraw_checkbox.stateChanged.connect(self.toggle_continuous_redraw)
+        performance_layout.addWidget(continuous_redraw_checkbox)
+
+        frame_trace_checkbox = QCheckBox("Record Frame Trace")
+        frame_trace_checkbox.stateChanged.connect(self.toggle_frame_trace)
+        performance_layout.addWidget(frame_trace_checkbox)
+
+        save_trace_button = QPushButton("Save Frame Trace...")
+        save_trace_button.clicked.connect(self.save_frame_trace)
+        performance_layout.addWidget(save_trace_button)
+
+        profile_loads_checkbox = QCheckBox("Profile Loads")
+        profile_loads_checkbox.setChecked(self.model_loader.profile_loads)
+        profile_loads_checkbox.stateChanged.connect(self.toggle_load_profiling)
+        performance_layout.addWidget(profile_loads_checkbox)
+
+        save_load_trace_button = QPushButton("Save Load Trace...")
+        save_load_trace_button.clicked.connect(self.save_load_trace)
+        performance_layout.addWidget(save_load_trace_button)
+
+        recent_gpu_label = QLabel("Recent Models GPU Budget (MB)")
+        self.recent_gpu_spinbox = QSpinBox()
+        self.recent_gpu_spinbox.setRange(0, 65536)
+        self.recent_gpu_spinbox.setValue(self.recent_models.gpu_budget // MEGABYTE)
+        performance_layout.addWidget(recent_gpu_label)
+        performance_layout.addWidget(self.recent_gpu_spinbox)
+
+        recent_cpu_label = QLabel("Recent Models RAM Budget (MB)")
+        self.recent_cpu_spinbox = QSpinBox()
+        self.recent_cpu_spinbox.setRange(0, 262144)
+        self.recent_cpu_spinbox.setValue(self.recent_models.cpu_budget // MEGABYTE)
+        performance_layout.addWidget(recent_cpu_label)
+        performance_layout.addWidget(self.recent_cpu_spinbox)
+        for spinbox in (self.recent_gpu_spinbox, self.recent_cpu_spinbox):
+            spinbox.valueChanged.connect(
+                lambda _: self.change_recent_budget(self.recent_gpu_spinbox.value(), self.recent_cpu_spinbox.value()))
+
+        compact_vertices_checkbox = QCheckBox("Compact Vertices")
+        compact_vertices_checkbox.stateChanged.connect(self.toggle_compact_vertices)
+        performance_layout.addWidget(compact_vertices_checkbox)
+
+        vertex_order_label = QLabel("Triangle Order")
+        vertex_order_combo = QComboBox()
+        vertex_order_combo.addItems(["File", "Cache", "Overdraw"])
+        vertex_order_combo.currentTextChanged.connect(self.change_vertex_order)
+        performance_layout.addWidget(vertex_order_label)
+        performance_layout.addWidget(vertex_order_combo)
+
+        performance_group_box.setLayout(performance_layout)
+        layout.addWidget(performance_group_box)
+
         # Ensuring the layout expands from top to bottom
         layout.addStretch()
         controls_widget.setLayout(layout)
@@ -209,8 +999,13 @@ class SimpleObjViewer(QMainWindow):
         self.addDockWidget(Qt.RightDockWidgetArea, dock)
 
 if __name__ == "__main__":
+    startup.mark('imports')
     app = QApplication(sys.argv)
     apply_dark_theme(app)
+    startup.mark('QApplication')
     viewer = SimpleObjViewer()
+    startup.mark('main window')
     viewer.show()
+    if startup.options.file is not None:
+        viewer.open_file(startup.options.file)
     sys.exit(app.exec_())
\ No newline at end of file
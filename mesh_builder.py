@@ -0,0 +1,161 @@
+# mesh_builder.py
+# Turns parsed OBJ arrays into GPU-ready buffers: triangulated interleaved position/normal data, wireframe lines and the counts shown in the HUD.
+
+import os
+import numpy as np
+import load_profile
+from obj_parser import parse_obj, report_progress
+from obj_parallel import PARALLEL_MIN_FILE_SIZE, parse_obj_parallel, parse_workers
+from face_arrays import complete_faces, next_corners, triangle_edge_mask, triangle_faces, triangulate
+from normals import generate_normals
+from culling import chunk_bounds, chunk_order
+from vertex_cache import optimize_mesh
+
+# build_mesh's keyword arguments as the viewer starts with them; mesh_cache prewarms with these too
+DEFAULT_BUILD_OPTIONS = {'normal_weighting': 'area', 'crease_angle': None, 'optimize': None}
+
+
+class MeshData:
+    # Fields persisted by mesh_cache.py; bump CACHE_FORMAT_VERSION there when these change
+    ARRAY_FIELDS = ('vertex_data', 'indices', 'wireframe_indices', 'vertex_coords', 'chunk_offsets', 'chunk_bounds',
+                    'vertex_ids', 'triangle_faces', 'triangle_edges')
+    COUNT_FIELDS = ('vertex_count', 'edge_count', 'face_count', 'unindexed_bytes')
+    INFO_FIELDS = ('vertex_cache',)  # JSON values, or None
+
+    def __init__(self, vertex_data, indices, wireframe_indices, vertex_coords,
+                 vertex_count, edge_count, face_count, unindexed_bytes, chunk_offsets, chunk_bounds,
+                 vertex_ids, triangle_faces, triangle_edges, vertex_cache=None):
+        self.vertex_data = vertex_data  # (N * 6,) float32, position then normal per unique vertex
+        self.indices = indices  # uint16 or uint32, three per triangle, grouped by spatial chunk
+        # Chunk i owns indices[chunk_offsets[i]:chunk_offsets[i + 1]], inside the (2, 3) box chunk_bounds[i]
+        self.chunk_offsets = chunk_offsets
+        self.chunk_bounds = chunk_bounds
+        # CPU-only element lookup for picking: OBJ vertex behind each buffer vertex, OBJ face behind
+        # each triangle, and which triangle edges are face edges (see face_arrays.triangle_edge_mask)
+        self.vertex_ids = vertex_ids
+        self.triangle_faces = triangle_faces
+        self.triangle_edges = triangle_edges
+        self.wireframe_indices = wireframe_indices  # Same dtype, two per unique edge, into vertex_data
+        self.vertex_coords = vertex_coords
+        self.vertex_count = vertex_count
+        self.edge_count = edge_count
+        self.face_count = face_count
+        # Size of the same geometry as flat, non-indexed triangle and per-face line lists
+        self.unindexed_bytes = unindexed_bytes
+        # ACMR/ATVR before and after vertex_cache.optimize_mesh reordered the buffers, None if it did not
+        self.vertex_cache = vertex_cache
+
+    @property
+    def indexed_bytes(self):
+        return self.vertex_data.nbytes + self.indices.nbytes + self.wireframe_indices.nbytes
+
+
+def index_vertices(tri_vertices, tri_normals):
+    # Deduplicate (position, normal) pairs so every shared corner is stored once
+    keys = tri_vertices.astype(np.int64) << 32 | tri_normals
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    index_dtype = np.uint16 if len(unique_keys) <= 65536 else np.uint32
+    return unique_keys >> 32, unique_keys & 0xFFFFFFFF, inverse.astype(index_dtype)
+
+
+def unique_edges(face_vertices, face_offsets):
+    # (E, 2) position indices of every distinct face edge, lower index first, from sorted packed keys
+    start = face_vertices
+    end = face_vertices[next_corners(face_offsets)]
+    keys = np.unique(np.minimum(start, end).astype(np.int64) << 32 | np.maximum(start, end))
+    return np.stack([keys >> 32, keys & 0xFFFFFFFF], axis=1)
+
+
+def wireframe_indices(edges, vertex_ids, vertex_count, index_dtype):
+    # Point each edge endpoint at one vertex buffer entry holding that position. Edges touching a
+    # position no triangle uses (e.g. from two-corner faces) have nothing to index and are skipped.
+    position_to_vertex = np.full(vertex_count, -1, dtype=np.int64)
+    position_to_vertex[vertex_ids[::-1]] = np.arange(len(vertex_ids))[::-1]
+    ends = position_to_vertex[edges]
+    return ends[np.all(ends >= 0, axis=1)].astype(index_dtype).ravel()
+
+
+def build_mesh(obj, progress=None, normal_weighting='area', crease_angle=None, optimize=None):
+    # progress(percent, stage) is called between stages; building covers 70-100%.
+    # normal_weighting and crease_angle only apply when the file has no vn records (see normals.py).
+    # optimize is None or a vertex_cache.OPTIMIZE_MODES name to reorder the buffers for the GPU.
+    positions = obj.positions
+    face_vertices = obj.face_vertices
+    face_offsets = obj.face_offsets
+
+    normals = obj.normals
+    corner_normals = obj.face_normals
+    if len(normals) == 0:
+        report_progress(progress, 70, 'Generating normals')
+        normals, corner_normals = generate_normals(positions, face_vertices, face_offsets,
+                                                   normal_weighting, crease_angle)
+        load_profile.count(normals=len(normals))
+    else:
+        # Corners without a vn index fall back to the vertex index, as before
+        corner_normals = np.where(corner_normals < 0, face_vertices, corner_normals)
+
+    report_progress(progress, 80, 'Triangulating')
+    triangles = triangulate(face_offsets)
+    tri_vertices = face_vertices[triangles]
+    tri_normals = corner_normals[triangles]
+    valid = np.all((tri_vertices >= 0) & (tri_vertices < len(positions)) &
+                   (tri_normals >= 0) & (tri_normals < len(normals)), axis=1)
+    tri_vertices = tri_vertices[valid]
+    tri_normals = tri_normals[valid]
+    tri_faces = triangle_faces(face_offsets)[valid].astype(np.int32)
+    tri_edges = triangle_edge_mask(triangles[valid], face_offsets)
+    load_profile.count(triangles=len(tri_vertices))
+
+    report_progress(progress, 83, 'Chunking')
+    order, offsets = chunk_order(positions[tri_vertices])
+    tri_vertices = tri_vertices[order]
+    tri_normals = tri_normals[order].ravel()
+    tri_faces = tri_faces[order]
+    tri_edges = tri_edges[order]
+    bounds = chunk_bounds(positions[tri_vertices], offsets)
+    load_profile.count(chunks=len(offsets) - 1)
+    tri_vertices = tri_vertices.ravel()
+
+    report_progress(progress, 85, 'Indexing vertices')
+    vertex_ids, normal_ids, indices = index_vertices(tri_vertices, tri_normals)
+    vertex_data = np.empty((len(vertex_ids), 6), dtype=np.float32)
+    vertex_data[:, :3] = positions[vertex_ids]
+    vertex_data[:, 3:] = normals[normal_ids]
+    load_profile.count(vertices=len(vertex_ids))
+
+    report_progress(progress, 90, 'Building wireframe')
+    # Faces with an undefined vertex have no edges, as they have no generated normals
+    edges = unique_edges(*complete_faces(face_vertices, face_offsets, len(positions)))
+    load_profile.count(edges=len(edges))
+    float_size = np.dtype(np.float32).itemsize
+    mesh = MeshData(
+        vertex_data.ravel(),
+        indices,
+        wireframe_indices(edges, vertex_ids, len(positions), indices.dtype),
+        positions,
+        len(positions),
+        len(edges),
+        obj.face_count,
+        len(tri_vertices) * 6 * float_size + len(face_vertices) * 2 * 3 * float_size,
+        offsets * 3,
+        bounds,
+        vertex_ids.astype(np.int32),
+        tri_faces,
+        tri_edges,
+    )
+    if optimize:
+        report_progress(progress, 93, 'Optimizing vertex cache')
+        optimize_mesh(mesh, optimize)
+    report_progress(progress, 100, 'Done')
+    return mesh
+
+
+def load_obj(file_path, progress=None):
+    # Large files are parsed on every core (see obj_parallel.py)
+    if os.path.getsize(file_path) >= PARALLEL_MIN_FILE_SIZE and parse_workers() > 1:
+        return parse_obj_parallel(file_path, progress=progress)
+    return parse_obj(file_path, progress)
+
+
+def load_mesh(file_path, progress=None, **build_options):
+    return build_mesh(load_obj(file_path, progress), progress, **build_options)
@@ -0,0 +1,293 @@
+# mesh_cache.py
+# Persistent on-disk cache of GPU-ready mesh arrays, memory-mapped on reload so cached models skip OBJ parsing entirely.
+# Run as a script to prewarm the cache for a set of files or directories, list its contents, or clear it.
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import numpy as np
+from mesh_builder import DEFAULT_BUILD_OPTIONS, MeshData, load_mesh
+from lod import LOD_RATIOS, LodChain, build_lods
+from obj_parser import report_progress
+from vertex_cache import OPTIMIZE_MODES
+
+CACHE_FORMAT_VERSION = 7
+CACHE_MAGIC = b'MESHINSP'
+CACHE_SUFFIX = '.meshcache'
+SETTINGS_FILE = 'settings.json'  # Per cache directory: whether keys include a content hash
+ARRAY_ALIGNMENT = 64
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mesh_inspector')
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+HASH_BLOCK_SIZE = 16 * 1024 * 1024
+
+# File layout: magic, uint32 version, uint64 header length, JSON header, then 64-byte aligned raw arrays.
+# Array offsets in the header are relative to the first aligned byte after the header.
+PREAMBLE = struct.Struct('<8sIQ')
+
+
+def content_hash(file_path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def aligned(offset):
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+class MeshCache:
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, hash_contents=None):
+        # hash_contents None follows the cache directory's setting, so every user of one directory
+        # builds the same keys; True or False changes the setting
+        self.cache_dir = cache_dir or os.environ.get('MESH_INSPECTOR_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        settings = self.read_settings()
+        if hash_contents is not None and hash_contents != settings.get('hash_contents', False):
+            settings['hash_contents'] = hash_contents
+            self.write_settings(settings)
+        self.hash_contents = settings.get('hash_contents', False)
+
+    def read_settings(self):
+        try:
+            with open(os.path.join(self.cache_dir, SETTINGS_FILE)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_settings(self, settings):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, SETTINGS_FILE)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(settings, file)
+        os.replace(temporary_path, path)
+
+    def source_info(self, file_path):
+        stat = os.stat(file_path)
+        return {
+            'path': os.path.abspath(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_hash': content_hash(file_path) if self.hash_contents else None,
+        }
+
+    def entry_path(self, source, build_options=None):
+        key = json.dumps([CACHE_FORMAT_VERSION, source['path'], source['size'],
+                          source['mtime_ns'], source['content_hash'], build_options or {}], sort_keys=True)
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + CACHE_SUFFIX)
+
+    def load(self, file_path, progress=None, build_options=None):
+        # Returns the cached MeshData, or builds it from the OBJ file and stores it.
+        # build_options are passed to build_mesh and are part of the cache key.
+        source = self.source_info(file_path)
+        path = self.entry_path(source, build_options)
+        report_progress(progress, 0, 'Reading cache')
+        mesh = self.read(path)
+        if mesh is not None:
+            report_progress(progress, 100, 'Loaded from cache')
+            return mesh
+
+        mesh = load_mesh(file_path, progress, **(build_options or {}))
+        report_progress(progress, 100, 'Writing cache')
+        try:
+            self.store(path, source, mesh)
+        except OSError as error:
+            print(f'Mesh cache write failed: {error}')
+        return mesh
+
+    def contains(self, file_path, build_options=None):
+        return os.path.exists(self.entry_path(self.source_info(file_path), build_options))
+
+    def load_lods(self, file_path, mesh, progress=None, build_options=None):
+        # Returns the cached LodChain for a mesh loaded through load(), building and storing it
+        # if needed. None means the mesh is too small for LODs; that is not cached.
+        source = self.source_info(file_path)
+        path = self.entry_path(source, dict(build_options or {}, lod_ratios=LOD_RATIOS))
+        lods = self.read(path, LodChain)
+        if lods is not None:
+            return lods
+
+        lods = build_lods(mesh, progress)
+        if lods is not None:
+            try:
+                self.store(path, source, lods)
+            except OSError as error:
+                print(f'Mesh cache write failed: {error}')
+        return lods
+
+    def read(self, path, kind=MeshData):
+        # kind is MeshData or LodChain, whichever the entry at path was stored from
+        try:
+            with open(path, 'rb') as file:
+                magic, version, header_length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+                if magic != CACHE_MAGIC or version != CACHE_FORMAT_VERSION:
+                    return None
+                header = json.loads(file.read(header_length))
+        except (OSError, ValueError, struct.error):
+            return None
+
+        # A damaged or truncated entry is a miss; the caller rebuilds it over this one
+        data_start = aligned(PREAMBLE.size + header_length)
+        try:
+            fields = dict(header['counts'])
+            fields.update(header.get('info', {}))
+            for name, (dtype, shape, offset) in header['arrays'].items():
+                if int(np.prod(shape)) == 0:
+                    fields[name] = np.zeros(shape, dtype=dtype)
+                else:
+                    fields[name] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + offset,
+                                             shape=tuple(shape))
+            mesh = kind(**fields)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return None
+
+        # Refresh the entry's timestamp; eviction removes the least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return mesh
+
+    def store(self, path, source, mesh):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        arrays = {name: np.ascontiguousarray(getattr(mesh, name)) for name in type(mesh).ARRAY_FIELDS}
+
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = (array.dtype.str, list(array.shape), offset)
+            offset = aligned(offset + array.nbytes)
+        header = json.dumps({
+            'source': source,
+            'kind': type(mesh).__name__,
+            'created': time.time(),
+            'counts': {name: int(getattr(mesh, name)) for name in type(mesh).COUNT_FIELDS},
+            'info': {name: getattr(mesh, name) for name in getattr(type(mesh), 'INFO_FIELDS', ())},
+            'arrays': layout,
+        }).encode()
+        data_start = aligned(PREAMBLE.size + len(header))
+
+        # Write to a temporary file first so readers never see a partial entry
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(PREAMBLE.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, len(header)))
+            file.write(header)
+            for name, array in arrays.items():
+                file.seek(data_start + layout[name][2])
+                file.write(array.tobytes())
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def entries(self):
+        # (path, size, last used) for every cache file, least recently used first
+        if not os.path.isdir(self.cache_dir):
+            return []
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((path, stat.st_size, stat.st_mtime))
+        return sorted(found, key=lambda entry: entry[2])
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Still memory-mapped on platforms that forbid deleting open files
+            total -= size
+
+    def clear(self):
+        removed = 0
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def describe(self, path):
+        with open(path, 'rb') as file:
+            _, version, header_length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+            return version, json.loads(file.read(header_length))
+
+
+def find_obj_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith('.obj'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the Mesh Inspector mesh cache.')
+    parser.add_argument('--cache-dir', help=f'cache directory (default {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help='size budget; least recently used entries are evicted beyond it')
+    parser.add_argument('--hash', action=argparse.BooleanOptionalAction,
+                        help='key entries on a content hash of the file as well, for this cache directory and '
+                             'everything that uses it (the setting is kept)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    prewarm = commands.add_parser('prewarm', help='parse OBJ files (or directories of them) and their LODs into the cache')
+    prewarm.add_argument('paths', nargs='+')
+    prewarm.add_argument('--optimize', choices=OPTIMIZE_MODES,
+                         help='store the triangles reordered for the vertex cache, as the viewer\'s Triangle Order does')
+    commands.add_parser('list', help='show cached entries, least recently used first')
+    commands.add_parser('clear', help='delete every cache entry')
+    args = parser.parse_args(argv)
+
+    cache = MeshCache(args.cache_dir, int(args.max_mb * 1024 * 1024), args.hash)
+    if args.hash is not None:
+        print(f"Content hashing {'on' if cache.hash_contents else 'off'} for {cache.cache_dir}")
+    if args.command == 'prewarm':
+        failures = 0
+        build_options = dict(DEFAULT_BUILD_OPTIONS, optimize=args.optimize)
+        for file_path in find_obj_files(args.paths):
+            start = time.perf_counter()
+            try:
+                mesh = cache.load(file_path, None, build_options)
+                cache.load_lods(file_path, mesh, None, build_options)
+            except Exception as error:
+                failures += 1
+                print(f'{file_path}: failed: {error}')
+                continue
+            line = f'{file_path}: {mesh.face_count} faces, {time.perf_counter() - start:.2f} s'
+            if mesh.vertex_cache:
+                line += f", ACMR {mesh.vertex_cache['acmr_before']:.2f} -> {mesh.vertex_cache['acmr_after']:.2f}"
+            print(line)
+        return 1 if failures else 0
+    elif args.command == 'list':
+        for path, size, last_used in cache.entries():
+            try:
+                version, header = cache.describe(path)
+                description = f"v{version}  {header.get('kind', 'MeshData'):9}  {header['source']['path']}"
+            except (OSError, ValueError, KeyError, TypeError, AttributeError, struct.error):
+                description = f"damaged entry {os.path.basename(path)}"
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))}  "
+                  f"{size / (1024 * 1024):8.1f} MB  {description}")
+    elif args.command == 'clear':
+        print(f'Removed {cache.clear()} cache entries from {cache.cache_dir}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,579 @@
+# model_loader.py
+# Loads models on worker threads so parsing and mesh building never block the GUI; only the finished MeshData comes back to the GUI thread for GL upload.
+
+import os
+import threading
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+import load_profile
+import startup
+from load_profile import PROFILE_LOADS, LoadProfile
+from mesh_builder import load_mesh
+from lod import build_lods
+from picking import TriangleBVH
+from obj_parser import parse_obj
+from file_watcher import file_signature
+from scene import mesh_key
+from obj_stream import BLOCKS_IN_FLIGHT, STREAM_MEMORY_BUDGET, STREAM_MIN_FILE_SIZE, scan_obj, triangle_blocks
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class ModelLoadWorker(QObject):
+    # Every signal carries the load's generation so stale results can be recognised
+    progress = pyqtSignal(int, int, str)
+    loaded = pyqtSignal(int, object)
+    lods_ready = pyqtSignal(int, object)
+    bvh_ready = pyqtSignal(int, object)
+    stream_started = pyqtSignal(int, object)
+    stream_block = pyqtSignal(int, object)
+    stream_finished = pyqtSignal(int)
+    profiled = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, file_path, generation, cache=None, build_options=None, stream_budget=None, profile=None):
+        super(ModelLoadWorker, self).__init__()
+        self.file_path = file_path
+        self.generation = generation
+        self.cache = cache
+        self.build_options = build_options or {}
+        self.stream_budget = stream_budget  # Bytes; None never streams
+        self.cancel_requested = False
+        # Streamed blocks handed to the GUI and not yet uploaded; bounds the blocks alive at once
+        self.upload_slots = threading.Semaphore(BLOCKS_IN_FLIGHT)
+        self.profile = profile  # LoadProfile recording this load's stages, or None
+        self.signature = None  # file_signature of the file as it was before the loaded mesh was read
+
+    def cancel(self):
+        # Plain attribute write, read by the worker at its next progress checkpoint
+        self.cancel_requested = True
+
+    def report(self, percent, stage):
+        if self.cancel_requested:
+            raise LoadCancelled()
+        if self.profile is not None:
+            self.profile.mark(stage)
+        self.progress.emit(self.generation, percent, stage)
+
+    def mark(self, stage):
+        if self.profile is not None:
+            self.profile.mark(stage)
+
+    def should_stream(self):
+        # Big files that are not cached yet; a cached mesh maps from disk faster than streaming. A
+        # reordered model is built whole, as streamed triangles are drawn in file order.
+        if self.stream_budget is None or self.build_options.get('optimize') or \
+                os.path.getsize(self.file_path) < STREAM_MIN_FILE_SIZE:
+            return False
+        return self.cache is None or not self.cache.contains(self.file_path, self.build_options)
+
+    def block_uploaded(self):
+        self.upload_slots.release()
+
+    def run(self):
+        if self.profile is not None:
+            threading.current_thread().name = f'ModelLoader-{self.generation}'  # Labels the trace's thread
+        with load_profile.activate(self.profile):
+            self.run_load()
+        if self.profile is not None:
+            self.profile.mark(None)
+            self.profiled.emit(self.generation, self.profile)
+        self.finished.emit(self.generation)
+
+    def run_load(self):
+        try:
+            mesh = None
+            prefetched = startup.take_prefetch(self.file_path, self.build_options)
+            if prefetched is not None:
+                self.report(0, 'Loading (started at launch)')
+                mesh = prefetched.result()  # None when the file is to be streamed
+                self.signature = prefetched.signature
+            if mesh is None:
+                if self.should_stream():
+                    self.run_streaming()
+                    return
+                self.signature = file_signature(self.file_path)
+                if self.cache is not None:
+                    mesh = self.cache.load(self.file_path, self.report, self.build_options)
+                else:
+                    mesh = load_mesh(self.file_path, self.report, **self.build_options)
+        except LoadCancelled:
+            pass
+        except Exception as error:
+            self.failed.emit(self.generation, str(error))
+        else:
+            self.mark(None)
+            self.loaded.emit(self.generation, mesh)
+            self.run_bvh(mesh)
+            self.run_lods(mesh)
+
+    def run_streaming(self):
+        # Vertex tables first, then triangles block by block, each waiting for an upload slot.
+        # Streamed models skip the cache, LODs and picking, which all need the whole mesh.
+        try:
+            scan = scan_obj(self.file_path, self.stream_budget, self.report,
+                            self.build_options.get('normal_weighting', 'area'))
+            self.stream_started.emit(self.generation, scan)
+            for block in triangle_blocks(scan, self.report):
+                while not self.upload_slots.acquire(timeout=0.1):
+                    self.check_cancelled(100, 'Streaming')
+                self.stream_block.emit(self.generation, block)
+                del block
+        except LoadCancelled:
+            return
+        except Exception as error:
+            self.failed.emit(self.generation, str(error))
+            return
+        self.stream_finished.emit(self.generation)
+
+    def run_bvh(self, mesh):
+        # The model is already on screen; the picking tree and then the LOD levels follow on the
+        # same thread when ready
+        if self.cancel_requested:
+            return
+        self.mark('Building BVH')
+        try:
+            bvh = TriangleBVH(mesh)
+        except Exception as error:
+            print(f'Picking BVH build failed for {self.file_path}: {error}')
+            return
+        self.bvh_ready.emit(self.generation, bvh)
+
+    def run_lods(self, mesh):
+        self.mark('Building LODs')
+        try:
+            if self.cache is not None:
+                lods = self.cache.load_lods(self.file_path, mesh, self.check_cancelled, self.build_options)
+            else:
+                lods = build_lods(mesh, self.check_cancelled)
+        except LoadCancelled:
+            return
+        except Exception as error:
+            print(f'LOD build failed for {self.file_path}: {error}')
+            return
+        if lods is not None:
+            self.lods_ready.emit(self.generation, lods)
+
+    def check_cancelled(self, percent, stage):
+        if self.cancel_requested:
+            raise LoadCancelled()
+
+
+class ModelLoader(QObject):
+    # Starting a new load cancels the current one; results of superseded loads are dropped
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(str, object)
+    lods_ready = pyqtSignal(str, object)
+    bvh_ready = pyqtSignal(str, object)
+    stream_started = pyqtSignal(str, object)
+    stream_block = pyqtSignal(str, object)
+    stream_finished = pyqtSignal(str)
+    profiled = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+    cancelled = pyqtSignal(str)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, cache=None, stream_budget=STREAM_MEMORY_BUDGET):
+        super(ModelLoader, self).__init__(parent)
+        self.cache = cache  # Optional MeshCache consulted before parsing
+        self.stream_budget = stream_budget  # Memory budget for streaming big files, None to never stream
+        self.profile_loads = PROFILE_LOADS  # Record a LoadProfile for every load, see load_profile.py
+        self.generation = 0
+        self.current = None
+        self.displayed = None  # Worker whose model was delivered, possibly still building its LODs
+        self.running = {}  # generation -> (thread, worker), kept alive until the thread finishes
+
+    def is_loading(self):
+        return self.current is not None
+
+    def load(self, file_path, build_options=None, stream=True):
+        # build_options are keyword arguments for mesh_builder.build_mesh; stream=False always
+        # delivers a whole MeshData
+        self.stop_current()
+        self.generation += 1
+
+        thread = QThread()
+        profile = LoadProfile(file_path) if self.profile_loads else None
+        stream_budget = self.stream_budget if stream else None
+        worker = ModelLoadWorker(file_path, self.generation, self.cache, build_options, stream_budget, profile)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.on_progress)
+        worker.loaded.connect(self.on_loaded)
+        worker.lods_ready.connect(self.on_lods_ready)
+        worker.bvh_ready.connect(self.on_bvh_ready)
+        worker.stream_started.connect(self.on_stream_started)
+        worker.stream_block.connect(self.on_stream_block)
+        worker.stream_finished.connect(self.on_stream_finished)
+        worker.profiled.connect(self.on_profiled)
+        worker.failed.connect(self.on_failed)
+        worker.finished.connect(self.on_finished)
+
+        self.running[self.generation] = (thread, worker)
+        self.current = worker
+        thread.start()
+        self.busy_changed.emit(True)
+
+    def stop_current(self):
+        # The worker stops at its next checkpoint; anything it still emits is ignored
+        if self.displayed is not None:
+            self.displayed.cancel()
+            self.displayed = None
+        worker = self.current
+        if worker is not None:
+            worker.cancel()
+            self.current = None
+            self.busy_changed.emit(False)
+        return worker
+
+    def cancel(self):
+        worker = self.stop_current()
+        if worker is not None:
+            self.cancelled.emit(worker.file_path)
+
+    def shutdown(self):
+        # Called on exit: stop every worker and wait for its thread
+        self.stop_current()
+        for thread, worker in list(self.running.values()):
+            worker.cancel()
+            thread.quit()
+            thread.wait()
+        self.running.clear()
+
+    def active_profile(self):
+        # Profile of the load being parsed or, once delivered, of the displayed model, for the
+        # GUI-thread stages (upload) to record into
+        worker = self.current or self.displayed
+        return worker.profile if worker is not None else None
+
+    def is_current(self, generation):
+        return self.current is not None and self.current.generation == generation
+
+    @pyqtSlot(int, int, str)
+    def on_progress(self, generation, percent, stage):
+        if self.is_current(generation):
+            self.progress.emit(percent, stage)
+
+    @pyqtSlot(int, object)
+    def on_loaded(self, generation, mesh):
+        if self.is_current(generation):
+            file_path = self.current.file_path
+            self.displayed = self.current
+            self.current = None
+            self.busy_changed.emit(False)
+            self.loaded.emit(file_path, mesh)
+
+    @pyqtSlot(int, object)
+    def on_lods_ready(self, generation, lods):
+        if self.displayed is not None and self.displayed.generation == generation:
+            self.lods_ready.emit(self.displayed.file_path, lods)
+
+    @pyqtSlot(int, object)
+    def on_bvh_ready(self, generation, bvh):
+        if self.displayed is not None and self.displayed.generation == generation:
+            self.bvh_ready.emit(self.displayed.file_path, bvh)
+
+    @pyqtSlot(int, object)
+    def on_stream_started(self, generation, scan):
+        if self.is_current(generation):
+            self.stream_started.emit(self.current.file_path, scan)
+
+    @pyqtSlot(int, object)
+    def on_stream_block(self, generation, block):
+        # Receivers upload the block synchronously; its slot is then free for the next one
+        if self.is_current(generation):
+            self.stream_block.emit(self.current.file_path, block)
+        thread, worker = self.running.get(generation, (None, None))
+        if worker is not None:
+            worker.block_uploaded()
+
+    @pyqtSlot(int)
+    def on_stream_finished(self, generation):
+        if self.is_current(generation):
+            file_path = self.current.file_path
+            self.current = None
+            self.busy_changed.emit(False)
+            self.stream_finished.emit(file_path)
+
+    @pyqtSlot(int, object)
+    def on_profiled(self, generation, profile):
+        # Finished here on the GUI thread, after its upload stages. Failed and cancelled loads are
+        # reported too; superseded ones are only finished.
+        profile.finish()
+        if generation == self.generation:
+            self.profiled.emit(profile.label, profile)
+
+    @pyqtSlot(int, str)
+    def on_failed(self, generation, message):
+        if self.is_current(generation):
+            file_path = self.current.file_path
+            self.current = None
+            self.busy_changed.emit(False)
+            self.failed.emit(file_path, message)
+
+    @pyqtSlot(int)
+    def on_finished(self, generation):
+        thread, worker = self.running.pop(generation, (None, None))
+        if thread is not None:
+            thread.quit()
+            thread.wait()
+
+
+class TopologyWorker(QObject):
+    # Validation needs the OBJ face arrays, which cached meshes do not keep, so the file is parsed again
+    progress = pyqtSignal(int, int, str)
+    validated = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, file_path, generation):
+        super(TopologyWorker, self).__init__()
+        self.file_path = file_path
+        self.generation = generation
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def report_parse(self, percent, stage):
+        # Parsing is the first half of the run, validation the second
+        self.report(percent // 2, stage)
+
+    def report_validation(self, percent, stage):
+        self.report(50 + percent // 2, stage)
+
+    def report(self, percent, stage):
+        if self.cancel_requested:
+            raise LoadCancelled()
+        self.progress.emit(self.generation, percent, stage)
+
+    def run(self):
+        try:
+            from topology import validate_obj  # Not needed until the first validation
+            obj = parse_obj(self.file_path, self.report_parse)
+            report = validate_obj(obj, self.report_validation)
+        except LoadCancelled:
+            pass
+        except Exception as error:
+            self.failed.emit(self.generation, str(error))
+        else:
+            self.validated.emit(self.generation, report)
+        self.finished.emit(self.generation)
+
+
+class TopologyChecker(QObject):
+    # On-demand topology validation of the displayed file, one run at a time
+    progress = pyqtSignal(int, str)
+    validated = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super(TopologyChecker, self).__init__(parent)
+        self.generation = 0
+        self.current = None
+        self.running = {}  # generation -> (thread, worker), kept alive until the thread finishes
+
+    def validate(self, file_path):
+        self.cancel()
+        self.generation += 1
+
+        thread = QThread()
+        worker = TopologyWorker(file_path, self.generation)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.on_progress)
+        worker.validated.connect(self.on_validated)
+        worker.failed.connect(self.on_failed)
+        worker.finished.connect(self.on_finished)
+
+        self.running[self.generation] = (thread, worker)
+        self.current = worker
+        thread.start()
+        self.busy_changed.emit(True)
+
+    def cancel(self):
+        if self.current is not None:
+            self.current.cancel()
+            self.current = None
+            self.busy_changed.emit(False)
+
+    def shutdown(self):
+        self.cancel()
+        for thread, worker in list(self.running.values()):
+            worker.cancel()
+            thread.quit()
+            thread.wait()
+        self.running.clear()
+
+    def is_current(self, generation):
+        return self.current is not None and self.current.generation == generation
+
+    @pyqtSlot(int, int, str)
+    def on_progress(self, generation, percent, stage):
+        if self.is_current(generation):
+            self.progress.emit(percent, stage)
+
+    @pyqtSlot(int, object)
+    def on_validated(self, generation, report):
+        if self.is_current(generation):
+            file_path = self.current.file_path
+            self.current = None
+            self.busy_changed.emit(False)
+            self.validated.emit(file_path, report)
+
+    @pyqtSlot(int, str)
+    def on_failed(self, generation, message):
+        if self.is_current(generation):
+            file_path = self.current.file_path
+            self.current = None
+            self.busy_changed.emit(False)
+            self.failed.emit(file_path, message)
+
+    @pyqtSlot(int)
+    def on_finished(self, generation):
+        thread, worker = self.running.pop(generation, (None, None))
+        if thread is not None:
+            thread.quit()
+            thread.wait()
+
+
+class SceneLoadWorker(QObject):
+    # Loads a batch of files for the scene one after another. Files whose contents match a mesh
+    # already in the scene (or earlier in the batch) are not loaded again.
+    progress = pyqtSignal(int, int, str)
+    loaded = pyqtSignal(int, str, str, object)  # File path, mesh key, MeshData or None for a known key
+    failed = pyqtSignal(int, str, str)
+    finished = pyqtSignal(int)
+
+    def __init__(self, file_paths, generation, known_keys, cache=None, build_options=None):
+        super(SceneLoadWorker, self).__init__()
+        self.file_paths = file_paths
+        self.generation = generation
+        self.known_keys = set(known_keys)
+        self.cache = cache
+        self.build_options = build_options or {}
+        self.cancel_requested = False
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def check_cancelled(self, percent, stage):
+        if self.cancel_requested:
+            raise LoadCancelled()
+
+    def run(self):
+        for index, file_path in enumerate(self.file_paths):
+            if self.cancel_requested:
+                break
+            self.progress.emit(self.generation, 100 * index // len(self.file_paths), os.path.basename(file_path))
+            try:
+                key = mesh_key(file_path, self.build_options)
+                mesh = None
+                if key not in self.known_keys:
+                    if self.cache is not None:
+                        mesh = self.cache.load(file_path, self.check_cancelled, self.build_options)
+                    else:
+                        mesh = load_mesh(file_path, self.check_cancelled, **self.build_options)
+                    self.known_keys.add(key)
+            except LoadCancelled:
+                break
+            except Exception as error:
+                self.failed.emit(self.generation, file_path, str(error))
+                continue
+            self.loaded.emit(self.generation, file_path, key, mesh)
+        self.finished.emit(self.generation)
+
+
+class SceneLoader(QObject):
+    # Batches added while one is loading wait for it, so they see the keys it added
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(str, str, object, int)  # File path, mesh key, MeshData or None, copies
+    failed = pyqtSignal(str, str)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, cache=None):
+        super(SceneLoader, self).__init__(parent)
+        self.cache = cache
+        self.generation = 0
+        self.current = None
+        self.copies = 1
+        self.pending = []  # (file paths, build options, copies) waiting for the current batch
+        self.running = {}  # generation -> (thread, worker), kept alive until the thread finishes
+
+    def is_loading(self):
+        return self.current is not None
+
+    def add(self, file_paths, known_keys, build_options=None, copies=1):
+        # known_keys: callable returning the keys already in the scene when the batch starts
+        self.pending.append((list(file_paths), known_keys, build_options, copies))
+        if self.current is None:
+            self.start_next()
+
+    def start_next(self):
+        if not self.pending:
+            return
+        file_paths, known_keys, build_options, self.copies = self.pending.pop(0)
+        self.generation += 1
+
+        thread = QThread()
+        worker = SceneLoadWorker(file_paths, self.generation, known_keys(), self.cache, build_options)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self.on_progress)
+        worker.loaded.connect(self.on_loaded)
+        worker.failed.connect(self.on_failed)
+        worker.finished.connect(self.on_finished)
+
+        self.running[self.generation] = (thread, worker)
+        self.current = worker
+        thread.start()
+        self.busy_changed.emit(True)
+
+    def cancel(self):
+        self.pending.clear()
+        if self.current is not None:
+            self.current.cancel()
+            self.current = None
+            self.busy_changed.emit(False)
+
+    def shutdown(self):
+        self.cancel()
+        for thread, worker in list(self.running.values()):
+            worker.cancel()
+            thread.quit()
+            thread.wait()
+        self.running.clear()
+
+    def is_current(self, generation):
+        return self.current is not None and self.current.generation == generation
+
+    @pyqtSlot(int, int, str)
+    def on_progress(self, generation, percent, stage):
+        if self.is_current(generation):
+            self.progress.emit(percent, stage)
+
+    @pyqtSlot(int, str, str, object)
+    def on_loaded(self, generation, file_path, key, mesh):
+        if self.is_current(generation):
+            self.loaded.emit(file_path, key, mesh, self.copies)
+
+    @pyqtSlot(int, str, str)
+    def on_failed(self, generation, file_path, message):
+        if self.is_current(generation):
+            self.failed.emit(file_path, message)
+
+    @pyqtSlot(int)
+    def on_finished(self, generation):
+        thread, worker = self.running.pop(generation, (None, None))
+        if thread is not None:
+            thread.quit()
+            thread.wait()
+        if self.is_current(generation):
+            self.current = None
+            if self.pending:
+                self.start_next()
+            else:
+                self.busy_changed.emit(False)
@@ -0,0 +1,116 @@
+# normals.py
+# Generates smooth vertex normals for meshes without vn records, with selectable face weighting and an optional crease angle that keeps hard edges sharp.
+
+import numpy as np
+from face_arrays import complete_face_mask, complete_faces, corner_faces, next_corners, previous_corners, triangulate, normalize_rows
+
+WEIGHTINGS = ('uniform', 'area', 'angle')
+
+
+def cross_rows(a, b):
+    # np.cross without its generic broadcasting overhead
+    return np.stack([a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1],
+                     a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2],
+                     a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]], axis=1)
+
+
+def face_area_vectors(positions, face_vertices, face_offsets):
+    # Sum of the fan triangle cross products: twice the area along the face normal, even for ngons
+    triangles = face_vertices[triangulate(face_offsets)]
+    v0 = positions[triangles[:, 0]]
+    crosses = cross_rows(positions[triangles[:, 1]] - v0, positions[triangles[:, 2]] - v0)
+
+    tri_counts = np.maximum(np.diff(face_offsets) - 2, 0)
+    if np.all(tri_counts == 1):
+        return crosses
+    area_vectors = np.zeros((len(tri_counts), 3), dtype=crosses.dtype)
+    has_triangles = tri_counts > 0
+    first_tri = (np.cumsum(tri_counts) - tri_counts)[has_triangles]
+    area_vectors[has_triangles] = np.add.reduceat(crosses, first_tri, axis=0)
+    return area_vectors
+
+
+def corner_angles(positions, face_vertices, face_offsets):
+    here = positions[face_vertices]
+    to_next = here[next_corners(face_offsets)] - here
+    to_previous = here[previous_corners(face_offsets)] - here
+    lengths = np.sqrt(np.einsum('ij,ij->i', to_next, to_next) * np.einsum('ij,ij->i', to_previous, to_previous))
+    cosines = np.einsum('ij,ij->i', to_next, to_previous) / np.where(lengths > 0, lengths, 1)
+    return np.arccos(np.clip(cosines, -1.0, 1.0))
+
+
+def corner_weights(positions, face_vertices, face_offsets, weighting):
+    # Each corner contributes face_vectors[face] * corner_scale (corner_scale is None for 1)
+    area_vectors = face_area_vectors(positions, face_vertices, face_offsets)
+    if weighting == 'uniform':
+        return normalize_rows(area_vectors), None
+    elif weighting == 'area':
+        return area_vectors * 0.5, None
+    elif weighting == 'angle':
+        return normalize_rows(area_vectors), corner_angles(positions, face_vertices, face_offsets)
+    raise ValueError(f"Unknown normal weighting '{weighting}', expected one of {WEIGHTINGS}")
+
+
+def accumulate(targets, sources, vectors, count, scale=None):
+    # Sum vectors[sources] (optionally times scale) into count rows selected by targets,
+    # one axis at a time so every gather and bincount works on contiguous 1D arrays
+    columns = np.ascontiguousarray(vectors.T)
+    summed = np.empty((count, 3), dtype=np.float32)
+    for axis in range(3):
+        weights = columns[axis][sources]
+        if scale is not None:
+            weights *= scale
+        summed[:, axis] = np.bincount(targets, weights, minlength=count)
+    return summed
+
+
+def crease_split_normals(face_vertices, face_offsets, face_vectors, corner_scale, crease_angle):
+    # Each corner averages only the faces around its vertex within crease_angle of its own face.
+    # Corners are grouped by vertex and every pair inside a group is tested, so cost grows with valence squared.
+    owner = corner_faces(face_offsets)
+    unit_normals = normalize_rows(face_vectors)
+    order = np.argsort(face_vertices, kind='stable')
+    sorted_vertices = face_vertices[order]
+    group_starts = np.flatnonzero(np.concatenate([[True], sorted_vertices[1:] != sorted_vertices[:-1]]))
+    group_sizes = np.diff(np.append(group_starts, len(order)))
+    corner_group_start = np.repeat(group_starts, group_sizes)
+    corner_group_size = np.repeat(group_sizes, group_sizes)
+
+    pair_first = np.repeat(np.arange(len(order)), corner_group_size)
+    pair_offsets = np.cumsum(corner_group_size) - corner_group_size
+    pair_second = corner_group_start[pair_first] + np.arange(len(pair_first)) - pair_offsets[pair_first]
+    first = order[pair_first]
+    second = order[pair_second]
+
+    similarity = np.einsum('ij,ij->i', unit_normals[owner[first]], unit_normals[owner[second]])
+    keep = similarity >= np.cos(np.radians(crease_angle))
+    first = first[keep]
+    second = second[keep]
+    scale = corner_scale[second] if corner_scale is not None else None
+    normals = normalize_rows(accumulate(first, owner[second], face_vectors, len(face_vertices), scale))
+
+    # Corners of one vertex that ended up with the same normal share a vertex buffer entry
+    rows = np.column_stack([face_vertices.astype(np.float64), normals]).view(np.dtype((np.void, 32))).ravel()
+    _, first_seen, corner_normal_ids = np.unique(rows, return_index=True, return_inverse=True)
+    return normals[first_seen], corner_normal_ids
+
+
+def generate_normals(positions, face_vertices, face_offsets, weighting='area', crease_angle=None):
+    # Returns (normals, corner_normal_ids): the normal array and, per face corner, the row it uses.
+    # Without a crease angle there is one normal per vertex, so corner_normal_ids is face_vertices.
+    # Faces referencing missing vertices add nothing, and their corners get -1.
+    complete = complete_face_mask(face_vertices, face_offsets, len(positions))
+    if not np.all(complete):
+        kept_vertices, kept_offsets = complete_faces(face_vertices, face_offsets, len(positions))
+        normals, kept_ids = generate_normals(positions, kept_vertices, kept_offsets, weighting, crease_angle)
+        kept = np.repeat(complete, np.diff(face_offsets))
+        corner_normal_ids = np.full(len(face_vertices), -1, dtype=np.int64)
+        corner_normal_ids[kept] = kept_ids
+        return normals, corner_normal_ids
+
+    face_vectors, corner_scale = corner_weights(positions, face_vertices, face_offsets, weighting)
+    if crease_angle is not None:
+        return crease_split_normals(face_vertices, face_offsets, face_vectors, corner_scale, crease_angle)
+
+    owner = corner_faces(face_offsets)
+    return normalize_rows(accumulate(face_vertices, owner, face_vectors, len(positions), corner_scale)), face_vertices
@@ -0,0 +1,127 @@
+# obj_parallel.py
+# Parses one OBJ file on several processes: the memory-mapped file is split into line-aligned byte ranges, each parsed
+# by obj_parser in a worker. Workers hand their arrays back through shared memory instead of pickling them.
+
+import mmap
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from obj_parser import ObjData, count_record_lines, parse_obj, parse_obj_bytes, report_progress
+
+PARALLEL_MIN_FILE_SIZE = 64 * 1024 * 1024  # Smaller files parse faster than a pool starts
+RANGES_PER_WORKER = 2
+OBJ_FIELDS = ('positions', 'normals', 'texcoords', 'face_vertices', 'face_normals', 'face_texcoords', 'face_offsets')
+
+
+def parse_workers():
+    return int(os.environ.get('MESH_INSPECTOR_PARSE_WORKERS', os.cpu_count() or 1))
+
+
+def line_ranges(data, count):
+    # Up to count (start, end) byte ranges of data, each ending just after a newline (or at the end)
+    size = len(data)
+    bounds = [0]
+    for part in range(1, count):
+        cut = data.find(b'\n', max(bounds[-1], size * part // count)) + 1
+        if cut <= bounds[-1] or cut >= size:
+            continue
+        bounds.append(cut)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_range(file_path, start, end):
+    with open(file_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[start:end]
+
+
+def count_records(file_path, start, end):
+    # (v, vt, vn) record counts of a range, so the next ranges can resolve relative indices
+    return count_record_lines(read_range(file_path, start, end))
+
+
+def parse_range(file_path, start, end, records_before):
+    # Runs in a worker: parse a range and copy its arrays into one new shared memory segment.
+    # Returns the segment name and (field, dtype, shape, byte offset) of every array in it.
+    obj = parse_obj_bytes(read_range(file_path, start, end), None, records_before)
+    arrays = [np.ascontiguousarray(getattr(obj, field)) for field in OBJ_FIELDS]
+    layout = []
+    offset = 0
+    for field, array in zip(OBJ_FIELDS, arrays):
+        layout.append((field, array.dtype.str, array.shape, offset))
+        offset += (array.nbytes + 63) // 64 * 64
+    segment = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (_, _, _, field_offset), array in zip(layout, arrays):
+        np.ndarray(array.shape, array.dtype, segment.buf, field_offset)[...] = array
+    segment.close()
+    return segment.name, layout
+
+
+def attach(name):
+    # Open a worker's segment and unlink it at once; the mapping stays valid until closed
+    segment = shared_memory.SharedMemory(name=name)
+    segment.unlink()
+    return segment
+
+
+def segment_arrays(segment, layout):
+    return {field: np.ndarray(shape, np.dtype(dtype), segment.buf, offset) for field, dtype, shape, offset in layout}
+
+
+def merge_parts(parts):
+    # One ObjData from per-range arrays in file order; face offsets are shifted to the merged corners
+    merged = {field: np.concatenate([part[field] for part in parts]) for field in OBJ_FIELDS if field != 'face_offsets'}
+    corner_bases = np.cumsum([0] + [len(part['face_vertices']) for part in parts])
+    merged['face_offsets'] = np.concatenate([part['face_offsets'][:-1] + base for part, base in zip(parts, corner_bases)] +
+                                            [corner_bases[-1:]])
+    return ObjData(*[merged[field] for field in OBJ_FIELDS])
+
+
+def parse_obj_parallel(file_path, workers=None, progress=None):
+    # parse_obj on `workers` processes (default: MESH_INSPECTOR_PARSE_WORKERS or every core).
+    # Relative indices resolve against the records counted in all earlier ranges, so the result
+    # matches parse_obj exactly. Reports 0-70% like reading plus parsing.
+    workers = workers or parse_workers()
+    size = os.path.getsize(file_path)
+    if workers < 2 or size == 0:
+        return parse_obj(file_path, progress)
+
+    with open(file_path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            ranges = line_ranges(data, workers * RANGES_PER_WORKER)
+
+    # Spawned workers, since forking a process that runs Qt threads is unsafe
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    futures = {}
+    results = {}
+    try:
+        report_progress(progress, 5, 'Counting records')
+        counts = list(executor.map(count_records, *zip(*[(file_path, start, end) for start, end in ranges])))
+        records_before = np.cumsum([(0, 0, 0)] + counts, axis=0)
+
+        report_progress(progress, 15, 'Parsing')
+        futures = {executor.submit(parse_range, file_path, start, end, tuple(int(n) for n in records_before[index])): index
+                   for index, (start, end) in enumerate(ranges)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            report_progress(progress, 15 + int(55 * len(results) / len(ranges)), 'Parsing')
+    except BaseException:
+        # Failed or cancelled: wait for the ranges already running, then free every segment made
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future in futures:
+            if not future.cancelled() and future.exception() is None:
+                attach(future.result()[0]).close()
+        raise
+    executor.shutdown()
+
+    # Merged straight from the shared views, so each range is copied once
+    segments = [attach(results[index][0]) for index in range(len(ranges))]
+    parts = [segment_arrays(segment, results[index][1]) for index, segment in enumerate(segments)]
+    obj = merge_parts(parts)
+    del parts
+    for segment in segments:
+        segment.close()
+    return obj
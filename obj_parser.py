@@ -0,0 +1,258 @@
+# obj_parser.py
+# Parses Wavefront OBJ files in a single read, turning the v/vn/vt/f records into typed NumPy arrays without a per-line Python loop.
+
+import os
+import numpy as np
+import load_profile
+
+NEWLINE = ord('\n')
+SLASH = ord('/')
+SPACE = ord(' ')
+HASH = ord('#')
+READ_BLOCK_SIZE = 16 * 1024 * 1024
+# Line starts classify_lines treats as v, vt and vn records when they are not indented: the keyword and then whitespace
+RECORD_PREFIXES = tuple(tuple(b'\n' + keyword + space for space in (b' ', b'\t', b'\r')) for keyword in (b'v', b'vt', b'vn'))
+
+
+class ObjData:
+    def __init__(self, positions, normals, texcoords, face_vertices, face_normals, face_texcoords, face_offsets):
+        self.positions = positions  # (V, 3) float32
+        self.normals = normals  # (N, 3) float32
+        self.texcoords = texcoords  # (T, 2) float32
+        # One entry per face corner, zero based. -1 marks a missing normal/texcoord index.
+        self.face_vertices = face_vertices
+        self.face_normals = face_normals
+        self.face_texcoords = face_texcoords
+        # Face i owns corners face_offsets[i]:face_offsets[i + 1]
+        self.face_offsets = face_offsets
+
+    @property
+    def face_sizes(self):
+        return np.diff(self.face_offsets)
+
+    @property
+    def face_count(self):
+        return len(self.face_offsets) - 1
+
+
+def is_whitespace(chars):
+    return (chars == SPACE) | (chars == ord('\t')) | (chars == ord('\r'))
+
+
+def classify_lines(buf):
+    # buf always ends with a newline, so every line has a terminator we can index. Returns line
+    # starts and ends, where each line's keyword starts, and a mask per record kind.
+    ends = np.flatnonzero(buf == NEWLINE)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    # Indented lines: step their keyword start past the whitespace, one byte at a time for the
+    # few that need it. The newline is not whitespace, so it stops every line.
+    keywords = starts.copy()
+    pending = np.flatnonzero(is_whitespace(buf[keywords]))
+    while len(pending):
+        keywords[pending] += 1
+        pending = pending[is_whitespace(buf[keywords[pending]])]
+    lengths = ends - keywords
+
+    # Look at the first three bytes of every keyword; short lines read their own newline or beyond
+    padded = np.concatenate([buf, np.zeros(3, dtype=np.uint8)])
+    c0 = padded[keywords]
+    c1 = padded[keywords + 1]
+    c2 = padded[keywords + 2]
+
+    is_v = (lengths >= 2) & (c0 == ord('v')) & is_whitespace(c1)
+    is_vn = (lengths >= 3) & (c0 == ord('v')) & (c1 == ord('n')) & is_whitespace(c2)
+    is_vt = (lengths >= 3) & (c0 == ord('v')) & (c1 == ord('t')) & is_whitespace(c2)
+    is_f = (lengths >= 2) & (c0 == ord('f')) & is_whitespace(c1)
+    return starts, ends, keywords, {'v': is_v, 'vn': is_vn, 'vt': is_vt, 'f': is_f}
+
+
+def count_record_lines(data):
+    # (v, vt, vn) record counts of data, which begins at a line start, agreeing with classify_lines.
+    # Plain byte counts of the prefixes unless some line is indented.
+    data = b'\n' + bytes(data)
+    if b'\n ' in data or b'\n\t' in data:
+        _, _, _, kinds = classify_lines(np.frombuffer(data + b'\n', dtype=np.uint8))
+        return tuple(int(np.count_nonzero(kinds[kind])) for kind in ('v', 'vt', 'vn'))
+    return tuple(sum(data.count(prefix) for prefix in prefixes) for prefixes in RECORD_PREFIXES)
+
+
+def blank_comments(payload):
+    # Replaces everything from a '#' to the end of its line with spaces, in place
+    hashes = np.flatnonzero(payload == HASH)
+    if len(hashes) == 0:
+        return payload
+    line_ends = np.flatnonzero(payload == NEWLINE)
+    comment_ends = line_ends[np.searchsorted(line_ends, hashes)]
+    comment_ends, first = np.unique(comment_ends, return_index=True)
+    comment_starts = hashes[first]
+    lengths = comment_ends - comment_starts
+    offsets = np.cumsum(lengths) - lengths
+    payload[np.arange(lengths.sum()) + np.repeat(comment_starts - offsets, lengths)] = SPACE
+    return payload
+
+
+def gather_payload(buf, line_mask, starts, ends, keywords, keyword_length):
+    # Copy the selected lines minus their keyword and comments, each still terminated by its
+    # newline. Indentation is kept; it only separates tokens.
+    mask = np.repeat(line_mask, ends - starts + 1)
+    for offset in range(keyword_length):
+        mask[keywords[line_mask] + offset] = False
+    return blank_comments(buf[mask])
+
+
+def tokens_per_line(payload):
+    # Count whitespace separated tokens on each newline terminated line of the payload
+    separators = is_whitespace(payload) | (payload == NEWLINE)
+    token_starts = np.flatnonzero(~separators & np.concatenate([[True], separators[:-1]]))
+    line_ends = np.flatnonzero(payload == NEWLINE)
+    return np.bincount(np.searchsorted(line_ends, token_starts), minlength=len(line_ends)), token_starts
+
+
+def parse_float_records(buf, line_mask, starts, ends, keywords, keyword_length, width, minimum=None):
+    # (records, width) float32. Records need at least minimum components (default width); the
+    # missing ones up to width are 0.
+    minimum = width if minimum is None else minimum
+    record_count = np.count_nonzero(line_mask)
+    if record_count == 0:
+        return np.zeros((0, width), dtype=np.float32)
+
+    payload = gather_payload(buf, line_mask, starts, ends, keywords, keyword_length)
+    values = np.fromstring(payload.tobytes(), dtype=np.float32, sep=' ')
+    # With short records allowed, a matching total does not mean every record has width values
+    if len(values) == record_count * width and minimum == width:
+        return values.reshape(-1, width)
+
+    # Some records carry extra components (w, vertex colours); keep the leading ones
+    counts, _ = tokens_per_line(payload)
+    if counts.min() < minimum:
+        raise ValueError(f"OBJ record with fewer than {minimum} components")
+    first = np.cumsum(counts) - counts
+    if counts.min() >= width:
+        return values[first[:, None] + np.arange(width)]
+    records = np.zeros((record_count, width), dtype=np.float32)
+    for component in range(width):
+        present = counts > component
+        records[present, component] = values[first[present] + component]
+    return records
+
+
+def parse_face_records(buf, line_mask, starts, ends, keywords):
+    face_count = np.count_nonzero(line_mask)
+    if face_count == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, np.zeros(1, dtype=np.int64)
+
+    # "1//3" has no texcoord; make the empty field explicit so every slash separates a number
+    text = gather_payload(buf, line_mask, starts, ends, keywords, 1).tobytes().replace(b'//', b'/0/')
+    payload = np.frombuffer(text, dtype=np.uint8)
+
+    corners_per_face, corner_starts = tokens_per_line(payload)
+    slash_positions = np.flatnonzero(payload == SLASH)
+    fields_per_corner = np.bincount(
+        np.searchsorted(corner_starts, slash_positions, side='right') - 1,
+        minlength=len(corner_starts)) + 1
+
+    numbers = payload.copy()
+    numbers[numbers == SLASH] = SPACE
+    values = np.fromstring(numbers.tobytes(), dtype=np.int64, sep=' ')
+
+    corner_indices = np.zeros((len(corner_starts), 3), dtype=np.int64)
+    if np.all(fields_per_corner == fields_per_corner[0]):
+        fields = int(fields_per_corner[0])
+        corner_indices[:, :fields] = values.reshape(-1, fields)[:, :3]
+    else:
+        first = np.cumsum(fields_per_corner) - fields_per_corner
+        for field in range(3):
+            present = fields_per_corner > field
+            corner_indices[present, field] = values[first[present] + field]
+
+    face_offsets = np.zeros(face_count + 1, dtype=np.int64)
+    np.cumsum(corners_per_face, out=face_offsets[1:])
+    return corner_indices[:, 0], corner_indices[:, 1], corner_indices[:, 2], face_offsets
+
+
+def resolve_indices(indices, defined_before, face_offsets):
+    # OBJ indices are 1-based; negative ones count back from the records defined so far.
+    # 0 only appears for fields that were absent, which become -1.
+    defined_per_corner = np.repeat(defined_before, np.diff(face_offsets))
+    resolved = np.where(indices > 0, indices - 1, defined_per_corner + indices)
+    resolved[indices == 0] = -1
+    return resolved
+
+
+def report_progress(progress, percent, stage):
+    if progress is not None:
+        progress(percent, stage)
+
+
+def parse_obj_bytes(data, progress=None, records_before=(0, 0, 0)):
+    # progress(percent, stage) is called between stages; parsing covers 40-70%.
+    # records_before is the (v, vt, vn) record count preceding data in its file, for parsing a
+    # file block by block; relative indices then resolve against the whole file.
+    if not data.endswith(b'\n'):
+        data = data + b'\n'
+    buf = np.frombuffer(data, dtype=np.uint8)
+    starts, ends, keywords, kinds = classify_lines(buf)
+
+    report_progress(progress, 45, 'Parsing vertices')
+    positions = parse_float_records(buf, kinds['v'], starts, ends, keywords, 1, 3)
+    normals = parse_float_records(buf, kinds['vn'], starts, ends, keywords, 2, 3)
+    texcoords = parse_float_records(buf, kinds['vt'], starts, ends, keywords, 2, 2, minimum=0)  # "vt u" is valid
+    load_profile.count(positions=len(positions), normals=len(normals), texcoords=len(texcoords))
+
+    report_progress(progress, 55, 'Parsing faces')
+    is_f = kinds['f']
+    face_vertices, face_texcoords, face_normals, face_offsets = parse_face_records(buf, is_f, starts, ends, keywords)
+
+    # Number of v/vt/vn records that precede each face, for relative (negative) indices
+    vertices_before, texcoords_before, normals_before = records_before
+    face_vertices = resolve_indices(face_vertices, vertices_before + np.cumsum(kinds['v'])[is_f], face_offsets)
+    face_texcoords = resolve_indices(face_texcoords, texcoords_before + np.cumsum(kinds['vt'])[is_f], face_offsets)
+    face_normals = resolve_indices(face_normals, normals_before + np.cumsum(kinds['vn'])[is_f], face_offsets)
+    load_profile.count(faces=len(face_offsets) - 1, corners=len(face_vertices))
+
+    return ObjData(positions, normals, texcoords, face_vertices, face_normals, face_texcoords, face_offsets)
+
+
+def read_file(file_path, progress=None):
+    # Read in blocks so a caller can follow (and cancel) long reads; reading covers 0-40%
+    size = os.path.getsize(file_path)
+    data = bytearray(size + 1)
+    view = memoryview(data)
+    with open(file_path, 'rb') as file:
+        read = 0
+        while read < size:
+            count = file.readinto(view[read:min(read + READ_BLOCK_SIZE, size)])
+            if count == 0:
+                break
+            read += count
+            report_progress(progress, int(40 * read / size), 'Reading')
+    data[read] = NEWLINE
+    load_profile.count(bytes=read)
+    return data[:read + 1] if read < size else data
+
+
+def read_blocks(file_path, block_size):
+    # The file as successive blocks of whole lines, each about block_size bytes and ending in a newline
+    with open(file_path, 'rb') as file:
+        carry = b''
+        while True:
+            chunk = file.read(block_size)
+            if not chunk:
+                break
+            data = carry + chunk
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                carry = data  # A line longer than the block; keep reading
+                continue
+            carry = data[cut:]
+            yield data[:cut]
+        if carry:
+            yield carry + b'\n'
+
+
+def parse_obj(file_path, progress=None):
+    return parse_obj_bytes(read_file(file_path, progress), progress)
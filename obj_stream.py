@@ -0,0 +1,151 @@
+# obj_stream.py
+# Streaming load for OBJ files too large to parse in one go: the file is read twice in fixed-size blocks of whole lines.
+# The first pass keeps only the vertex tables; the second turns each block's faces into float32 triangle vertices ready for glBufferSubData.
+#
+# Memory: besides the per-vertex tables (positions, normals and generated-normal sums, 12 bytes each per record) a
+# streaming load holds one block's parse arrays and the triangle blocks in flight, which together stay under the
+# budget passed in. tests/test_obj_stream.py asserts this with tracemalloc on a small file under a small budget, and
+# benchmarks/bench_streaming.py measures it at any size.
+
+import os
+import numpy as np
+from obj_parser import count_record_lines, parse_obj_bytes, read_blocks, report_progress
+from face_arrays import complete_faces, corner_faces, triangulate
+from normals import accumulate, corner_weights
+
+STREAM_MEMORY_BUDGET = int(os.environ.get('MESH_INSPECTOR_STREAM_BUDGET_MB', 256)) * 1024 * 1024
+STREAM_MIN_FILE_SIZE = 512 * 1024 * 1024  # main.py streams files at least this big
+PARSE_BYTES_PER_BYTE = 40  # Peak parse and triangle-building allocation per byte of OBJ text in a block
+BLOCKS_IN_FLIGHT = 2  # Triangle blocks handed to the GUI but not yet uploaded
+MIN_BLOCK_SIZE = 64 * 1024
+VERTEX_STRIDE = 6 * np.dtype(np.float32).itemsize
+
+
+def block_size_for_budget(budget):
+    # Block size whose parse, plus the triangle blocks waiting for upload, fit in budget.
+    # A block's triangle data is at most 9 bytes per text byte ("f 1 2 3\n" makes 72 bytes of vertices).
+    return max(MIN_BLOCK_SIZE, int(budget // (PARSE_BYTES_PER_BYTE + 9 * BLOCKS_IN_FLIGHT)))
+
+
+def append_rows(table, count, rows):
+    # Write rows after the first count rows of table, growing it by half when full; returns the table
+    if count + len(rows) > len(table):
+        grown = np.empty((max(count + len(rows), len(table) * 3 // 2, 1024), table.shape[1]), dtype=table.dtype)
+        grown[:count] = table[:count]
+        table = grown
+    table[count:count + len(rows)] = rows
+    return table
+
+
+def count_records(file_path, block_size):
+    # (v, vn) record counts from a byte count per block, so the tables are allocated once.
+    # Every block starts a line.
+    vertices = normals = 0
+    for block in read_blocks(file_path, block_size):
+        block_vertices, _, block_normals = count_record_lines(block)
+        vertices += block_vertices
+        normals += block_normals
+    return vertices, normals
+
+
+class StreamedObj:
+    # What the first pass learns about a file: its vertex tables and how many triangles to expect
+    def __init__(self, file_path, block_size, positions, normals, vertex_normals, triangle_count, face_count):
+        self.file_path = file_path
+        self.block_size = block_size
+        self.positions = positions  # (V, 3) float32
+        self.normals = normals  # (N, 3) float32 vn records
+        self.vertex_normals = vertex_normals  # (V, 3) float32 generated normals, used when the file has no vn
+        self.triangle_count = triangle_count  # Upper bound; triangles with missing vertices are dropped
+        self.face_count = face_count
+
+    @property
+    def buffer_bytes(self):
+        return self.triangle_count * 3 * VERTEX_STRIDE
+
+    @property
+    def table_bytes(self):
+        return self.positions.nbytes + self.normals.nbytes + self.vertex_normals.nbytes
+
+
+def scan_obj(file_path, budget=STREAM_MEMORY_BUDGET, progress=None, normal_weighting='area'):
+    # First pass: vertex and normal tables, generated normals and the triangle count. Generated normals
+    # come from faces whose vertices are defined before them, and crease angles are not applied.
+    block_size = block_size_for_budget(budget)
+    file_size = max(1, os.path.getsize(file_path))
+    vertex_records, normal_records = count_records(file_path, block_size)
+    positions = np.empty((vertex_records, 3), dtype=np.float32)
+    normals = np.empty((normal_records, 3), dtype=np.float32)
+    normal_sums = np.empty((vertex_records, 3), dtype=np.float32)
+    counts = [0, 0, 0]  # v, vt, vn records so far
+    triangle_count = face_count = 0
+    scanned = 0
+    for block in read_blocks(file_path, block_size):
+        obj = parse_obj_bytes(block, None, tuple(counts))
+        vertex_count = counts[0] + len(obj.positions)
+        positions = append_rows(positions, counts[0], obj.positions)
+        normals = append_rows(normals, counts[2], obj.normals)
+        normal_sums = append_rows(normal_sums, counts[0], np.zeros_like(obj.positions))
+
+        face_vertices, face_offsets = complete_faces(obj.face_vertices, obj.face_offsets, vertex_count)
+        if len(face_vertices):
+            face_vectors, corner_scale = corner_weights(positions, face_vertices, face_offsets, normal_weighting)
+            # Sum into the vertices this block touches rather than a full-size array per block
+            touched, targets = np.unique(face_vertices, return_inverse=True)
+            normal_sums[touched] += accumulate(targets, corner_faces(face_offsets), face_vectors,
+                                               len(touched), corner_scale)
+
+        triangle_count += int(np.maximum(obj.face_sizes - 2, 0).sum())
+        face_count += obj.face_count
+        counts[0] = vertex_count
+        counts[1] += len(obj.texcoords)
+        counts[2] += len(obj.normals)
+        del obj, face_vertices, face_offsets
+        scanned += len(block)
+        report_progress(progress, int(40 * scanned / file_size), 'Scanning')
+
+    # Normalized in place, a slice at a time, so no second table-sized array is made
+    for first in range(0, counts[0], block_size):
+        rows = normal_sums[first:first + block_size]
+        lengths = np.linalg.norm(rows, axis=1)
+        rows /= np.where(lengths > 0, lengths, 1)[:, None]
+    return StreamedObj(file_path, block_size, positions[:counts[0]], normals[:counts[2]],
+                       normal_sums[:counts[0]], triangle_count, face_count)
+
+
+def triangle_blocks(scan, progress=None):
+    # Second pass: yields (T * 3, 6) float32 arrays of unindexed triangle corners, position then
+    # normal, in file order, one per block of the file
+    file_size = max(1, os.path.getsize(scan.file_path))
+    counts = [0, 0, 0]
+    streamed = 0
+    use_file_normals = len(scan.normals) > 0
+    for block in read_blocks(scan.file_path, scan.block_size):
+        obj = parse_obj_bytes(block, None, tuple(counts))
+        counts[0] += len(obj.positions)
+        counts[1] += len(obj.texcoords)
+        counts[2] += len(obj.normals)
+        streamed += len(block)
+
+        triangles = triangulate(obj.face_offsets)
+        tri_vertices = obj.face_vertices[triangles]
+        if use_file_normals:
+            # Corners without a vn index fall back to the vertex index, as in mesh_builder
+            tri_normals = np.where(obj.face_normals < 0, obj.face_vertices, obj.face_normals)[triangles]
+            normal_table = scan.normals
+        else:
+            tri_normals = tri_vertices
+            normal_table = scan.vertex_normals
+        del obj, triangles
+        valid = np.all((tri_vertices >= 0) & (tri_vertices < len(scan.positions)) &
+                       (tri_normals >= 0) & (tri_normals < len(normal_table)), axis=1)
+        tri_vertices = tri_vertices[valid].ravel()
+        tri_normals = tri_normals[valid].ravel()
+
+        report_progress(progress, 40 + int(60 * streamed / file_size), 'Streaming')
+        if len(tri_vertices):
+            vertex_data = np.empty((len(tri_vertices), 6), dtype=np.float32)
+            vertex_data[:, :3] = scan.positions[tri_vertices]
+            vertex_data[:, 3:] = normal_table[tri_normals]
+            del tri_vertices, tri_normals
+            yield vertex_data
@@ -0,0 +1,105 @@
+# offscreen.py
+# Draws through OpenGLWidget without a window or display: an EGL pbuffer context (Mesa's software llvmpipe is enough) stands in for the widget's own.
+# Import this module before anything that imports OpenGL, since PyOpenGL picks its platform on first import.
+
+import os
+import ctypes
+
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from OpenGL import EGL
+from OpenGL.GL import glFinish, glReadPixels, glGetString, GL_RGBA, GL_UNSIGNED_BYTE, GL_RENDERER
+from PyQt5.QtWidgets import QApplication
+from opengl_widget import OpenGLWidget
+
+
+class OffscreenError(Exception):
+    pass
+
+
+class EglContext:
+    # A desktop OpenGL context drawing into a width x height pbuffer
+    def __init__(self, width, height):
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        if not self.display or not EGL.eglInitialize(self.display, None, None):
+            raise OffscreenError('No EGL display available')
+        config = EGL.EGLConfig()
+        config_count = EGL.EGLint()
+        attributes = (EGL.EGLint * 13)(
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8, EGL.EGL_NONE)
+        if not EGL.eglChooseConfig(self.display, attributes, ctypes.pointer(config), 1, ctypes.pointer(config_count)) \
+                or config_count.value == 0:
+            raise OffscreenError('No EGL config with an OpenGL pbuffer')
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, None)
+        surface_attributes = (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE)
+        self.surface = EGL.eglCreatePbufferSurface(self.display, config, surface_attributes)
+        if not self.context or not self.surface:
+            raise OffscreenError('Could not create an EGL context')
+        self.make_current()
+
+    def make_current(self):
+        if not EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.context):
+            raise OffscreenError('eglMakeCurrent failed')
+
+    def release(self):
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroySurface(self.display, self.surface)
+        EGL.eglDestroyContext(self.display, self.context)
+
+
+_application = None
+
+
+def application():
+    # QOpenGLWidget needs a QApplication even when it never shows; it must outlive the widgets
+    global _application
+    if QApplication.instance() is None:
+        _application = QApplication([])
+    return QApplication.instance()
+
+
+class OffscreenWidget(OpenGLWidget):
+    # OpenGLWidget whose GL calls go to an EGL pbuffer; render() returns the frame's pixels
+    def __init__(self, width=640, height=480):
+        application()
+        self.egl = EglContext(width, height)
+        super(OffscreenWidget, self).__init__()
+        self.resize(width, height)
+        self.initializeGL()
+        self.resizeGL(width, height)
+
+    def makeCurrent(self):
+        self.egl.make_current()
+
+    def doneCurrent(self):
+        pass
+
+    def defaultFramebufferObject(self):
+        return 0
+
+    @property
+    def renderer_name(self):
+        return glGetString(GL_RENDERER).decode(errors='replace')
+
+    def render(self):
+        # Draw one frame and return it as (height, width, 4) uint8 RGBA, top row first
+        self.paintGL()
+        glFinish()
+        width, height = self.width(), self.height()
+        pixels = np.frombuffer(glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE), dtype=np.uint8)
+        return pixels.reshape(height, width, 4)[::-1]
+
+    def draw(self):
+        # Draw one frame without reading it back, for timing
+        self.paintGL()
+        glFinish()
+
+    def close(self):
+        self.release_buffers()
+        self.scene.release()
+        self.egl.release()
@@ -6,52 +6,89 @@ from PyQt5.QtWidgets import QOpenGLWidget
 from PyQt5.QtGui import QSurfaceFormat
 from PyQt5.QtCore import Qt, pyqtSignal,  QTimer  
 from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
 from OpenGL.arrays import vbo
+from OpenGL.error import GLError, NullFunctionError
+import ctypes
 import time
+import load_profile
+from mesh_builder import load_mesh
+from lod import screen_fraction, select_level
+from culling import frustum_planes, visible_chunks, visible_ranges
+from picking import screen_ray
+from frame_stats import FrameStats, GpuTimer
+from scene import Scene
+from buffer_updates import BufferUpdate, changed_ranges
+from recent_models import ModelBuffers
+from vertex_format import COMPACT_STRIDE, NORMAL_OFFSET, compact_vertices
+from shaders import (ShaderError, link_program, uniform_locations, vertex_shader_source, fragment_shader_source,
+                     instanced_vertex_shader_source, compact_vertex_shader_source, wireframe_geometry_shader_source,
+                     wireframe_fragment_shader_source)
+import transforms
 
 
 
-vertex_shader_source = """
-#version 330 core
-layout (location = 0) in vec3 position;
-layout (location = 1) in vec3 normal;
+def check_gl_error():
+    err = glGetError()
+    if err != GL_NO_ERROR:
+        from OpenGL.GLU import gluErrorString
+        print('GL error: %s' % gluErrorString(err))
 
-uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
 
-void main()
-{
-    gl_Position = projection * view * model * vec4(position, 1.0);
-}
-"""
+def gl_index_type(indices):
+    return GL_UNSIGNED_SHORT if indices.dtype == np.uint16 else GL_UNSIGNED_INT
 
-fragment_shader_source = """
-#version 330 core
-out vec4 FragColor;
 
-void main()
-{
-    FragColor = vec4(0.0, 1.0, 1.0, 1.0); // Fragment color
-}
-"""
+class Overlay:
+    # Positions drawn in flat colours over the model. Each part is (GL mode, first vertex, vertex
+    # count, RGB colour, line width or point size, drawn through the model).
+    def __init__(self):
+        self.data = np.zeros((0, 3), dtype=np.float32)
+        self.parts = []
+        self.dirty = False
+        self.vbo = None
+        self.vao = None
 
+    def set(self, data, parts):
+        self.data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1, 3)
+        self.parts = parts
+        self.dirty = True
 
-def check_gl_error():
-    err = glGetError()
-    if err != GL_NO_ERROR:
-        print('GL error: %s' % gluErrorString(err))
+    def clear(self):
+        self.set(np.zeros((0, 3), dtype=np.float32), [])
+
+    def upload(self):
+        if self.vbo is None:
+            self.vbo = vbo.VBO(self.data, usage=GL_DYNAMIC_DRAW)
+        else:
+            self.vbo.set_array(self.data)
+        self.vbo.bind()
+        self.vbo.unbind()
+        self.dirty = False
 
 class OpenGLWidget(QOpenGLWidget):
     fps_updated = pyqtSignal(float)  # This will emit the FPS value
+    frame_stats_updated = pyqtSignal(object)  # FrameStats, emitted with the FPS
+    lod_changed = pyqtSignal(int, int)  # Active level and its triangle count
+    culling_changed = pyqtSignal(int, int)  # Drawn and culled chunk counts
+    picked = pyqtSignal(object)  # picking.Pick, or None when the pick missed or was cleared
+    scene_drawn = pyqtSignal(int, int)  # Scene instances drawn and the draw calls they took
+    vertex_format_changed = pyqtSignal(object)  # vertex_format.CompactVertices, or None for float vertices
+    model_drawn = pyqtSignal()  # The first frame after a model was uploaded, streamed or attached
 
     def __init__(self, parent=None):
         super(OpenGLWidget, self).__init__(parent)
         self.pan_x = 0
         self.pan_y = 0
+        self.mesh = None  # MeshData on the GPU, kept to re-upload its vertices in another format
+        self.model_drawn_pending = False  # A new model has not been drawn yet; see model_drawn
         self.vbo = None
+        self.ebo = None
+        self.uploaded_bytes = 0
+        self.unindexed_bytes = 0
+        self.vertex_coords = np.zeros((0, 3), dtype=np.float32)
+        self.vertex_count = 0
+        self.edge_count = 0
+        self.face_count = 0
         self.rotation_x = 0
         self.rotation_y = 0
         self.setFocusPolicy(Qt.StrongFocus)
@@ -64,30 +101,83 @@ class OpenGLWidget(QOpenGLWidget):
         self.far_clip = 500.0  # Initialize the far clip attribute here
         self.wireframe_mode = False  # Add this line
         self.wireframe_thickness = 1.0  # Default thickness
-        self.wireframe_vbo_tris = None
-        self.wireframe_vbo_quads = None
-        self.wireframe_vbo_ngons = None
+        self.wireframe_ebo = None
+        # Edges drawn with the surface in one pass by the wireframe shaders instead of as lines after it
+        self.single_pass_wireframe = True
+        self.wireframe_programs = {}  # Compact vertices or not -> (program, uniforms), when they linked
+        self.uploaded_wireframe_matrix_versions = {}
+        self.edge_mask_buffer = None  # Texture buffer of the model's triangle_edges for the wireframe shaders
+        self.edge_mask_texture = None
+        self.edge_masks = None  # The array it was filled from
+        self.shader_program = None
+        self.use_shaders = True  # Falls back to fixed-function when shaders are unavailable
+        self.vao = None
+        self.wireframe_vao = None
+        self.matrix_key = None  # Camera state the cached matrices were built from
+        self.matrices = None
+        self.matrix_version = 0
+        self.uploaded_matrix_version = -1
+        self.lods = None  # LodChain for the current model, arrives after the model itself
+        self.lod_vbo = None
+        self.lod_ebo = None
+        self.lod_vao = None
+        self.auto_lod = True
+        self.lod_level = 0
+        self.triangle_count = 0
+        self.bounding_center = np.zeros(3, dtype=np.float32)
+        self.bounding_radius = 0.0
+        self.frustum_culling = True
+        self.chunk_offsets = np.zeros(1, dtype=np.int64)
+        self.chunk_bounds = np.zeros((0, 2, 3), dtype=np.float32)
+        self.culling_key = None  # (matrix version, culling enabled) the draw ranges were computed for
+        self.draw_ranges = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self.chunks_drawn = 0
+        self.chunks_culled = 0
+        self.stream_buffer = None  # GL buffer a streamed model is uploaded into block by block
+        self.stream_vao = None
+        self.streamed_vertices = 0
+        self.bvh = None  # picking.TriangleBVH for the current model, arrives after the model itself
+        self.hover_picking = False
+        self.current_pick = None
+        self.highlight = Overlay()  # Picked face triangles, edge, vertex
+        self.topology_overlay = Overlay()  # Problem edges and vertices from a topology.TopologyReport
+        self.show_topology = True
+        self.scene = Scene()  # Further models laid out beside the main one, see scene.py
+        self.instanced_program = None
+        self.uploaded_scene_matrix_version = -1
+        self.compact_vertices = False  # Upload 12-byte quantized vertices on the shader path, see vertex_format.py
+        self.compact = None  # CompactVertices of the uploaded model while it uses them
+        self.compact_program = None
+        self.uploaded_compact_matrix_version = -1
+        self.scene_stats = (0, 0)
         format = QSurfaceFormat()
         format.setSamples(4)  # Set the number of samples for multisampling
         self.setFormat(format)  # Apply the format with multisampling
-        self.last_frame_time = 0
-        self.frame_count = 0
         self.fps = 0.0
-        self.redraw_timer = QTimer(self)
-        self.redraw_timer.timeout.connect(self.trigger_update)
-        self.redraw_timer.start(16)  # about 60 times per second
+        self.frame_stats = FrameStats()
+        self.gpu_timer = None  # Created once the GL context exists
+        self.render_path = 'fixed-function'  # Recorded with every frame in the trace
 
+        # Frames are painted on demand when the camera or state changes; continuous redraw is for profiling
+        self.continuous_redraw = False
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.timeout.connect(self.update)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.trigger_update)
+        self.stats_timer.start(500)
+
+    def set_continuous_redraw(self, enabled):
+        self.continuous_redraw = enabled
+        if enabled:
+            self.redraw_timer.start(0)
+        else:
+            self.redraw_timer.stop()
 
     def trigger_update(self):
-        # Calculate FPS
-        current_time = time.time()
-        self.frame_count += 1
-        time_difference = current_time - self.last_frame_time
-        if time_difference >= 1.0:
-            self.fps = self.frame_count / time_difference
-            self.frame_count = 0
-            self.last_frame_time = current_time
-            self.fps_updated.emit(self.fps)  # Emit the signal to update the FPS
+        # Report frames actually painted, not timer ticks
+        self.fps = self.frame_stats.fps()
+        self.fps_updated.emit(self.fps)  # Emit the signal to update the FPS
+        self.frame_stats_updated.emit(self.frame_stats)
 
     def initializeGL(self):
         glEnable(GL_MULTISAMPLE)
@@ -101,65 +191,345 @@ class OpenGLWidget(QOpenGLWidget):
         glLightfv(GL_LIGHT0, GL_POSITION, [0, 0, 1, 0])  # Simple directional light
 
 
-        # Shader Program Setup
-        vertex_shader = glCreateShader(GL_VERTEX_SHADER)
-        glShaderSource(vertex_shader, vertex_shader_source)
-        glCompileShader(vertex_shader)
-        # Check for shader compile errors...
-
-        fragment_shader = glCreateShader(GL_FRAGMENT_SHADER)
-        glShaderSource(fragment_shader, fragment_shader_source)
-        glCompileShader(fragment_shader)
-        # Check for shader compile errors...
-
-        self.shader_program = glCreateProgram()
-        glAttachShader(self.shader_program, vertex_shader)
-        glAttachShader(self.shader_program, fragment_shader)
-        glLinkProgram(self.shader_program)
-        # Check for linking errors...
-
-        glDeleteShader(vertex_shader)
-        glDeleteShader(fragment_shader)
+        # Shader Program Setup; VAOs and GLSL 330 need an OpenGL 3.3 context
+        try:
+            self.shader_program = link_program(vertex_shader_source, fragment_shader_source)
+            self.shader_uniforms = uniform_locations(
+                self.shader_program, ('model', 'view', 'projection', 'color', 'lighting'))
+        except (ShaderError, GLError, NullFunctionError) as error:
+            print(f'Shader rendering unavailable, using fixed-function: {error}')
+            self.shader_program = None
+        if self.shader_program is not None:
+            try:
+                self.instanced_program = link_program(instanced_vertex_shader_source, fragment_shader_source)
+                self.instanced_uniforms = uniform_locations(
+                    self.instanced_program, ('model', 'view', 'projection', 'color', 'lighting'))
+            except (ShaderError, GLError, NullFunctionError) as error:
+                print(f'Instanced rendering unavailable, drawing scene copies one by one: {error}')
+                self.instanced_program = None
+            try:
+                self.compact_program = link_program(compact_vertex_shader_source, fragment_shader_source)
+                self.compact_uniforms = uniform_locations(
+                    self.compact_program,
+                    ('model', 'view', 'projection', 'color', 'lighting', 'position_offset', 'position_scale'))
+            except (ShaderError, GLError, NullFunctionError) as error:
+                print(f'Compact vertices unavailable, keeping float vertices: {error}')
+                self.compact_program = None
+            sources = {False: (vertex_shader_source, ()), True: (compact_vertex_shader_source,
+                                                              ('position_offset', 'position_scale'))}
+            for compact, (source, extra_uniforms) in sources.items():
+                try:
+                    program = link_program(source, wireframe_fragment_shader_source, wireframe_geometry_shader_source)
+                    self.wireframe_programs[compact] = (program, uniform_locations(program, (
+                        'model', 'view', 'projection', 'color', 'lighting', 'wire_color', 'wire_width', 'viewport_size',
+                        'edge_masks', 'use_edge_masks', 'first_triangle') + extra_uniforms))
+                except (ShaderError, GLError, NullFunctionError) as error:
+                    print(f'Single-pass wireframe unavailable, drawing edges as lines: {error}')
+
+        self.gpu_timer = GpuTimer()
 
 
     def set_wireframe_mode(self, enabled):
         self.wireframe_mode = enabled
         self.update()
 
-    def create_wireframe_vbo(self, faces):
-        wireframe_data = []
-        for face in faces:
-            for i in range(len(face)):
-                start_vertex = self.vertex_coords[face[i]]
-                end_vertex = self.vertex_coords[face[(i + 1) % len(face)]]
-                wireframe_data.extend(start_vertex)
-                wireframe_data.extend(end_vertex)
-        return vbo.VBO(np.array(wireframe_data, dtype=np.float32))
-
     def set_wireframe_thickness(self, thickness):
         self.wireframe_thickness = thickness
         self.update()
 
+    def set_single_pass_wireframe(self, enabled):
+        self.single_pass_wireframe = enabled
+        self.update()
+
+    def single_pass_active(self):
+        # Needs the shader path and a linked wireframe program for the current vertex format
+        return self.single_pass_wireframe and self.shaders_active() and \
+            (self.compact is not None) in self.wireframe_programs
+
+    def wireframe_path(self):
+        if not self.wireframe_mode:
+            return 'off'
+        return 'single-pass' if self.single_pass_active() else 'two-pass'
+
+    def set_shader_rendering(self, enabled):
+        self.use_shaders = enabled
+        self.refresh_vertex_format()
+        self.update()
+
+    def set_compact_vertices(self, enabled):
+        self.compact_vertices = enabled
+        self.refresh_vertex_format()
+        self.update()
+
+    def compact_active(self):
+        # Compact vertices need the shader path to decode them
+        return self.compact_vertices and self.shaders_active() and self.compact_program is not None
+
+    def refresh_vertex_format(self):
+        # Re-upload the model's vertices when the format they should be in changed
+        if self.mesh is not None and (self.compact is not None) != self.compact_active():
+            self.makeCurrent()
+            self.upload_vertex_buffers()
+            self.doneCurrent()
+
+    def shaders_active(self):
+        return self.use_shaders and self.shader_program is not None
+
+    def set_auto_lod(self, enabled):
+        self.auto_lod = enabled
+        self.update()
+
+    def update_lod_level(self, view, model):
+        # Pick the level from how much of the view the model's bounding sphere covers
+        level = 0
+        if self.auto_lod and self.lods is not None:
+            center = view @ model @ np.append(self.bounding_center, 1.0)
+            fraction = screen_fraction(self.bounding_radius, float(np.linalg.norm(center[:3])), 45 / self.zoom)
+            level = select_level(fraction, self.lods.level_count)
+        if level != self.lod_level:
+            self.lod_level = level
+            self.lod_changed.emit(level, self.level_triangle_count(level))
+
+    def set_frustum_culling(self, enabled):
+        self.frustum_culling = enabled
+        self.update()
+
+    def update_visible_chunks(self, projection, view, model):
+        # Index ranges of the chunks inside the frustum; only recomputed when the camera moved
+        key = (self.matrix_version, self.frustum_culling)
+        if key == self.culling_key:
+            return
+        self.culling_key = key
+        if self.frustum_culling:
+            visible = visible_chunks(frustum_planes(projection @ view @ model), self.chunk_bounds)
+        else:
+            visible = np.ones(len(self.chunk_bounds), dtype=bool)
+        self.draw_ranges = visible_ranges(visible, self.chunk_offsets)
+        drawn = int(np.count_nonzero(visible))
+        if (drawn, len(visible) - drawn) != (self.chunks_drawn, self.chunks_culled):
+            self.chunks_drawn, self.chunks_culled = drawn, len(visible) - drawn
+            self.culling_changed.emit(self.chunks_drawn, self.chunks_culled)
+
+    def draw_triangles(self, element_buffer, count, offset, first_triangle=None):
+        # The full mesh draws only its visible chunk ranges; LOD levels draw whole. first_triangle is
+        # the wireframe shaders' uniform location: they number triangles from the start of the
+        # buffer, so each range gets a call of its own.
+        index_type = gl_index_type(element_buffer.data)
+        if self.lod_level > 0:
+            glDrawElements(GL_TRIANGLES, count, index_type, ctypes.c_void_p(offset))
+            return
+        starts, counts = self.draw_ranges
+        if first_triangle is not None:
+            for start, range_count in zip(starts.tolist(), counts.tolist()):
+                glUniform1i(first_triangle, start // 3)
+                glDrawElements(GL_TRIANGLES, range_count, index_type, ctypes.c_void_p(start * element_buffer.data.itemsize))
+        elif len(starts) == 1:
+            glDrawElements(GL_TRIANGLES, int(counts[0]), index_type, ctypes.c_void_p(int(starts[0]) * element_buffer.data.itemsize))
+        elif len(starts):
+            byte_offsets = (ctypes.c_void_p * len(starts))(*(starts * element_buffer.data.itemsize).tolist())
+            glMultiDrawElements(GL_TRIANGLES, counts.astype(np.int32), index_type, byte_offsets, len(starts))
+
+    def set_hover_picking(self, enabled):
+        # Pick under the cursor on every mouse move instead of only on click
+        self.hover_picking = enabled
+        self.setMouseTracking(enabled)
+
+    def set_bvh(self, bvh):
+        self.bvh = bvh
+
+    def pick_at(self, x, y):
+        if self.bvh is None or self.width() == 0 or self.height() == 0:
+            return
+        origin, direction = screen_ray(x, y, self.width(), self.height(), *self.camera_matrices())
+        pick = self.bvh.pick(origin, direction)
+        if pick is not None or self.current_pick is not None:
+            self.set_pick(pick)
+
+    def set_pick(self, pick):
+        self.current_pick = pick
+        if pick is None:
+            self.highlight.clear()
+        else:
+            # Whole face as triangles in orange, then the nearest edge in cyan and vertex in red
+            positions = self.bvh.mesh.vertex_data.reshape(-1, 6)[:, :3]
+            triangles = self.bvh.face_triangles(pick.face)
+            corners = np.asarray(self.bvh.mesh.indices, dtype=np.int64).reshape(-1, 3)[triangles].ravel()
+            edge = self.vertex_coords[list(pick.edge)]
+            self.highlight.set(np.concatenate([positions[corners], edge, pick.vertex_position[None]]), [
+                (GL_TRIANGLES, 0, len(corners), (1.0, 0.55, 0.0), 1.0, False),
+                (GL_LINES, len(corners), 2, (0.0, 0.9, 1.0), 3.0, True),
+                (GL_POINTS, len(corners) + 2, 1, (1.0, 0.1, 0.1), 8.0, True),
+            ])
+        self.picked.emit(pick)
+        self.update()
+
+    def set_topology_report(self, report):
+        # Boundary edges in yellow, non-manifold edges in red, inconsistently wound edges in magenta
+        # and non-manifold vertices as red points; None clears the overlay
+        if report is None:
+            self.topology_overlay.clear()
+            self.update()
+            return
+        vertex_count = len(self.vertex_coords)
+        data = []
+        parts = []
+        first = 0
+        for mode, vertices, color, size in (
+                (GL_LINES, report.boundary_edges, (1.0, 0.85, 0.0), 2.0),
+                (GL_LINES, report.inconsistent_edges, (1.0, 0.0, 1.0), 3.0),
+                (GL_LINES, report.non_manifold_edges, (1.0, 0.1, 0.1), 3.0),
+                (GL_POINTS, report.non_manifold_vertices, (1.0, 0.1, 0.1), 7.0)):
+            vertices = np.asarray(vertices, dtype=np.int64).ravel()
+            if len(vertices) == 0 or vertices.max() >= vertex_count:
+                continue
+            data.append(self.vertex_coords[vertices])
+            parts.append((mode, first, len(vertices), color, size, False))
+            first += len(vertices)
+        if data:
+            self.topology_overlay.set(np.concatenate(data), parts)
+        else:
+            self.topology_overlay.clear()
+        self.update()
+
+    def set_topology_overlay(self, enabled):
+        self.show_topology = enabled
+        self.update()
+
+    def draw_overlays(self):
+        if self.show_topology:
+            self.draw_overlay(self.topology_overlay)
+        self.draw_overlay(self.highlight)
+
+    def draw_overlay(self, overlay):
+        if len(overlay.data) == 0:
+            return
+        if overlay.dirty:
+            overlay.upload()
+        shaders = self.shaders_active()
+
+        if shaders:
+            if overlay.vao is None:
+                overlay.vao = glGenVertexArrays(1)
+                glBindVertexArray(overlay.vao)
+                overlay.vbo.bind()
+                glEnableVertexAttribArray(0)
+                glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+                overlay.vbo.unbind()
+            glBindVertexArray(overlay.vao)
+            glUniform1i(self.shader_uniforms['lighting'], 0)
+            set_color = lambda r, g, b: glUniform4f(self.shader_uniforms['color'], r, g, b, 1.0)
+        else:
+            glDisable(GL_LIGHTING)
+            overlay.vbo.bind()
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(3, GL_FLOAT, 0, overlay.vbo)
+            set_color = glColor3f
+
+        glDepthFunc(GL_LEQUAL)
+        for mode, first, count, color, size, on_top in overlay.parts:
+            set_color(*color)
+            if mode == GL_TRIANGLES:
+                glEnable(GL_POLYGON_OFFSET_FILL)
+                glPolygonOffset(-1.0, -1.0)
+            elif mode == GL_LINES:
+                glLineWidth(size)
+            else:
+                glPointSize(size)
+            if on_top:
+                glDisable(GL_DEPTH_TEST)
+            glDrawArrays(mode, first, count)
+            glEnable(GL_DEPTH_TEST)
+            glDisable(GL_POLYGON_OFFSET_FILL)
+        glDepthFunc(GL_LESS)
+
+        if shaders:
+            glBindVertexArray(0)
+        else:
+            glDisableClientState(GL_VERTEX_ARRAY)
+            overlay.vbo.unbind()
+            glEnable(GL_LIGHTING)
+
+    def level_triangle_count(self, level):
+        return self.lods.triangle_count(level) if level > 0 else self.triangle_count
+
+    def level_geometry(self):
+        # (vertex buffer, element buffer, VAO, index count, byte offset of the first index) to draw
+        if self.lod_level == 0:
+            return self.vbo, self.ebo, self.vao, len(self.ebo), 0
+        first = int(self.lods.index_offsets[self.lod_level - 1])
+        count = int(self.lods.index_offsets[self.lod_level]) - first
+        return self.lod_vbo, self.lod_ebo, self.lod_vao, count, first * self.lod_ebo.data.itemsize
+
+    def draw_stream(self):
+        # The part of a streamed model uploaded so far, as plain triangles
+        if self.shaders_active():
+            glBindVertexArray(self.stream_vao)
+            glDrawArrays(GL_TRIANGLES, 0, self.streamed_vertices)
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self.stream_buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        stride = 6 * np.dtype('float32').itemsize
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(3 * np.dtype('float32').itemsize))
+        glDrawArrays(GL_TRIANGLES, 0, self.streamed_vertices)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
     def draw_model(self):
-        if self.vbo:
-            self.vbo.bind()
+        if self.stream_buffer is not None:
+            self.draw_stream()
+        elif self.vbo:
+            vertex_buffer, element_buffer, _, count, offset = self.level_geometry()
+            vertex_buffer.bind()
             glEnableClientState(GL_VERTEX_ARRAY)
             glEnableClientState(GL_NORMAL_ARRAY)
 
             stride = 6 * np.dtype('float32').itemsize
-            glVertexPointer(3, GL_FLOAT, stride, self.vbo)
-            glNormalPointer(GL_FLOAT, stride, self.vbo + (3 * np.dtype('float32').itemsize))
+            glVertexPointer(3, GL_FLOAT, stride, vertex_buffer)
+            glNormalPointer(GL_FLOAT, stride, vertex_buffer + (3 * np.dtype('float32').itemsize))
 
-            glDrawArrays(GL_TRIANGLES, 0, len(self.vbo) // 6)
+            element_buffer.bind()
+            self.draw_triangles(element_buffer, count, offset)
+            element_buffer.unbind()
             glDisableClientState(GL_VERTEX_ARRAY)
             glDisableClientState(GL_NORMAL_ARRAY)
-            self.vbo.unbind()   
-    
+            vertex_buffer.unbind()
+
+    def draw_wireframe(self):
+        # Every unique edge once, as indexed lines into the model's vertex buffer
+        if self.vbo and self.wireframe_ebo is not None:
+            self.vbo.bind()
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glVertexPointer(3, GL_FLOAT, 6 * np.dtype('float32').itemsize, self.vbo)
+            self.wireframe_ebo.bind()
+            glDrawElements(GL_LINES, len(self.wireframe_ebo), gl_index_type(self.wireframe_ebo.data), self.wireframe_ebo)
+            self.wireframe_ebo.unbind()
+            glDisableClientState(GL_VERTEX_ARRAY)
+            self.vbo.unbind()
+
+    def camera_matrices(self):
+        # (projection, view, model), rebuilt only when the camera state they depend on changes
+        key = (tuple(self.camera_pos), tuple(self.camera_front), tuple(self.camera_up),
+               self.rotation_x, self.rotation_y, self.pan_x, self.pan_y, self.zoom,
+               self.width(), self.height(), self.near_clip, self.far_clip)
+        if key != self.matrix_key:
+            aspect_ratio = self.width() / self.height() if self.height() > 0 else 1
+            projection = transforms.perspective(45 / self.zoom, aspect_ratio, self.near_clip, self.far_clip)
+            target = [position + front for position, front in zip(self.camera_pos, self.camera_front)]
+            view = transforms.look_at(self.camera_pos, target, self.camera_up)
+            model = (transforms.rotation(self.rotation_x, (1, 0, 0)) @
+                     transforms.rotation(self.rotation_y, (0, 1, 0)) @
+                     transforms.translation(self.pan_x, self.pan_y, 0))
+            self.matrices = (projection, view, model)
+            self.matrix_key = key
+            self.matrix_version += 1
+        return self.matrices
+
     def set_perspective(self):
         glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()  # Reset the projection matrix
-        aspect_ratio = self.width() / self.height() if self.height() > 0 else 1
-        gluPerspective(45 / self.zoom, aspect_ratio, self.near_clip, self.far_clip)
+        glLoadMatrixf(self.camera_matrices()[0].T)
         glMatrixMode(GL_MODELVIEW)
         check_gl_error()  # Check for any errors
 
@@ -169,20 +539,22 @@ class OpenGLWidget(QOpenGLWidget):
 
     def change_near_clip(self, value: float):
         self.near_clip = value
-        self.set_perspective()
         self.update()
 
     def change_far_clip(self, value: float):
         self.far_clip = value
-        self.set_perspective()
         self.update()
 
     def mousePressEvent(self, event):
         if event.modifiers() & Qt.AltModifier:
             self.last_pos = event.pos()
+        elif event.button() == Qt.LeftButton:
+            self.pick_at(event.x(), event.y())
 
     def mouseMoveEvent(self, event):
-        if event.modifiers() & Qt.AltModifier:
+        if self.hover_picking and not event.buttons() and not event.modifiers() & Qt.AltModifier:
+            self.pick_at(event.x(), event.y())
+        elif event.modifiers() & Qt.AltModifier:
             dx = event.x() - self.last_pos.x()
             dy = event.y() - self.last_pos.y()
 
@@ -220,80 +592,344 @@ class OpenGLWidget(QOpenGLWidget):
         self.update()
 
     def paintGL(self):
+        frame = self.frame_stats.begin_frame()
+        start = time.perf_counter()
+        if self.gpu_timer is not None:
+            self.gpu_timer.begin()
+
+        self.render_frame()
+
+        if self.gpu_timer is not None:
+            self.gpu_timer.end(frame)
+        self.frame_stats.record_frame(frame, (time.perf_counter() - start) * 1000.0, self.render_path)
+        if self.gpu_timer is not None:
+            self.frame_stats.record_gpu(self.gpu_timer.collect())
+        if self.model_drawn_pending:
+            self.model_drawn_pending = False
+            self.model_drawn.emit()
+
+    def render_frame(self):
         glClearColor(*self.bg_color)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        aspect_ratio = self.width() / self.height() if self.height() > 0 else 1
-        gluPerspective(45 / self.zoom, aspect_ratio, self.near_clip, self.far_clip)
-        glMatrixMode(GL_MODELVIEW)
-        glLoadIdentity()
-
-        gluLookAt(
-            self.camera_pos[0], self.camera_pos[1], self.camera_pos[2],
-            self.camera_pos[0] + self.camera_front[0],
-            self.camera_pos[1] + self.camera_front[1],
-            self.camera_pos[2] + self.camera_front[2],
-            self.camera_up[0], self.camera_up[1], self.camera_up[2]
-        )
-
-        glRotatef(self.rotation_x, 1, 0, 0)
-        glRotatef(self.rotation_y, 0, 1, 0)
-        glTranslatef(self.pan_x, self.pan_y, 0)
-
-        # Render the main model
+        projection, view, model = self.camera_matrices()
         if self.vbo:
-            self.vbo.bind()
-            glEnableClientState(GL_VERTEX_ARRAY)
-            glEnableClientState(GL_NORMAL_ARRAY)
+            self.update_lod_level(view, model)
+            self.update_visible_chunks(projection, view, model)
+        if self.scene.meshes:
+            planes = frustum_planes(projection @ view @ model) if self.frustum_culling else None
+            self.scene.update_visibility(planes, (self.matrix_version, self.frustum_culling))
+
+        if self.shaders_active():
+            self.render_path = 'shader'
+            self.render_with_shaders()
+            return
 
-            stride = 6 * np.dtype('float32').itemsize
-            glVertexPointer(3, GL_FLOAT, stride, self.vbo)
-            glNormalPointer(GL_FLOAT, stride, self.vbo + (3 * np.dtype('float32').itemsize))
+        self.render_path = 'fixed-function'
+        self.load_fixed_function_matrices()
 
-            glDrawArrays(GL_TRIANGLES, 0, len(self.vbo) // 6)
-            glDisableClientState(GL_VERTEX_ARRAY)
-            glDisableClientState(GL_NORMAL_ARRAY)
-            self.vbo.unbind()
+        # Render the main model
+        self.draw_model()
 
         # Draw wireframe over the model if wireframe mode is on
         if self.wireframe_mode:
             glDisable(GL_LIGHTING)
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
             glLineWidth(self.wireframe_thickness)
             glDepthFunc(GL_LEQUAL)
 
             # Set wireframe color to black
             glColor3f(0.0, 0.0, 0.0)
-
-            # Check and render wireframe VBOs if they exist
-            if self.wireframe_vbo_quads is not None:
-                self.wireframe_vbo_quads.bind()
-                glEnableClientState(GL_VERTEX_ARRAY)
-                glVertexPointer(3, GL_FLOAT, 0, None)
-                glDrawArrays(GL_LINES, 0, len(self.wireframe_vbo_quads) // 3)
-                glDisableClientState(GL_VERTEX_ARRAY)
-                self.wireframe_vbo_quads.unbind()
-
-            if self.wireframe_vbo_tris is not None:
-                self.wireframe_vbo_tris.bind()
-                glEnableClientState(GL_VERTEX_ARRAY)
-                glVertexPointer(3, GL_FLOAT, 0, None)
-                glDrawArrays(GL_LINES, 0, len(self.wireframe_vbo_tris) // 3)
-                glDisableClientState(GL_VERTEX_ARRAY)
-                self.wireframe_vbo_tris.unbind()
+            self.draw_wireframe()
 
             glDepthFunc(GL_LESS)
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
             glEnable(GL_LIGHTING)
 
+        self.draw_scene()
+        self.draw_overlays()
+
+    def load_fixed_function_matrices(self):
+        projection, view, model = self.matrices
+        glMatrixMode(GL_PROJECTION)
+        glLoadMatrixf(projection.T)
+        glMatrixMode(GL_MODELVIEW)
+        glLoadMatrixf((view @ model).T)
+
+    def render_with_shaders(self):
+        if self.vao is None and self.stream_vao is None and not self.scene.meshes:
+            return
+        glUseProgram(self.shader_program)
+        # Matrix uniforms live in the program, so they are only re-sent when the camera moved
+        if self.uploaded_matrix_version != self.matrix_version:
+            self.set_matrix_uniforms(self.shader_uniforms)
+            self.uploaded_matrix_version = self.matrix_version
+
+        uniforms = self.shader_uniforms
+        # Streamed models have no wireframe either way
+        single_pass = self.wireframe_mode and self.single_pass_active() and self.stream_vao is None
+        if single_pass:
+            uniforms = self.use_wireframe_program()
+        elif self.compact is not None:
+            uniforms = self.use_compact_program()
+        glUniform1i(uniforms['lighting'], 1)
+        glUniform4f(uniforms['color'], 0.8, 0.8, 0.8, 1.0)
+        if self.stream_vao is not None:
+            self.draw_stream()
+        elif self.vao is not None:
+            _, element_buffer, vao, count, offset = self.level_geometry()
+            glBindVertexArray(vao)
+            self.draw_triangles(element_buffer, count, offset, uniforms['first_triangle'] if single_pass else None)
+
+        if self.wireframe_mode and not single_pass and self.wireframe_vao is not None:
+            glLineWidth(self.wireframe_thickness)
+            glDepthFunc(GL_LEQUAL)
+            glUniform1i(uniforms['lighting'], 0)
+            glUniform4f(uniforms['color'], 0.0, 0.0, 0.0, 1.0)
+            glBindVertexArray(self.wireframe_vao)
+            glDrawElements(GL_LINES, len(self.wireframe_ebo), gl_index_type(self.wireframe_ebo.data), None)
+            glDepthFunc(GL_LESS)
+
+        if self.compact is not None or single_pass:
+            glUseProgram(self.shader_program)
+        self.draw_scene()
+        self.draw_overlays()
+        glBindVertexArray(0)
+        glUseProgram(0)
+
+    def set_matrix_uniforms(self, uniforms):
+        projection, view, model = self.matrices
+        glUniformMatrix4fv(uniforms['projection'], 1, GL_TRUE, projection)
+        glUniformMatrix4fv(uniforms['view'], 1, GL_TRUE, view)
+        glUniformMatrix4fv(uniforms['model'], 1, GL_TRUE, model)
+
+    def use_compact_program(self):
+        # The program decoding compact vertices, with the camera and the model's quantization box
+        glUseProgram(self.compact_program)
+        uniforms = self.compact_uniforms
+        if self.uploaded_compact_matrix_version != self.matrix_version:
+            self.set_matrix_uniforms(uniforms)
+            self.uploaded_compact_matrix_version = self.matrix_version
+        glUniform3f(uniforms['position_offset'], *self.compact.offset)
+        glUniform3f(uniforms['position_scale'], *self.compact.scale)
+        return uniforms
+
+    def use_wireframe_program(self):
+        # The single-pass wireframe program for the current vertex format, with the camera, the
+        # viewport and line width in pixels, and the model's edge masks while the full mesh is drawn
+        program, uniforms = self.wireframe_programs[self.compact is not None]
+        glUseProgram(program)
+        if self.uploaded_wireframe_matrix_versions.get(program) != self.matrix_version:
+            self.set_matrix_uniforms(uniforms)
+            self.uploaded_wireframe_matrix_versions[program] = self.matrix_version
+        if self.compact is not None:
+            glUniform3f(uniforms['position_offset'], *self.compact.offset)
+            glUniform3f(uniforms['position_scale'], *self.compact.scale)
+        ratio = self.devicePixelRatioF()
+        glUniform2f(uniforms['viewport_size'], self.width() * ratio, self.height() * ratio)
+        glUniform1f(uniforms['wire_width'], self.wireframe_thickness * ratio)
+        glUniform4f(uniforms['wire_color'], 0.0, 0.0, 0.0, 1.0)
+        glUniform1i(uniforms['first_triangle'], 0)
+        # LOD levels have no record of which edges are diagonals, so they show all of them
+        glUniform1i(uniforms['use_edge_masks'], self.lod_level == 0 and self.bind_edge_masks())
+        glUniform1i(uniforms['edge_masks'], 0)
+        return uniforms
+
+    def bind_edge_masks(self):
+        # Binds the texture buffer of the model's triangle_edges to unit 0, refilling it when the
+        # displayed mesh changed; False without a mesh
+        if self.mesh is None:
+            return False
+        masks = self.mesh.triangle_edges
+        if self.edge_mask_texture is None:
+            self.edge_mask_buffer = glGenBuffers(1)
+            self.edge_mask_texture = glGenTextures(1)
+        if self.edge_masks is not masks:
+            glBindBuffer(GL_TEXTURE_BUFFER, self.edge_mask_buffer)
+            glBufferData(GL_TEXTURE_BUFFER, max(masks.nbytes, 1), np.ascontiguousarray(masks) if len(masks) else None,
+                         GL_STATIC_DRAW)
+            glBindBuffer(GL_TEXTURE_BUFFER, 0)
+            glBindTexture(GL_TEXTURE_BUFFER, self.edge_mask_texture)
+            glTexBuffer(GL_TEXTURE_BUFFER, GL_R8UI, self.edge_mask_buffer)
+            self.edge_masks = masks
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_BUFFER, self.edge_mask_texture)
+        return True
+
+    def draw_scene(self):
+        # Every mesh's copies in one instanced call on the shader path, one call per copy otherwise.
+        # Leaves the main shader program bound when shaders are active.
+        if not self.scene.meshes:
+            return
+        instanced = self.shaders_active() and self.instanced_program is not None
+        if instanced:
+            glUseProgram(self.instanced_program)
+            if self.uploaded_scene_matrix_version != self.matrix_version:
+                self.set_matrix_uniforms(self.instanced_uniforms)
+                self.uploaded_scene_matrix_version = self.matrix_version
+            glUniform1i(self.instanced_uniforms['lighting'], 1)
+            glUniform4f(self.instanced_uniforms['color'], 0.8, 0.8, 0.8, 1.0)
+        elif self.shaders_active():
+            glUseProgram(0)
+            self.load_fixed_function_matrices()
+
+        calls = self.scene.draw(instanced)
+        if self.wireframe_mode:
+            glLineWidth(self.wireframe_thickness)
+            glDepthFunc(GL_LEQUAL)
+            if instanced:
+                glUniform1i(self.instanced_uniforms['lighting'], 0)
+                glUniform4f(self.instanced_uniforms['color'], 0.0, 0.0, 0.0, 1.0)
+            else:
+                glDisable(GL_LIGHTING)
+                glColor3f(0.0, 0.0, 0.0)
+            calls += self.scene.draw(instanced, wireframe=True)
+            glDepthFunc(GL_LESS)
+            if not instanced:
+                glEnable(GL_LIGHTING)
+
+        if self.shaders_active():
+            glUseProgram(self.shader_program)
+        stats = (self.scene.drawn_count, calls)
+        if stats != self.scene_stats:
+            self.scene_stats = stats
+            self.scene_drawn.emit(*stats)
+
+    def create_vertex_array(self, vertex_buffer, element_buffer):
+        # VAO capturing the interleaved position/normal layout of a vertex buffer and an element buffer
+        vao = glGenVertexArrays(1)
+        glBindVertexArray(vao)
+        vertex_buffer.bind()
+        self.set_vertex_attributes(vertex_buffer.data.dtype == np.int16)
+        element_buffer.bind()
+        glBindVertexArray(0)
+        element_buffer.unbind()
+        vertex_buffer.unbind()
+        return vao
+
+    def set_vertex_attributes(self, compact=False):
+        # Position and normal attributes for the bound interleaved vertex buffer
+        if compact:
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 3, GL_SHORT, GL_TRUE, COMPACT_STRIDE, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 2, GL_SHORT, GL_TRUE, COMPACT_STRIDE, ctypes.c_void_p(NORMAL_OFFSET))
+            return
+        stride = 6 * np.dtype('float32').itemsize
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * np.dtype('float32').itemsize))
+
+    def release_buffers(self):
+        # Free the previous model's GL objects; the context must be current
+        self.mesh = None
+        self.compact = None
+        self.release_lod_buffers()
+        self.bvh = None
+        if self.current_pick is not None:
+            self.set_pick(None)
+        self.set_topology_report(None)
+        for vao in (self.vao, self.wireframe_vao):
+            if vao is not None:
+                glDeleteVertexArrays(1, [vao])
+        self.vao = None
+        self.wireframe_vao = None
+        for buffer in (self.vbo, self.ebo, self.wireframe_ebo):
+            if buffer is not None:
+                buffer.delete()
+        self.vbo = None
+        self.ebo = None
+        self.wireframe_ebo = None
+        if self.stream_vao is not None:
+            glDeleteVertexArrays(1, [self.stream_vao])
+        if self.stream_buffer is not None:
+            glDeleteBuffers(1, [self.stream_buffer])
+        self.stream_vao = None
+        self.stream_buffer = None
+        self.streamed_vertices = 0
+
+    def detach_model(self):
+        # Moves the displayed model's buffers and arrays out of the widget without freeing them, for
+        # attach_model to bring back; None for streamed models or no model
+        if self.vbo is None:
+            return None
+        buffers = ModelBuffers({name: getattr(self, name) for name in ModelBuffers.FIELDS})
+        self.vbo = self.ebo = self.wireframe_ebo = self.vao = self.wireframe_vao = None
+        self.lod_vbo = self.lod_ebo = self.lod_vao = None
+        self.makeCurrent()
+        self.release_buffers()
+        self.doneCurrent()
+        return buffers
+
+    def attach_model(self, buffers):
+        # Displays a model from detach_model again; its GL objects are reused when still resident,
+        # otherwise uploaded from its arrays
+        self.makeCurrent()
+        self.release_buffers()
+        if buffers.resident:
+            for name in ModelBuffers.FIELDS:
+                setattr(self, name, buffers.__dict__[name])
+            self.culling_key = None
+            self.model_drawn_pending = True
+            self.doneCurrent()
+            self.lod_changed.emit(0, self.triangle_count)
+            self.update_bounds()
+            self.layout_scene()
+            self.focus_model()
+            self.refresh_vertex_format()
+            self.vertex_format_changed.emit(self.compact)
+        else:
+            self.doneCurrent()
+            self.upload_mesh(buffers.mesh)
+            if buffers.lods is not None:
+                self.upload_lods(buffers.lods)
+            self.set_bvh(buffers.bvh)
+
+    def release_model(self, buffers):
+        # Frees the GL objects of detached buffers; their CPU arrays stay until they are dropped
+        self.makeCurrent()
+        for vao in (buffers.vao, buffers.wireframe_vao, buffers.lod_vao):
+            if vao is not None:
+                glDeleteVertexArrays(1, [vao])
+        for buffer in (buffers.vbo, buffers.ebo, buffers.wireframe_ebo, buffers.lod_vbo, buffers.lod_ebo):
+            if buffer is not None:
+                buffer.delete()
+        self.doneCurrent()
+        buffers.vbo = buffers.ebo = buffers.wireframe_ebo = buffers.vao = buffers.wireframe_vao = None
+        buffers.lod_vbo = buffers.lod_ebo = buffers.lod_vao = None
+
+    def release_lod_buffers(self):
+        if self.lod_vao is not None:
+            glDeleteVertexArrays(1, [self.lod_vao])
+        for buffer in (self.lod_vbo, self.lod_ebo):
+            if buffer is not None:
+                buffer.delete()
+        self.lod_vao = None
+        self.lod_vbo = None
+        self.lod_ebo = None
+        self.lods = None
+        if self.lod_level != 0:
+            self.lod_level = 0
+            self.lod_changed.emit(0, self.triangle_count)
+
+
+    def model_extent(self):
+        # (min corner, max corner) around the main model and every scene instance, None when empty
+        boxes = []
+        if len(self.vertex_coords):
+            boxes.append((np.min(self.vertex_coords, axis=0), np.max(self.vertex_coords, axis=0)))
+        scene_bounds = self.scene.bounds()
+        if scene_bounds is not None:
+            boxes.append(scene_bounds)
+        if not boxes:
+            return None
+        return np.min([low for low, _ in boxes], axis=0), np.max([high for _, high in boxes], axis=0)
 
     def focus_model(self):
-        if len(self.vertex_coords) == 0:
+        with load_profile.stage('Focusing', positions=len(self.vertex_coords)):
+            extent = self.model_extent()
+        if extent is None:
             return
 
-        min_corner = np.min(self.vertex_coords, axis=0)
-        max_corner = np.max(self.vertex_coords, axis=0)
+        min_corner, max_corner = extent
         bounding_box_center = (max_corner + min_corner) / 2
         bounding_box_size = max_corner - min_corner
         self.camera_pos[2] = max(bounding_box_size) * 1.5
@@ -303,97 +939,253 @@ class OpenGLWidget(QOpenGLWidget):
         self.update()
 
     def load_model(self, file_path):
-        self.vertex_coords = []
-        normal_coords = []
-        vertex_data = []
-        self.tris = []
-        self.quads = []
-        self.ngons = []
-        unique_edges = set()
-
-        # First pass to read vertex and normal coordinates
-        with open(file_path, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith('#') or not line:
-                    continue  # Skip comments and empty lines
-
-                if line.startswith('v '):
-                    self.vertex_coords.append([float(val) for val in line.split()[1:4]])
-                elif line.startswith('vn '):
-                    normal_coords.append([float(val) for val in line.split()[1:4]])
-
-        self.vertex_coords = np.array(self.vertex_coords, dtype=np.float32)
-        normal_coords = np.array(normal_coords, dtype=np.float32)
-
-        # Check if normals are provided, if not generate them
-        generate_normals = len(normal_coords) == 0
-        if generate_normals:
-            normal_coords = np.zeros_like(self.vertex_coords)
-
-        # Second pass to read face data
-        with open(file_path, 'r') as file:
-            for line in file:
-                line = line.strip()
-                if line.startswith('#') or not line:
-                    continue  # Skip comments and empty lines
-
-                if line.startswith('f '):
-                    vertices = line.split()[1:]
-                    face_vertex_indices = [list(map(int, v.split('/'))) for v in vertices]
-
-                    # Create edges and add to set for uniqueness
-                    for i in range(len(face_vertex_indices)):
-                        idx1 = face_vertex_indices[i][0] - 1
-                        idx2 = face_vertex_indices[(i + 1) % len(face_vertex_indices)][0] - 1
-                        edge = tuple(sorted((idx1, idx2)))
-                        unique_edges.add(edge)
-
-                    face_indices = [idx[0] - 1 for idx in face_vertex_indices]
-                    if len(face_vertex_indices) == 3:  # Triangles
-                        self.tris.append(face_indices)
-                    elif len(face_vertex_indices) == 4:  # Quads
-                        self.quads.append(face_indices)
-                    else:  # Ngons (5 or more vertices)
-                        self.ngons.append(face_indices)
-
-                    # Generate normals if needed
-                    if generate_normals:
-                        v0, v1, v2 = [self.vertex_coords[i] for i in face_indices[:3]]
-                        face_normal = np.cross(v1 - v0, v2 - v0)
-                        face_normal /= np.linalg.norm(face_normal)  # Normalize the normal
-                        for i in face_indices:
-                            normal_coords[i] += face_normal
-
-                    for i in range(1, len(face_vertex_indices) - 1):
-                        indices = [face_vertex_indices[0], face_vertex_indices[i], face_vertex_indices[i + 1]]
-                        for idx in indices:
-                            vertex_index = idx[0] - 1
-                            normal_index = idx[2] - 1 if len(idx) == 3 else vertex_index
-                            if vertex_index < len(self.vertex_coords) and (normal_index < len(normal_coords) or generate_normals):
-                                vertex_data.extend(self.vertex_coords[vertex_index])
-                                vertex_data.extend(normal_coords[normal_index])
-
-        # Normalize the generated normals
-        if generate_normals:
-            for i in range(len(normal_coords)):
-                normal_coords[i] /= np.linalg.norm(normal_coords[i])  # Normalize to length 1
-                normal_coords[i] *= 0.3  # Scale to 30% of original length
-
-        vertex_data = np.array(vertex_data, dtype=np.float32)
-        self.vbo = vbo.VBO(vertex_data)
-        self.vbo.bind()
+        self.upload_mesh(load_mesh(file_path))
+
+    def upload_mesh(self, mesh, focus=True):
+        # Runs on the GUI thread with a MeshData built elsewhere (see model_loader.py); focus=False
+        # keeps the camera where it is
+        self.makeCurrent()
+        self.release_buffers()
+        self.vertex_coords = mesh.vertex_coords
+
+        self.mesh = mesh
+
+        with load_profile.stage('Uploading buffers', bytes=mesh.indexed_bytes):
+            self.ebo = vbo.VBO(mesh.indices, target=GL_ELEMENT_ARRAY_BUFFER)
+            self.ebo.bind()
+            self.unindexed_bytes = mesh.unindexed_bytes
+
+            # Wireframe edges index the same vertex buffer
+            self.wireframe_ebo = vbo.VBO(mesh.wireframe_indices, target=GL_ELEMENT_ARRAY_BUFFER)
+            self.upload_vertex_buffers()
+
+        self.vertex_count = mesh.vertex_count
+        self.edge_count = mesh.edge_count
+        self.face_count = mesh.face_count
+        self.triangle_count = len(mesh.indices) // 3
+        self.chunk_offsets = mesh.chunk_offsets
+        self.chunk_bounds = mesh.chunk_bounds
+        self.culling_key = None
+        self.model_drawn_pending = True
+        self.doneCurrent()
+        self.lod_changed.emit(0, self.triangle_count)
+
+        with load_profile.stage('Computing bounds', positions=len(self.vertex_coords)):
+            self.update_bounds()
+        self.layout_scene()
+        if focus:
+            self.focus_model()
+
+    def update_mesh(self, mesh):
+        # A reloaded version of the displayed model: buffers keeping their size and type are patched
+        # where the arrays differ, the others reallocated under the same names so the VAOs stay valid.
+        # The camera is kept. Returns a buffer_updates.BufferUpdate.
+        if self.mesh is None:
+            self.upload_mesh(mesh, focus=False)
+            update = BufferUpdate()
+            update.reallocated = ['vertices', 'triangles', 'edges']
+            update.total_bytes = self.uploaded_bytes
+            return update
+
+        self.makeCurrent()
+        # LODs, picking and topology belong to the old version; the loader rebuilds the first two
+        self.release_lod_buffers()
+        self.bvh = None
+        if self.current_pick is not None:
+            self.set_pick(None)
+        self.set_topology_report(None)
+
+        update = BufferUpdate()
+        vertex_data = mesh.vertex_data
+        if self.compact is not None:
+            # Keep the old quantization box while the model still fits in it, so unchanged vertices
+            # quantize to the same values
+            coords = mesh.vertex_coords
+            low, high = self.compact.offset - self.compact.scale, self.compact.offset + self.compact.scale
+            inside = len(coords) and np.all(coords.min(axis=0) >= low) and np.all(coords.max(axis=0) <= high)
+            self.compact = compact_vertices(vertex_data, (self.compact.offset, self.compact.scale) if inside else None)
+            vertex_data = self.compact.data
+        glBindVertexArray(0)
+        self.patch_buffer('vertices', self.vbo, vertex_data, 6, update)
+        self.patch_buffer('triangles', self.ebo, mesh.indices, 3, update)
+        self.patch_buffer('edges', self.wireframe_ebo, mesh.wireframe_indices, 2, update)
+        self.mesh = mesh
+        self.vertex_coords = mesh.vertex_coords
+        self.unindexed_bytes = mesh.unindexed_bytes
+        self.update_uploaded_bytes()
+        update.total_bytes = self.uploaded_bytes
+
+        self.vertex_count = mesh.vertex_count
+        self.edge_count = mesh.edge_count
+        self.face_count = mesh.face_count
+        self.triangle_count = len(mesh.indices) // 3
+        self.chunk_offsets = mesh.chunk_offsets
+        self.chunk_bounds = mesh.chunk_bounds
+        self.culling_key = None
+        self.doneCurrent()
+        self.lod_changed.emit(0, self.triangle_count)
+        if self.compact is not None:
+            self.vertex_format_changed.emit(self.compact)
+
+        self.update_bounds()
+        self.layout_scene()
+        return update
+
+    def patch_buffer(self, name, buffer, data, row_size, update):
+        # Sends only the changed ranges of data when the buffer keeps its size and type
+        if buffer.data.dtype == data.dtype and buffer.data.shape == data.shape:
+            ranges = changed_ranges(buffer.data, data, row_size)
+            buffer.bind()
+            for start, stop in ranges:
+                glBufferSubData(buffer.target, start * data.itemsize, (stop - start) * data.itemsize, data[start:stop])
+            buffer.data = data
+            update.add_ranges(name, ranges, data.itemsize)
+        else:
+            buffer.set_array(data)
+            buffer.bind()  # glBufferData on the same buffer name
+            update.reallocated.append(name)
+        buffer.unbind()
+
+    def update_bounds(self):
+        if len(self.vertex_coords):
+            min_corner = np.min(self.vertex_coords, axis=0)
+            max_corner = np.max(self.vertex_coords, axis=0)
+            self.bounding_center = (min_corner + max_corner) / 2
+            self.bounding_radius = float(np.linalg.norm(max_corner - min_corner)) / 2
+
+    def begin_stream(self, scan, focus=True):
+        # Allocate the GPU buffer for a streamed model (obj_stream.StreamedObj) without filling it;
+        # append_stream() then uploads triangle blocks into it as they are parsed
+        self.makeCurrent()
+        self.release_buffers()
+        self.vertex_coords = scan.positions
+        self.stream_buffer = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.stream_buffer)
+        glBufferData(GL_ARRAY_BUFFER, scan.buffer_bytes, None, GL_STATIC_DRAW)
+        if self.shader_program is not None:
+            self.stream_vao = glGenVertexArrays(1)
+            glBindVertexArray(self.stream_vao)
+            self.set_vertex_attributes()
+            glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.uploaded_bytes = scan.buffer_bytes
+        self.unindexed_bytes = scan.buffer_bytes
+
+        self.vertex_count = len(scan.positions)
+        self.edge_count = '-'  # Unique edges need the whole face list
+        self.face_count = scan.face_count
+        self.triangle_count = scan.triangle_count
+        self.chunk_offsets = np.zeros(1, dtype=np.int64)
+        self.chunk_bounds = np.zeros((0, 2, 3), dtype=np.float32)
+        self.culling_key = None
+        self.doneCurrent()
+        self.lod_changed.emit(0, self.triangle_count)
+
+        with load_profile.stage('Computing bounds', positions=len(self.vertex_coords)):
+            self.update_bounds()
+        self.layout_scene()
+        if focus:
+            self.focus_model()
+
+    def append_stream(self, block):
+        # Upload a (N, 6) float32 block of triangle corners after those already streamed
+        if self.stream_buffer is None:
+            return
+        self.makeCurrent()
+        with load_profile.stage('Uploading blocks', bytes=block.nbytes, triangles=len(block) // 3):
+            glBindBuffer(GL_ARRAY_BUFFER, self.stream_buffer)
+            glBufferSubData(GL_ARRAY_BUFFER, self.streamed_vertices * block.itemsize * 6, block.nbytes, block)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.doneCurrent()
+        self.model_drawn_pending = self.model_drawn_pending or self.streamed_vertices == 0
+        self.streamed_vertices += len(block)
+        self.update()
 
-        # Create VBOs for wireframes after vertices have been parsed
-        self.wireframe_vbo_tris = self.create_wireframe_vbo(self.tris)
-        self.wireframe_vbo_quads = self.create_wireframe_vbo(self.quads)
-        self.wireframe_vbo_ngons = self.create_wireframe_vbo(self.ngons)
+    def add_scene_mesh(self, key, file_path, mesh, copies=1):
+        # copies instances of a model beside the main one; mesh may be None when the key (see
+        # scene.mesh_key) is already in the scene, whose buffers are then shared
+        self.makeCurrent()
+        added = self.scene.add(key, file_path, mesh, copies, self.instanced_program is not None)
+        self.doneCurrent()
+        if added:
+            self.layout_scene()
+            self.focus_model()
+        return added
 
-        self.vertex_count = len(self.vertex_coords)
-        self.edge_count = len(unique_edges)
-        self.face_count = len(self.tris) + len(self.quads) + len(self.ngons)
+    def clear_scene(self):
+        self.makeCurrent()
+        self.scene.release()
+        self.doneCurrent()
+        self.update()
 
-        self.focus_model()
+    def layout_scene(self):
+        # The grid starts one cell to the right of the main model, or at the origin without one
+        origin = np.zeros(3)
+        if len(self.vertex_coords):
+            origin = self.bounding_center + (self.bounding_radius + self.scene.cell_size() / 2, 0.0, 0.0)
+        self.scene.layout(origin)
+        self.update()
+
+    def model_counts(self):
+        # (vertices, edges, faces) of the main model and every scene instance together
+        vertices, edges, faces, _ = self.scene.counts()
+        edges = '-' if self.edge_count == '-' else self.edge_count + edges
+        return self.vertex_count + vertices, edges, self.face_count + faces
+
+    def memory_totals(self):
+        # (bytes uploaded, bytes as flat per-copy geometry) including the scene
+        return self.uploaded_bytes + self.scene.gpu_bytes, self.unindexed_bytes + self.scene.unindexed_bytes
+
+    def upload_vertex_buffers(self):
+        # The model's and its LOD levels' vertex buffers in the current format, compact or float, and
+        # the VAOs reading them; element buffers are kept. The context must be current.
+        for vao in (self.vao, self.wireframe_vao):
+            if vao is not None:
+                glDeleteVertexArrays(1, [vao])
+        self.vao = None
+        self.wireframe_vao = None
+        if self.vbo is not None:
+            self.vbo.delete()
+
+        self.compact = compact_vertices(self.mesh.vertex_data) if self.compact_active() else None
+        self.vbo = vbo.VBO(self.compact.data if self.compact is not None else self.mesh.vertex_data)
+        self.vbo.bind()
+        if self.shader_program is not None:
+            self.vao = self.create_vertex_array(self.vbo, self.ebo)
+            self.wireframe_vao = self.create_vertex_array(self.vbo, self.wireframe_ebo)
+        if self.lods is not None:
+            self.upload_lod_vertices()
+        self.update_uploaded_bytes()
+        self.vertex_format_changed.emit(self.compact)
+
+    def upload_lod_vertices(self):
+        # LOD levels share the full model's quantization box
+        if self.lod_vao is not None:
+            glDeleteVertexArrays(1, [self.lod_vao])
+        if self.lod_vbo is not None:
+            self.lod_vbo.delete()
+        vertex_data = self.lods.vertex_data
+        if self.compact is not None:
+            vertex_data = compact_vertices(vertex_data, (self.compact.offset, self.compact.scale)).data
+        self.lod_vbo = vbo.VBO(vertex_data)
+        self.lod_vao = None
+        if self.shader_program is not None:
+            self.lod_vao = self.create_vertex_array(self.lod_vbo, self.lod_ebo)
+
+    def update_uploaded_bytes(self):
+        buffers = (self.vbo, self.ebo, self.wireframe_ebo, self.lod_vbo, self.lod_ebo)
+        self.uploaded_bytes = sum(buffer.data.nbytes for buffer in buffers if buffer is not None)
+
+    def upload_lods(self, lods):
+        # Decimated levels for the current model, built after it on the loader thread
+        self.makeCurrent()
+        self.release_lod_buffers()
+        self.lods = lods
+        self.lod_ebo = vbo.VBO(lods.indices, target=GL_ELEMENT_ARRAY_BUFFER)
+        self.upload_lod_vertices()
+        self.update_uploaded_bytes()
+        self.doneCurrent()
+        self.update()
 
     def keyPressEvent(self, event):
         self.setFocus()  # Set focus to the widget.
@@ -0,0 +1,180 @@
+# picking.py
+# Ray picking of faces, vertices and edges through a bounding volume hierarchy kept in flat NumPy arrays.
+# The tree is built bottom-up over Morton-ordered triangles, so both building and querying are a
+# handful of array operations per tree level rather than a Python loop per node. Nodes have eight
+# children to keep the number of levels, and with it the per-query overhead, small.
+
+import numpy as np
+from normals import cross_rows
+
+LEAF_SIZE = 8
+BRANCHING = 8
+MORTON_BITS = 10
+START_NODES = 512  # Traversal tests the deepest level this small in one go instead of descending from the root
+
+
+def spread_bits(values):
+    # Insert two zero bits after each of the low 10 bits, for interleaving three coordinates
+    values = values.astype(np.uint32) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+def morton_codes(points):
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    low = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - low, 1e-12)
+    cells = np.minimum(((points - low) / extent * (1 << MORTON_BITS)).astype(np.int64), (1 << MORTON_BITS) - 1)
+    return spread_bits(cells[:, 0]) << 2 | spread_bits(cells[:, 1]) << 1 | spread_bits(cells[:, 2])
+
+
+class Pick:
+    def __init__(self, face, triangle, point, vertex, vertex_position, edge, distance):
+        self.face = face  # OBJ face index, zero based
+        self.triangle = triangle  # Index into MeshData.indices // 3
+        self.point = point  # Hit position in model space
+        self.vertex = vertex  # OBJ vertex index of the hit triangle's corner nearest the hit
+        self.vertex_position = vertex_position
+        self.edge = edge  # (OBJ vertex, OBJ vertex) of the nearest face edge of the hit triangle
+        self.distance = distance  # Along the ray, in ray direction units
+
+
+class TriangleBVH:
+    def __init__(self, mesh):
+        # Triangle corner positions come from the render buffers, so picks match what is drawn
+        positions = mesh.vertex_data.reshape(-1, 6)[:, :3]
+        triangles = np.asarray(mesh.indices, dtype=np.int64).reshape(-1, 3)
+        self.mesh = mesh
+        self.order = np.argsort(morton_codes(positions[triangles].mean(axis=1)), kind='stable')
+        self.corners = np.ascontiguousarray(positions[triangles[self.order]])  # (T, 3, 3) in tree order
+
+        # Leaves hold LEAF_SIZE consecutive triangles; each level above groups BRANCHING nodes of
+        # the one below. Level k is node_bounds[level_offsets[k]:level_offsets[k + 1]], root first,
+        # and the children of node i on one level are nodes BRANCHING * i onwards on the next.
+        # node_low and node_high hold the box corners of every node, level after level.
+        flat = self.corners.reshape(-1, 3)
+        leaf_starts = np.arange(0, len(self.corners), LEAF_SIZE) * 3
+        if len(leaf_starts):
+            low = np.minimum.reduceat(flat, leaf_starts, axis=0)
+            high = np.maximum.reduceat(flat, leaf_starts, axis=0)
+        else:
+            low = high = np.zeros((0, 3), dtype=np.float32)
+        levels = [(low, high)]
+        while len(low) > 1:
+            groups = np.arange(0, len(low), BRANCHING)
+            low = np.minimum.reduceat(low, groups, axis=0)
+            high = np.maximum.reduceat(high, groups, axis=0)
+            levels.append((low, high))
+        levels.reverse()
+        self.level_offsets = np.cumsum([0] + [len(level_low) for level_low, _ in levels])
+        self.node_low = np.concatenate([level_low for level_low, _ in levels]).astype(np.float32)
+        self.node_high = np.concatenate([level_high for _, level_high in levels]).astype(np.float32)
+
+        # Triangles grouped by OBJ face, for highlighting a whole picked face
+        self.face_order = np.argsort(mesh.triangle_faces, kind='stable')
+        self.face_starts = np.searchsorted(mesh.triangle_faces[self.face_order], np.arange(mesh.face_count + 1))
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.corners.nbytes + self.node_low.nbytes * 2 + self.face_order.nbytes
+
+    def candidate_triangles(self, origin, direction):
+        # Tree-order triangles in every leaf the ray passes through, one tree level at a time
+        if len(self.corners) == 0:
+            return np.zeros(0, dtype=np.int64)
+        # Axis-parallel rays get a tiny component instead of a division by zero
+        inverse = (1.0 / np.where(np.abs(direction) < 1e-30, 1e-30, direction)).astype(np.float32)
+        origin = origin.astype(np.float32)
+        level_sizes = np.diff(self.level_offsets)
+        start = int(np.flatnonzero(level_sizes <= START_NODES)[-1])
+        frontier = np.arange(level_sizes[start])
+        for level in range(start, len(level_sizes)):
+            if level > start:
+                frontier = (frontier[:, None] * BRANCHING + np.arange(BRANCHING)).ravel()
+                frontier = frontier[frontier < level_sizes[level]]
+            nodes = self.level_offsets[level] + frontier
+            near = (self.node_low[nodes] - origin) * inverse
+            far = (self.node_high[nodes] - origin) * inverse
+            entry = np.minimum(near, far).max(axis=1)
+            exit = np.maximum(near, far).min(axis=1)
+            frontier = frontier[(entry <= exit) & (exit >= 0)]
+            if len(frontier) == 0:
+                return frontier
+        candidates = (frontier[:, None] * LEAF_SIZE + np.arange(LEAF_SIZE)).ravel()
+        return candidates[candidates < len(self.corners)]
+
+    def intersect(self, origin, direction):
+        # Nearest (tree-order triangle, distance) hit by the ray, either side facing, or None
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        candidates = self.candidate_triangles(origin, direction)
+        if len(candidates) == 0:
+            return None
+
+        # Moller-Trumbore on every candidate at once
+        corners = self.corners[candidates].astype(np.float64)
+        edge1 = corners[:, 1] - corners[:, 0]
+        edge2 = corners[:, 2] - corners[:, 0]
+        p = cross_rows(np.broadcast_to(direction, edge2.shape), edge2)
+        determinant = np.einsum('ij,ij->i', edge1, p)
+        usable = np.abs(determinant) > 1e-12
+        inverse = np.where(usable, 1.0 / np.where(usable, determinant, 1.0), 0.0)
+        s = origin - corners[:, 0]
+        u = np.einsum('ij,ij->i', s, p) * inverse
+        q = cross_rows(s, edge1)
+        v = (q @ direction) * inverse
+        t = np.einsum('ij,ij->i', edge2, q) * inverse
+        hit = usable & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
+        if not np.any(hit):
+            return None
+        best = np.flatnonzero(hit)[np.argmin(t[hit])]
+        return candidates[best], t[best]
+
+    def pick(self, origin, direction):
+        # Pick for a model-space ray, or None when it misses the mesh
+        result = self.intersect(origin, direction)
+        if result is None:
+            return None
+        tree_triangle, distance = result
+        point = np.asarray(origin, dtype=np.float64) + distance * np.asarray(direction, dtype=np.float64)
+        corners = self.corners[tree_triangle].astype(np.float64)
+        triangle = int(self.order[tree_triangle])
+        buffer_vertices = np.asarray(self.mesh.indices[triangle * 3:triangle * 3 + 3], dtype=np.int64)
+        obj_vertices = self.mesh.vertex_ids[buffer_vertices]
+
+        nearest = int(np.argmin(np.linalg.norm(corners - point, axis=1)))
+
+        # Distance from the hit to each triangle edge that is also an edge of the OBJ face
+        starts = corners
+        ends = corners[[1, 2, 0]]
+        spans = ends - starts
+        along = np.clip(np.einsum('ij,ij->i', point - starts, spans) /
+                        np.maximum(np.einsum('ij,ij->i', spans, spans), 1e-30), 0, 1)
+        edge_distances = np.linalg.norm(starts + along[:, None] * spans - point, axis=1)
+        real_edges = (int(self.mesh.triangle_edges[triangle]) >> np.arange(3)) & 1
+        edge_distances[real_edges == 0] = np.inf
+        edge = int(np.argmin(edge_distances))
+
+        return Pick(int(self.mesh.triangle_faces[triangle]), triangle, point,
+                    int(obj_vertices[nearest]), corners[nearest],
+                    (int(obj_vertices[edge]), int(obj_vertices[(edge + 1) % 3])), float(distance))
+
+    def face_triangles(self, face):
+        # Triangles (indices into MeshData.indices // 3) that make up an OBJ face
+        return self.face_order[self.face_starts[face]:self.face_starts[face + 1]]
+
+
+def screen_ray(x, y, width, height, projection, view, model):
+    # Model-space (origin, direction) of the ray through widget pixel (x, y), top-left origin
+    inverse = np.linalg.inv(projection.astype(np.float64) @ view @ model)
+    ndc_x = 2.0 * x / width - 1.0
+    ndc_y = 1.0 - 2.0 * y / height
+    near = inverse @ np.array([ndc_x, ndc_y, -1.0, 1.0])
+    far = inverse @ np.array([ndc_x, ndc_y, 1.0, 1.0])
+    near = near[:3] / near[3]
+    far = far[:3] / far[3]
+    return near, far - near
@@ -0,0 +1,148 @@
+# recent_models.py
+# Recently displayed models kept in memory for instant switching: their GPU buffers while they fit a VRAM budget, and their CPU
+# arrays (MeshData, LODs, picking tree) while they fit a RAM budget. Models over a budget go in order of idle time times size.
+
+import json
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+from file_watcher import file_signature
+
+MEGABYTE = 1024 * 1024
+DEFAULT_GPU_BUDGET = int(float(os.environ.get('MESH_INSPECTOR_RECENT_GPU_MB', 512)) * MEGABYTE)
+DEFAULT_CPU_BUDGET = int(float(os.environ.get('MESH_INSPECTOR_RECENT_RAM_MB', 1024)) * MEGABYTE)
+MENU_SIZE = 10
+
+
+def model_key(file_path, build_options=None):
+    return os.path.abspath(file_path), json.dumps(build_options or {}, sort_keys=True)
+
+
+def array_bytes(*objects):
+    # Bytes of the numpy arrays held by objects' attributes, counting arrays that view the same
+    # memory once
+    seen = set()
+    total = 0
+    for value in objects:
+        if value is None:
+            continue
+        for array in vars(value).values():
+            if isinstance(array, np.ndarray):
+                owner = array if array.base is None else array.base
+                if id(owner) not in seen:
+                    seen.add(id(owner))
+                    total += owner.nbytes if isinstance(owner, np.ndarray) else array.nbytes
+    return total
+
+
+class ModelBuffers:
+    # The per-model state of an OpenGLWidget, moved out of it so the GL objects can be kept alive
+    # and moved back later (see OpenGLWidget.detach_model and attach_model)
+    FIELDS = ('mesh', 'compact', 'vbo', 'ebo', 'wireframe_ebo', 'vao', 'wireframe_vao', 'lods', 'lod_vbo', 'lod_ebo',
+              'lod_vao', 'bvh', 'vertex_coords', 'vertex_count', 'edge_count', 'face_count', 'triangle_count',
+              'chunk_offsets', 'chunk_bounds', 'uploaded_bytes', 'unindexed_bytes')
+
+    def __init__(self, values):
+        for name in self.FIELDS:
+            setattr(self, name, values[name])
+        self.signature = None  # file_signature of the file when the mesh was read, set by SimpleObjViewer
+
+    @property
+    def resident(self):
+        return self.vbo is not None
+
+    @property
+    def gpu_bytes(self):
+        return self.uploaded_bytes if self.resident else 0
+
+    @property
+    def cpu_bytes(self):
+        return array_bytes(self.mesh, self.compact, self.lods, self.bvh)
+
+
+class RecentModel:
+    def __init__(self, key, file_path, buffers):
+        self.key = key
+        self.file_path = file_path
+        self.signature = buffers.signature  # The file as it was loaded; a changed file is a miss
+        self.buffers = buffers
+        self.last_used = time.monotonic()
+
+
+class RecentModels:
+    def __init__(self, gpu_budget=DEFAULT_GPU_BUDGET, cpu_budget=DEFAULT_CPU_BUDGET):
+        self.gpu_budget = gpu_budget
+        self.cpu_budget = cpu_budget
+        self.models = OrderedDict()  # key -> RecentModel, most recently used last
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.models)
+
+    @property
+    def gpu_bytes(self):
+        return sum(model.buffers.gpu_bytes for model in self.models.values())
+
+    @property
+    def cpu_bytes(self):
+        return sum(model.buffers.cpu_bytes for model in self.models.values())
+
+    def take(self, file_path, build_options=None):
+        # Removes and returns the model's ModelBuffers on a hit, counting hits and misses. A
+        # returned entry is owned by the caller; an outdated one is returned for release too.
+        key = model_key(file_path, build_options)
+        model = self.models.pop(key, None)
+        if model is None or model.signature != file_signature(file_path):
+            self.misses += 1
+            return None, model.buffers if model is not None else None
+        self.hits += 1
+        return model.buffers, None
+
+    def put(self, file_path, build_options, buffers):
+        # Keeps buffers of a model no longer displayed. Returns (ModelBuffers whose GL objects must
+        # be released, ModelBuffers to drop entirely), see OpenGLWidget.release_model.
+        key = model_key(file_path, build_options)
+        previous = self.models.pop(key, None)
+        self.models[key] = RecentModel(key, file_path, buffers)
+        released, dropped = self.enforce_budgets()
+        if previous is not None:
+            dropped.append(previous.buffers)
+        return released, dropped
+
+    def eviction_order(self):
+        # Largest idle time times size first, so one big stale model goes before several small ones
+        now = time.monotonic()
+        return sorted(self.models.values(), key=lambda model: (now - model.last_used + 1.0) *
+                      max(model.buffers.gpu_bytes + model.buffers.cpu_bytes, 1), reverse=True)
+
+    def enforce_budgets(self):
+        # Models whose GL objects go over the VRAM budget keep their CPU arrays, so switching back
+        # only uploads them again; models over the RAM budget are dropped
+        released = []
+        gpu_bytes = self.gpu_bytes
+        for model in self.eviction_order():
+            if gpu_bytes <= self.gpu_budget:
+                break
+            if model.buffers.resident:
+                gpu_bytes -= model.buffers.gpu_bytes
+                released.append(model.buffers)
+        dropped = []
+        cpu_bytes = self.cpu_bytes
+        for model in self.eviction_order():
+            if cpu_bytes <= self.cpu_budget:
+                break
+            cpu_bytes -= model.buffers.cpu_bytes
+            del self.models[model.key]
+            dropped.append(model.buffers)
+        return released, dropped
+
+    def recent(self, count=MENU_SIZE):
+        # (file path, resident on the GPU) of the most recently used models first
+        return [(model.file_path, model.buffers.resident) for model in reversed(self.models.values())][:count]
+
+    def clear(self):
+        buffers = [model.buffers for model in self.models.values()]
+        self.models.clear()
+        return buffers
@@ -0,0 +1,203 @@
+# render_thumbnails.py
+# Headless PNG thumbnails and turntables for many OBJ files. One offscreen GL context (offscreen.py) draws every model with the
+# viewer's own paintGL, keeping its shader programs and buffer objects from model to model, while the next files load on a
+# background thread and finished images are written on another.
+
+import offscreen  # Picks the EGL platform; must come before anything importing OpenGL
+import argparse
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt5.QtGui import QColor, QImage
+from mesh_builder import load_mesh
+from mesh_cache import MeshCache, find_obj_files
+
+DEFAULT_SIZE = '256x256'
+DEFAULT_ANGLE = 30.0
+DEFAULT_ELEVATION = 20.0
+DEFAULT_BACKGROUND = '#464646'  # The viewer's background
+FIELD_OF_VIEW = 45.0  # Vertical, in degrees, as OpenGLWidget.camera_matrices sets it at zoom 1
+FRAMING_MARGIN = 1.1  # Space around the model's bounding sphere
+PREFETCH = 2  # Files loading ahead of the one being drawn
+
+
+def image_size(text):
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{text}'")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"image size must be positive, got '{text}'")
+    return width, height
+
+
+def aim_camera(widget, angle, elevation):
+    # Looks at the model's box centre from angle degrees around +Y and elevation degrees above it,
+    # far enough back that the bounding sphere fits whatever the angle; mouse rotation, pan and zoom
+    # are reset
+    low, high = widget.model_extent()
+    center = (low + high) / 2
+    radius = max(float(np.linalg.norm(high - low)) / 2, 1e-6) * FRAMING_MARGIN
+    half_fov = math.radians(FIELD_OF_VIEW) / 2
+    if widget.width() < widget.height():
+        half_fov = math.atan(math.tan(half_fov) * widget.width() / widget.height())
+    distance = radius / math.sin(half_fov)
+    angle, elevation = math.radians(angle), math.radians(elevation)
+    direction = np.array([math.sin(angle) * math.cos(elevation), math.sin(elevation),
+                          math.cos(angle) * math.cos(elevation)])
+    widget.camera_pos = [float(value) for value in center + distance * direction]
+    widget.camera_front = [float(value) for value in -direction]
+    widget.rotation_x = widget.rotation_y = 0
+    widget.pan_x = widget.pan_y = 0
+    widget.zoom = 1.0
+    widget.near_clip = distance - radius
+    widget.far_clip = distance + radius
+
+
+def save_png(pixels, file_path):
+    height, width = pixels.shape[:2]
+    image = QImage(pixels.data, width, height, width * 4, QImage.Format_RGBA8888)
+    if not image.save(file_path, 'PNG'):
+        raise OSError(f'Could not write {file_path}')
+
+
+def image_paths(file_path, output_dir, frames, used_names):
+    # <name>.png, or <name>_000.png ... for a turntable; files of the same name get -2, -3, ...
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    used_names[name] = used_names.get(name, 0) + 1
+    if used_names[name] > 1:
+        name += f'-{used_names[name]}'
+    if frames == 0:
+        return [os.path.join(output_dir, name + '.png')]
+    return [os.path.join(output_dir, f'{name}_{frame:03d}.png') for frame in range(frames)]
+
+
+class ThumbnailRenderer:
+    def __init__(self, width, height, cache=None, build_options=None):
+        self.widget = offscreen.OffscreenWidget(width, height)
+        self.cache = cache
+        self.build_options = build_options or {}
+
+    def load(self, file_path):
+        # Runs on the loader thread; numpy and file reads release the GIL while the GL thread draws
+        if self.cache is not None:
+            return self.cache.load(file_path, None, self.build_options)
+        return load_mesh(file_path, **self.build_options)
+
+    def render(self, mesh, angles, elevation):
+        # One (height, width, 4) RGBA frame per angle. update_mesh refills the existing buffer
+        # objects instead of creating new ones for every model.
+        self.widget.update_mesh(mesh)
+        frames = []
+        for angle in angles:
+            aim_camera(self.widget, angle, elevation)
+            frames.append(np.ascontiguousarray(self.widget.render()))
+        return frames
+
+    def render_files(self, file_paths, output_dir, frames=0, angle=DEFAULT_ANGLE, elevation=DEFAULT_ELEVATION,
+                     prefetch=PREFETCH):
+        # Renders every file, printing a line per file. Returns (images written, failures, seconds
+        # spent waiting on loads, elapsed seconds).
+        angles = [angle] if frames == 0 else [angle + 360.0 * frame / frames for frame in range(frames)]
+        images = failures = 0
+        load_wait = 0.0
+        used_names = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as loader, ThreadPoolExecutor(max_workers=1) as writer:
+            remaining = iter(file_paths)
+            pending = deque()
+            writes = []
+            for file_path in remaining:
+                pending.append((file_path, loader.submit(self.load, file_path)))
+                if len(pending) > prefetch:
+                    break
+            while pending:
+                file_path, loading = pending.popleft()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending.append((next_path, loader.submit(self.load, next_path)))
+                wait_start = time.perf_counter()
+                try:
+                    mesh = loading.result()
+                except Exception as error:
+                    print(f'{file_path}: {type(error).__name__}: {error}', file=sys.stderr)
+                    failures += 1
+                    continue
+                waited = time.perf_counter() - wait_start
+                load_wait += waited
+
+                render_start = time.perf_counter()
+                pixels = self.render(mesh, angles, elevation)
+                rendered = time.perf_counter() - render_start
+                del mesh
+                for frame, image_path in zip(pixels, image_paths(file_path, output_dir, frames, used_names)):
+                    writes.append((image_path, writer.submit(save_png, frame, image_path)))
+                images += len(pixels)
+                print(f'{file_path}: {len(pixels)} images, waited {waited * 1000.0:.0f} ms for the load, '
+                      f'drew in {rendered * 1000.0:.0f} ms', file=sys.stderr)
+            for image_path, write in writes:
+                try:
+                    write.result()
+                except OSError as error:
+                    print(error, file=sys.stderr)
+                    images -= 1
+        return images, failures, load_wait, time.perf_counter() - start
+
+    def close(self):
+        self.widget.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render PNG thumbnails or turntables of OBJ files without a display.')
+    parser.add_argument('paths', nargs='+', help='OBJ files or directories to scan')
+    parser.add_argument('--output-dir', default='thumbnails', help='where images are written (default: thumbnails)')
+    parser.add_argument('--size', type=image_size, default=image_size(DEFAULT_SIZE),
+                        help=f'image size as WIDTHxHEIGHT (default {DEFAULT_SIZE})')
+    parser.add_argument('--turntable', type=int, default=0, metavar='FRAMES',
+                        help='write this many frames around the model instead of one thumbnail')
+    parser.add_argument('--angle', type=float, default=DEFAULT_ANGLE,
+                        help=f'camera angle around the model in degrees, the first turntable frame\'s (default {DEFAULT_ANGLE})')
+    parser.add_argument('--elevation', type=float, default=DEFAULT_ELEVATION,
+                        help=f'camera angle above the model in degrees, below 90 (default {DEFAULT_ELEVATION})')
+    parser.add_argument('--background', default=DEFAULT_BACKGROUND, help=f'colour name or #rrggbb (default {DEFAULT_BACKGROUND})')
+    parser.add_argument('--wireframe', action='store_true', help='draw edges over the shaded model')
+    parser.add_argument('--fixed-function', action='store_true', help='draw through the fixed-function path')
+    parser.add_argument('--no-cache', action='store_true', help='parse every file instead of using the mesh cache')
+    parser.add_argument('--prefetch', type=int, default=PREFETCH, help=f'files loading ahead (default {PREFETCH})')
+    args = parser.parse_args(argv)
+
+    if abs(args.elevation) >= 90.0:
+        parser.error('--elevation must be between -90 and 90 degrees')
+    background = QColor(args.background)
+    if not background.isValid():
+        parser.error(f"unknown colour '{args.background}'")
+    file_paths = list(find_obj_files(args.paths))
+    if not file_paths:
+        print('No OBJ files found', file=sys.stderr)
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    try:
+        renderer = ThumbnailRenderer(*args.size, None if args.no_cache else MeshCache())
+    except offscreen.OffscreenError as error:
+        print(f'Offscreen rendering unavailable: {error}', file=sys.stderr)
+        return 1
+    renderer.widget.bg_color = list(background.getRgbF())
+    renderer.widget.set_wireframe_mode(args.wireframe)
+    renderer.widget.set_shader_rendering(not args.fixed_function)
+    try:
+        images, failures, load_wait, elapsed = renderer.render_files(
+            file_paths, args.output_dir, max(args.turntable, 0), args.angle, args.elevation, max(args.prefetch, 0))
+    finally:
+        renderer.close()
+    print(f'{images} images from {len(file_paths) - failures} files, {failures} failed, {elapsed:.2f} s, '
+          f'{images / elapsed:.1f} images/s, {load_wait:.2f} s waiting for loads', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
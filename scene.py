@@ -0,0 +1,286 @@
+# scene.py
+# Models laid out side by side next to the main one. Files with identical contents share one set of GPU buffers, and
+# all copies of a mesh are drawn by a single instanced call with a per-instance transform attribute.
+
+import ctypes
+import hashlib
+import json
+import math
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.arrays import vbo
+import transforms
+from culling import visible_chunks
+from mesh_cache import content_hash
+
+LAYOUT_SPACING = 1.25  # Grid cell size as a multiple of the largest mesh's diameter
+MATRIX_BYTES = 16 * np.dtype(np.float32).itemsize
+INSTANCE_ATTRIBUTE = 2  # mat4 attribute of the instanced vertex shader, locations 2-5
+
+
+def mesh_key(file_path, build_options=None):
+    # Same contents built with the same options give the same key, whatever the file is called
+    options = json.dumps(build_options or {}, sort_keys=True)
+    return content_hash(file_path) + '-' + hashlib.sha1(options.encode()).hexdigest()[:8]
+
+
+def box_corners(low, high):
+    return np.array([[x, y, z, 1.0] for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])])
+
+
+class SceneMesh:
+    # One distinct mesh on the GPU and the transforms of its instances
+    def __init__(self, key, file_path, mesh):
+        self.key = key
+        self.file_path = file_path
+        self.mesh = mesh  # Dropped once uploaded
+        self.vertex_count = mesh.vertex_count
+        self.edge_count = mesh.edge_count
+        self.face_count = mesh.face_count
+        self.triangle_count = len(mesh.indices) // 3
+        self.gpu_bytes = mesh.indexed_bytes
+        self.unindexed_bytes = mesh.unindexed_bytes
+        coords = mesh.vertex_coords
+        self.low = coords.min(axis=0) if len(coords) else np.zeros(3, dtype=np.float32)
+        self.high = coords.max(axis=0) if len(coords) else np.zeros(3, dtype=np.float32)
+        self.transforms = []  # (4, 4) float32 row-major, one per instance
+        self.visible = np.zeros(0, dtype=bool)
+        self.vbo = None
+        self.ebo = None
+        self.wireframe_ebo = None
+        self.instance_buffer = None
+        self.vao = None
+        self.wireframe_vao = None
+
+    @property
+    def center(self):
+        return (self.low + self.high) / 2
+
+    @property
+    def diameter(self):
+        return float(np.linalg.norm(self.high - self.low))
+
+    @property
+    def drawn(self):
+        return int(np.count_nonzero(self.visible))
+
+    def world_bounds(self):
+        # (K, 2, 3) box of every instance after its transform
+        if not self.transforms:
+            return np.zeros((0, 2, 3), dtype=np.float32)
+        moved = np.einsum('kij,cj->kci', np.array(self.transforms), box_corners(self.low, self.high))[:, :, :3]
+        return np.stack([moved.min(axis=1), moved.max(axis=1)], axis=1).astype(np.float32)
+
+    def upload(self, instanced):
+        # Vertex and element buffers as OpenGLWidget.upload_mesh makes them, plus an instance buffer
+        # and VAOs when the instanced shader is available; the context must be current
+        mesh = self.mesh
+        self.vbo = vbo.VBO(mesh.vertex_data)
+        self.ebo = vbo.VBO(mesh.indices, target=GL_ELEMENT_ARRAY_BUFFER)
+        self.wireframe_ebo = vbo.VBO(mesh.wireframe_indices, target=GL_ELEMENT_ARRAY_BUFFER)
+        self.vbo.bind()
+        self.ebo.bind()
+        self.wireframe_ebo.bind()
+        if instanced:
+            self.instance_buffer = glGenBuffers(1)
+            self.vao = self.create_vertex_array(self.ebo)
+            self.wireframe_vao = self.create_vertex_array(self.wireframe_ebo)
+        self.wireframe_ebo.unbind()
+        self.ebo.unbind()
+        self.vbo.unbind()
+        self.mesh = None
+
+    def create_vertex_array(self, element_buffer):
+        stride = 6 * np.dtype(np.float32).itemsize
+        vao = glGenVertexArrays(1)
+        glBindVertexArray(vao)
+        self.vbo.bind()
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * np.dtype(np.float32).itemsize))
+        # A mat4 attribute takes four vec4 locations, one matrix column each, advancing per instance
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        for column in range(4):
+            location = INSTANCE_ATTRIBUTE + column
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 4, GL_FLOAT, GL_FALSE, MATRIX_BYTES,
+                                  ctypes.c_void_p(column * 4 * np.dtype(np.float32).itemsize))
+            glVertexAttribDivisor(location, 1)
+        element_buffer.bind()
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return vao
+
+    def upload_instances(self):
+        # Transforms of the visible instances, first to last; GLSL reads matrices column by column
+        if self.instance_buffer is None:
+            return
+        visible = [transform.T for transform, shown in zip(self.transforms, self.visible) if shown]
+        data = np.ascontiguousarray(np.array(visible, dtype=np.float32).reshape(-1, 16))
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_buffer)
+        glBufferData(GL_ARRAY_BUFFER, max(data.nbytes, MATRIX_BYTES), data if data.nbytes else None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw_instanced(self, wireframe):
+        count = self.drawn
+        if count == 0:
+            return 0
+        if wireframe:
+            glBindVertexArray(self.wireframe_vao)
+            glDrawElementsInstanced(GL_LINES, len(self.wireframe_ebo), index_type(self.wireframe_ebo), None, count)
+        else:
+            glBindVertexArray(self.vao)
+            glDrawElementsInstanced(GL_TRIANGLES, len(self.ebo), index_type(self.ebo), None, count)
+        return 1
+
+    def draw_each(self, wireframe):
+        # Fixed-function fallback: one draw per visible instance under its own modelview matrix
+        stride = 6 * np.dtype(np.float32).itemsize
+        self.vbo.bind()
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, stride, self.vbo)
+        if not wireframe:
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glNormalPointer(GL_FLOAT, stride, self.vbo + 3 * np.dtype(np.float32).itemsize)
+        element_buffer = self.wireframe_ebo if wireframe else self.ebo
+        element_buffer.bind()
+        calls = 0
+        for transform, shown in zip(self.transforms, self.visible):
+            if not shown:
+                continue
+            glPushMatrix()
+            glMultMatrixf(transform.T)
+            glDrawElements(GL_LINES if wireframe else GL_TRIANGLES, len(element_buffer),
+                           index_type(element_buffer), element_buffer)
+            glPopMatrix()
+            calls += 1
+        element_buffer.unbind()
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        self.vbo.unbind()
+        return calls
+
+    def release(self):
+        for vao in (self.vao, self.wireframe_vao):
+            if vao is not None:
+                glDeleteVertexArrays(1, [vao])
+        for buffer in (self.vbo, self.ebo, self.wireframe_ebo):
+            if buffer is not None:
+                buffer.delete()
+        if self.instance_buffer is not None:
+            glDeleteBuffers(1, [self.instance_buffer])
+        self.vao = self.wireframe_vao = self.instance_buffer = None
+        self.vbo = self.ebo = self.wireframe_ebo = None
+
+
+def index_type(element_buffer):
+    return GL_UNSIGNED_SHORT if element_buffer.data.dtype == np.uint16 else GL_UNSIGNED_INT
+
+
+class Scene:
+    def __init__(self):
+        self.meshes = {}  # key -> SceneMesh, in the order they were added
+        self.version = 0  # Bumped when instances are added, moved or removed
+        self.culling_key = None
+
+    @property
+    def instance_count(self):
+        return sum(len(scene_mesh.transforms) for scene_mesh in self.meshes.values())
+
+    @property
+    def drawn_count(self):
+        return sum(scene_mesh.drawn for scene_mesh in self.meshes.values())
+
+    @property
+    def gpu_bytes(self):
+        return sum(scene_mesh.gpu_bytes for scene_mesh in self.meshes.values())
+
+    @property
+    def unindexed_bytes(self):
+        # What every instance would take as its own flat copy
+        return sum(scene_mesh.unindexed_bytes * len(scene_mesh.transforms) for scene_mesh in self.meshes.values())
+
+    def counts(self):
+        # (vertices, edges, faces, triangles) of all instances together
+        totals = np.zeros(4, dtype=np.int64)
+        for scene_mesh in self.meshes.values():
+            totals += len(scene_mesh.transforms) * np.array([scene_mesh.vertex_count, scene_mesh.edge_count,
+                                                             scene_mesh.face_count, scene_mesh.triangle_count])
+        return tuple(int(total) for total in totals)
+
+    def add(self, key, file_path, mesh, copies, instanced):
+        # Adds copies instances of the mesh with this key, uploading it first if it is new; mesh may be
+        # None for a key already in the scene. Returns False when there is nothing to instance.
+        scene_mesh = self.meshes.get(key)
+        if scene_mesh is None:
+            if mesh is None:
+                return False
+            scene_mesh = SceneMesh(key, file_path, mesh)
+            scene_mesh.upload(instanced)
+            self.meshes[key] = scene_mesh
+        scene_mesh.transforms.extend(np.identity(4, dtype=np.float32) for _ in range(copies))
+        self.version += 1
+        return True
+
+    def cell_size(self):
+        return LAYOUT_SPACING * max((scene_mesh.diameter for scene_mesh in self.meshes.values()), default=0.0)
+
+    def layout(self, origin):
+        # Every instance on a square grid of cells, row by row in +X then -Y from origin (the first
+        # cell's centre), each mesh centred in its cell
+        if not self.meshes:
+            return
+        spacing = max(self.cell_size(), 1e-6)
+        columns = math.ceil(math.sqrt(self.instance_count))
+        cell = 0
+        for scene_mesh in self.meshes.values():
+            for index in range(len(scene_mesh.transforms)):
+                row, column = divmod(cell, columns)
+                position = np.asarray(origin) + (column * spacing, -row * spacing, 0.0)
+                scene_mesh.transforms[index] = transforms.translation(*(position - scene_mesh.center))
+                cell += 1
+        self.version += 1
+
+    def bounds(self):
+        # (low, high) around every instance, or None for an empty scene
+        boxes = [scene_mesh.world_bounds() for scene_mesh in self.meshes.values() if scene_mesh.transforms]
+        if not boxes:
+            return None
+        boxes = np.concatenate(boxes)
+        return boxes[:, 0].min(axis=0), boxes[:, 1].max(axis=0)
+
+    def update_visibility(self, planes, key):
+        # Frustum-cull whole instances against planes (None draws all); only redone when the camera
+        # or the instances changed. Returns True when the visible set changed.
+        key = (key, self.version)
+        if key == self.culling_key:
+            return False
+        moved = self.culling_key is None or self.culling_key[1] != self.version
+        self.culling_key = key
+        for scene_mesh in self.meshes.values():
+            bounds = scene_mesh.world_bounds()
+            visible = visible_chunks(planes, bounds) if planes is not None else np.ones(len(bounds), dtype=bool)
+            if moved or not np.array_equal(visible, scene_mesh.visible):
+                scene_mesh.visible = visible
+                scene_mesh.upload_instances()
+        return True
+
+    def draw(self, instanced, wireframe=False):
+        # Returns the number of draw calls made
+        calls = 0
+        for scene_mesh in self.meshes.values():
+            if instanced and scene_mesh.vao is not None:
+                calls += scene_mesh.draw_instanced(wireframe)
+            else:
+                calls += scene_mesh.draw_each(wireframe)
+        if instanced:
+            glBindVertexArray(0)
+        return calls
+
+    def release(self):
+        for scene_mesh in self.meshes.values():
+            scene_mesh.release()
+        self.meshes.clear()
+        self.version += 1
+        self.culling_key = None
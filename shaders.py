@@ -0,0 +1,251 @@
+# shaders.py
+# GLSL sources for the shader rendering path and helpers that compile and link them, reporting driver errors instead of failing silently.
+
+from OpenGL.GL import *
+
+
+class ShaderError(RuntimeError):
+    pass
+
+
+vertex_shader_source = """
+#version 330 core
+layout (location = 0) in vec3 position;
+layout (location = 1) in vec3 normal;
+
+uniform mat4 model;
+uniform mat4 view;
+uniform mat4 projection;
+
+out vec3 view_normal;
+out vec3 view_position;
+
+void main()
+{
+    vec4 world_position = view * model * vec4(position, 1.0);
+    view_position = world_position.xyz;
+    view_normal = mat3(view * model) * normal;
+    gl_Position = projection * world_position;
+}
+"""
+
+# The same transform with a per-instance matrix (scene.py) between the model orbit and the mesh
+instanced_vertex_shader_source = """
+#version 330 core
+layout (location = 0) in vec3 position;
+layout (location = 1) in vec3 normal;
+layout (location = 2) in mat4 instance_transform;
+
+uniform mat4 model;
+uniform mat4 view;
+uniform mat4 projection;
+
+out vec3 view_normal;
+out vec3 view_position;
+
+void main()
+{
+    mat4 model_view = view * model * instance_transform;
+    vec4 world_position = model_view * vec4(position, 1.0);
+    view_position = world_position.xyz;
+    view_normal = mat3(model_view) * normal;
+    gl_Position = projection * world_position;
+}
+"""
+
+# Compact vertices (vertex_format.py): normalized int16 positions inside the model's box and
+# octahedral-encoded normals, decoded before the usual transform
+compact_vertex_shader_source = """
+#version 330 core
+layout (location = 0) in vec3 position;
+layout (location = 1) in vec2 octahedral_normal;
+
+uniform mat4 model;
+uniform mat4 view;
+uniform mat4 projection;
+uniform vec3 position_offset;
+uniform vec3 position_scale;
+
+out vec3 view_normal;
+out vec3 view_position;
+
+vec3 decode_normal(vec2 encoded)
+{
+    vec3 normal = vec3(encoded, 1.0 - abs(encoded.x) - abs(encoded.y));
+    float fold = max(-normal.z, 0.0);
+    normal.x += normal.x >= 0.0 ? -fold : fold;
+    normal.y += normal.y >= 0.0 ? -fold : fold;
+    return normalize(normal);
+}
+
+void main()
+{
+    vec4 world_position = view * model * vec4(position_offset + position_scale * position, 1.0);
+    view_position = world_position.xyz;
+    view_normal = mat3(view * model) * decode_normal(octahedral_normal);
+    gl_Position = projection * world_position;
+}
+"""
+
+# Shared by both fragment shaders; reads the color and lighting uniforms
+shading_source = """
+// Headlight matching the fixed-function setup: directional light along +Z in eye space
+const vec3 light_direction = vec3(0.0, 0.0, 1.0);
+const float ambient = 0.04;
+const float diffuse_strength = 0.8;
+const float specular_strength = 0.15;
+const float shininess = 32.0;
+
+vec4 shade(vec3 normal_vector, vec3 position)
+{
+    if (!lighting) {
+        return color;
+    }
+    vec3 normal = normalize(normal_vector);
+    float diffuse = max(dot(normal, light_direction), 0.0);
+    vec3 half_vector = normalize(light_direction + normalize(-position));
+    float specular = diffuse > 0.0 ? pow(max(dot(normal, half_vector), 0.0), shininess) : 0.0;
+    vec3 lit = color.rgb * (ambient + diffuse_strength * diffuse) + specular_strength * specular;
+    return vec4(lit, color.a);
+}
+"""
+
+fragment_shader_source = """
+#version 330 core
+in vec3 view_normal;
+in vec3 view_position;
+out vec4 FragColor;
+
+uniform vec4 color;
+uniform bool lighting;
+""" + shading_source + """
+void main()
+{
+    FragColor = shade(view_normal, view_position);
+}
+"""
+
+# Single-pass wireframe: each triangle gets the window-space distance from every fragment to its
+# three edges, so the fragment shader can draw the edges over the shaded surface. Edges that are
+# triangulation diagonals (face_arrays.triangle_edge_mask, one byte per triangle in a buffer
+# texture) are left out. gl_PrimitiveIDIn restarts at every draw call; first_triangle says where.
+wireframe_geometry_shader_source = """
+#version 330 core
+layout (triangles) in;
+layout (triangle_strip, max_vertices = 3) out;
+
+in vec3 view_normal[];
+in vec3 view_position[];
+
+uniform vec2 viewport_size;
+uniform usamplerBuffer edge_masks;
+uniform bool use_edge_masks;
+uniform int first_triangle;
+
+out vec3 surface_normal;
+out vec3 surface_position;
+noperspective out vec3 edge_distance;
+flat out vec3 edge_hidden;
+
+void main()
+{
+    vec2 corners[3];
+    bool behind = false;
+    for (int i = 0; i < 3; i++) {
+        behind = behind || gl_in[i].gl_Position.w <= 0.0;
+        corners[i] = 0.5 * viewport_size * gl_in[i].gl_Position.xy / gl_in[i].gl_Position.w;
+    }
+    // Distance from each corner to the opposite edge, in pixels: twice the area over the edge length
+    vec2 edge0 = corners[2] - corners[1];
+    vec2 edge1 = corners[0] - corners[2];
+    vec2 edge2 = corners[1] - corners[0];
+    float area = abs(edge1.x * edge2.y - edge1.y * edge2.x);
+    vec3 heights = area / max(vec3(length(edge0), length(edge1), length(edge2)), vec3(1e-6));
+
+    // Mask bit e is the edge from corner e to corner e + 1, the one opposite corner e + 2
+    uint mask = use_edge_masks ? texelFetch(edge_masks, first_triangle + gl_PrimitiveIDIn).r : 7u;
+    vec3 hidden = vec3((mask & 2u) == 0u, (mask & 4u) == 0u, (mask & 1u) == 0u);
+    if (behind) {
+        hidden = vec3(1.0);  // Window positions are meaningless for corners behind the eye
+    }
+
+    for (int i = 0; i < 3; i++) {
+        gl_Position = gl_in[i].gl_Position;
+        surface_normal = view_normal[i];
+        surface_position = view_position[i];
+        edge_distance = heights * vec3(i == 0, i == 1, i == 2);
+        edge_hidden = hidden;
+        EmitVertex();
+    }
+    EndPrimitive();
+}
+"""
+
+wireframe_fragment_shader_source = """
+#version 330 core
+in vec3 surface_normal;
+in vec3 surface_position;
+noperspective in vec3 edge_distance;
+flat in vec3 edge_hidden;
+out vec4 FragColor;
+
+uniform vec4 color;
+uniform bool lighting;
+uniform vec4 wire_color;
+uniform float wire_width;
+""" + shading_source + """
+void main()
+{
+    vec3 distances = edge_distance + edge_hidden * 1e6;
+    float nearest = min(min(distances.x, distances.y), distances.z);
+    // The two triangles sharing an edge each cover half of its width
+    float half_width = 0.5 * wire_width;
+    float coverage = 1.0 - smoothstep(half_width - 0.5, half_width + 0.5, nearest);
+    FragColor = mix(shade(surface_normal, surface_position), wire_color, coverage);
+}
+"""
+
+
+def decode_log(log):
+    return log.decode(errors='replace') if isinstance(log, bytes) else log
+
+
+def compile_shader(source, shader_type):
+    shader = glCreateShader(shader_type)
+    glShaderSource(shader, source)
+    glCompileShader(shader)
+    if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+        log = glGetShaderInfoLog(shader)
+        glDeleteShader(shader)
+        kind = {GL_VERTEX_SHADER: 'vertex', GL_GEOMETRY_SHADER: 'geometry'}.get(shader_type, 'fragment')
+        raise ShaderError(f"{kind} shader failed to compile:\n{decode_log(log)}")
+    return shader
+
+
+def link_program(vertex_source, fragment_source, geometry_source=None):
+    shaders = []
+    try:
+        shaders.append(compile_shader(vertex_source, GL_VERTEX_SHADER))
+        if geometry_source is not None:
+            shaders.append(compile_shader(geometry_source, GL_GEOMETRY_SHADER))
+        shaders.append(compile_shader(fragment_source, GL_FRAGMENT_SHADER))
+    except ShaderError:
+        for shader in shaders:
+            glDeleteShader(shader)
+        raise
+
+    program = glCreateProgram()
+    for shader in shaders:
+        glAttachShader(program, shader)
+    glLinkProgram(program)
+    for shader in shaders:
+        glDeleteShader(shader)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        log = glGetProgramInfoLog(program)
+        glDeleteProgram(program)
+        raise ShaderError(f"shader program failed to link:\n{decode_log(log)}")
+    return program
+
+
+def uniform_locations(program, names):
+    return {name: glGetUniformLocation(program, name) for name in names}
@@ -0,0 +1,120 @@
+# startup.py
+# Time to first frame for `main.py <file.obj>`. The file starts loading on a thread at process start, before Qt and OpenGL
+# are imported, and the startup timer marks each stage up to the first frame that shows the model.
+#
+# Budgets: importing main.py takes at most IMPORT_BUDGET_MS, and a cached FIRST_FRAME_FACES-face model is on screen within
+# FIRST_FRAME_BUDGET_MS of process start. benchmarks/bench_startup.py measures both, with -X importtime and this timer,
+# and fails when either is exceeded.
+
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+STARTED = time.perf_counter()
+IMPORT_BUDGET_MS = 500
+FIRST_FRAME_BUDGET_MS = 1500
+FIRST_FRAME_FACES = 100000
+
+options = SimpleNamespace(file=None, startup_timing=False, quit_after_first_frame=False)
+marks = []  # (stage, milliseconds since STARTED)
+prefetch = None
+
+
+def mark(stage):
+    marks.append((stage, (time.perf_counter() - STARTED) * 1000.0))
+
+
+def elapsed_ms(stage):
+    return next((ms for name, ms in marks if name == stage), None)
+
+
+def report():
+    return 'Startup: ' + ', '.join(f'{stage} {ms:.0f} ms' for stage, ms in marks)
+
+
+class Prefetch:
+    # Loads a file through the mesh cache with the viewer's default build options. The result is
+    # None when the viewer would stream the file instead.
+    def __init__(self, file_path):
+        self.file_path = os.path.abspath(file_path)
+        self.done = threading.Event()
+        self.mesh = None
+        self.error = None
+        self.signature = None  # file_watcher.file_signature of the file before it was read
+        threading.Thread(target=self.run, name='startup-prefetch', daemon=True).start()
+
+    def run(self):
+        try:
+            # numpy and the parser only; nothing here touches Qt or OpenGL
+            from mesh_builder import DEFAULT_BUILD_OPTIONS
+            from mesh_cache import MeshCache
+            from obj_stream import STREAM_MIN_FILE_SIZE
+            cache = MeshCache()
+            stat = os.stat(self.file_path)
+            self.signature = stat.st_size, stat.st_mtime_ns
+            if stat.st_size >= STREAM_MIN_FILE_SIZE and \
+                    not cache.contains(self.file_path, DEFAULT_BUILD_OPTIONS):
+                mesh = None
+            else:
+                mesh = cache.load(self.file_path, None, DEFAULT_BUILD_OPTIONS)
+        except Exception as error:
+            self.error = error
+        else:
+            mark('model loaded' if mesh is not None else 'streaming')
+            self.mesh = mesh
+        self.done.set()
+
+    def result(self):
+        # Waits for the load; raises what it raised
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.mesh
+
+
+def begin(argv):
+    # Parses main.py's own arguments, leaving the rest to Qt, and starts loading the file given
+    global options, prefetch
+    import argparse  # Only for the viewer's own command line
+    parser = argparse.ArgumentParser(description='Mesh Inspector, a viewer for OBJ files.')
+    parser.add_argument('file', nargs='?', help='OBJ file to open')
+    parser.add_argument('--startup-timing', action='store_true', help='print the startup stages once the model is drawn')
+    parser.add_argument('--quit-after-first-frame', action='store_true',
+                        help='exit once the model is drawn, for measuring startup')
+    options, _ = parser.parse_known_args(argv[1:])
+    if options.file is not None and os.path.isfile(options.file):
+        prefetch = Prefetch(options.file)
+
+
+def take_prefetch(file_path, build_options):
+    # The Prefetch begun at startup when it is of this file with these options. Only the first
+    # load asks; after it the prefetch is dropped either way.
+    global prefetch
+    from mesh_builder import DEFAULT_BUILD_OPTIONS
+    started, prefetch = prefetch, None
+    if started is None or started.file_path != os.path.abspath(file_path) or build_options != DEFAULT_BUILD_OPTIONS:
+        return None
+    return started
+
+
+def first_model_frame():
+    # Called when the first model is drawn; True when the process should now exit
+    if elapsed_ms('first frame') is not None:
+        return False
+    mark('first frame')
+    if options.startup_timing:
+        print(report(), file=sys.stderr)
+    return options.quit_after_first_frame
+
+
+def first_model_failed(message):
+    # Called when a load fails; True when the process should exit because the model it was
+    # started with can never be drawn
+    if elapsed_ms('first frame') is not None or options.file is None:
+        return False
+    mark('load failed')
+    if options.startup_timing:
+        print(f'{report()}: {message}', file=sys.stderr)
+    return options.quit_after_first_frame
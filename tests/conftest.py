@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Makes the flat root-level modules and the benchmark helpers importable from the tests.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
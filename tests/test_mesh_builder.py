@@ -0,0 +1,24 @@
+# tests/test_mesh_builder.py
+# Building GPU buffers from files with faces that reference vertices the file does not define: those faces are
+# skipped, as the line-by-line loader did, and the rest of the model loads.
+
+import numpy as np
+import pytest
+from mesh_builder import load_mesh
+
+TRIANGLE = b'v 0 0 0\nv 1 0 0\nv 1 1 0\n'
+
+
+@pytest.mark.parametrize('records', [
+    b'vn 0 0 1\nf 1//1 2//1 3//1\nf 1//1 2//1 9//1\n',
+    b'f 1 2 3\nf 1 2 9\n',
+])
+def test_faces_with_missing_vertices_load(tmp_path, records):
+    file_path = tmp_path / 'bad_index.obj'
+    file_path.write_bytes(TRIANGLE + records)
+    mesh = load_mesh(str(file_path))
+    assert mesh.face_count == 2
+    assert len(mesh.indices) == 3
+    assert mesh.edge_count == 3
+    assert len(mesh.wireframe_indices) == 6
+    assert np.allclose(mesh.vertex_data.reshape(-1, 6)[:, 3:], [0, 0, 1])
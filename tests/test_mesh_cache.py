@@ -0,0 +1,38 @@
+# tests/test_mesh_cache.py
+# Damaged cache entries are rebuilt from the OBJ file instead of failing the load, and do not stop `list`.
+
+import json
+import os
+import shutil
+import numpy as np
+import pytest
+from mesh_cache import CACHE_FORMAT_VERSION, CACHE_MAGIC, PREAMBLE, MeshCache, main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def truncate(path):
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 64)
+
+
+def drop_arrays(path):
+    header = json.dumps({'source': {}, 'counts': {}}).encode()
+    with open(path, 'wb') as file:
+        file.write(PREAMBLE.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, len(header)) + header)
+
+
+@pytest.mark.parametrize('damage', [truncate, drop_arrays])
+def test_damaged_entry_is_rebuilt(tmp_path, capsys, damage):
+    file_path = str(tmp_path / 'box.obj')
+    shutil.copy(os.path.join(ROOT, 'objs', 'box.obj'), file_path)
+    cache = MeshCache(str(tmp_path / 'cache'))
+    expected = cache.load(file_path)
+    entry_path = cache.entry_path(cache.source_info(file_path))
+    damage(entry_path)
+
+    assert main(['--cache-dir', cache.cache_dir, 'list']) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 1
+    mesh = cache.load(file_path)
+    assert np.array_equal(mesh.vertex_data, expected.vertex_data)
+    assert np.array_equal(mesh.indices, expected.indices)
@@ -0,0 +1,18 @@
+# tests/test_normals.py
+# Generated normals: faces that reference vertices the file does not define are left out instead of failing the load.
+
+import numpy as np
+import pytest
+from obj_parser import parse_obj_bytes
+from normals import generate_normals
+
+TRIANGLE = b'v 0 0 0\nv 1 0 0\nv 1 1 0\nf 1 2 3\n'
+
+
+@pytest.mark.parametrize('crease_angle', [None, 30.0])
+def test_faces_with_missing_vertices_are_skipped(crease_angle):
+    obj = parse_obj_bytes(TRIANGLE + b'f 1 2 9\nf 3 2 1 -9\n')
+    normals, corner_normal_ids = generate_normals(obj.positions, obj.face_vertices, obj.face_offsets,
+                                                  'area', crease_angle)
+    assert np.allclose(normals[corner_normal_ids[:3]], [0, 0, 1])
+    assert np.all(corner_normal_ids[3:] == -1)
@@ -0,0 +1,18 @@
+# tests/test_obj_parser.py
+# Record forms the vectorized parser must accept like the line-by-line one did: indentation, trailing comments, extra
+# components and texture coordinates with fewer than two components.
+
+import numpy as np
+from obj_parser import parse_obj_bytes
+
+
+def test_indented_records_and_comments():
+    obj = parse_obj_bytes(b'  v 0 0 0 # origin\n\tv 1 0 0\nv 1 1 0 1.0#w\n f 1 2 3 # face\n')
+    assert obj.positions.tolist() == [[0, 0, 0], [1, 0, 0], [1, 1, 0]]
+    assert obj.face_vertices.tolist() == [0, 1, 2]
+
+
+def test_short_texcoords_are_padded():
+    obj = parse_obj_bytes(b'v 0 0 0\nvt 0.5\nvt 0.25 0.75 0\nvt \nf 1/1 1/2 1/3\n')
+    assert np.allclose(obj.texcoords, [[0.5, 0], [0.25, 0.75], [0, 0]])
+    assert obj.face_texcoords.tolist() == [0, 1, 2]
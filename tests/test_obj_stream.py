@@ -0,0 +1,48 @@
+# tests/test_obj_stream.py
+# Streaming loads: working memory beyond the vertex tables stays inside the budget, every triangle arrives, and the
+# record counters agree with the parser.
+
+import collections
+import tracemalloc
+import numpy as np
+import pytest
+from bench_streaming import write_grid_obj
+from obj_parallel import count_records as count_range_records
+from obj_parser import count_record_lines, parse_obj_bytes
+from obj_stream import BLOCKS_IN_FLIGHT, count_records, scan_obj, triangle_blocks
+
+BUDGET = 4 * 1024 * 1024
+
+
+@pytest.mark.parametrize('with_normals', [False, True])
+def test_streaming_stays_inside_budget(tmp_path, with_normals):
+    file_path = str(tmp_path / 'grid.obj')
+    faces = write_grid_obj(file_path, 40000, with_normals)
+    tracemalloc.start()
+    try:
+        scan = scan_obj(file_path, BUDGET)
+        in_flight = collections.deque(maxlen=BLOCKS_IN_FLIGHT)
+        triangles = 0
+        for block in triangle_blocks(scan):
+            in_flight.append(block)
+            triangles += len(block) // 3
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert scan.block_size * 10 < tmp_path.joinpath('grid.obj').stat().st_size
+    assert triangles == 2 * faces
+    assert peak - scan.table_bytes <= BUDGET
+
+
+def test_record_counts_match_parser(tmp_path):
+    data = (b'v 0 0 0\r\nv\t1 0 0\n  v 1 1 0 # indented\n\tvn 0 0 1\nvt 0 0\r\n'
+            b'vertex 1\n#v 2 2 2\nf 1 2 3\n') * 3
+    obj = parse_obj_bytes(data)
+    expected = (len(obj.positions), len(obj.texcoords), len(obj.normals))
+    assert count_record_lines(data) == expected
+    assert count_record_lines(data.replace(b'  v', b'v').replace(b'\tvn', b'vn')) == expected
+
+    file_path = tmp_path / 'records.obj'
+    file_path.write_bytes(data)
+    assert count_range_records(str(file_path), 0, len(data)) == expected
+    assert count_records(str(file_path), 64 * 1024) == (expected[0], expected[2])
@@ -0,0 +1,39 @@
+# tests/test_recent_models.py
+# A kept model is a hit only while its file is as it was when the mesh was read, even if the file changed before the
+# model was stashed.
+
+import os
+from file_watcher import file_signature
+from recent_models import ModelBuffers, RecentModels
+
+
+def buffers_for(signature):
+    buffers = ModelBuffers(dict.fromkeys(ModelBuffers.FIELDS))
+    buffers.signature = signature
+    return buffers
+
+
+def test_file_changed_before_stash_is_a_miss(tmp_path):
+    file_path = str(tmp_path / 'box.obj')
+    with open(file_path, 'w') as file:
+        file.write('v 0 0 0\n')
+    loaded = file_signature(file_path)
+    with open(file_path, 'w') as file:
+        file.write('v 0 0 0\nv 1 0 0\n')
+    os.utime(file_path, ns=(loaded[1] + 10 ** 9, loaded[1] + 10 ** 9))
+    recent = RecentModels()
+    recent.put(file_path, {}, buffers_for(loaded))
+    buffers, outdated = recent.take(file_path, {})
+    assert buffers is None and outdated is not None
+    assert recent.misses == 1
+
+
+def test_unchanged_file_is_a_hit(tmp_path):
+    file_path = str(tmp_path / 'box.obj')
+    with open(file_path, 'w') as file:
+        file.write('v 0 0 0\n')
+    recent = RecentModels()
+    kept = buffers_for(file_signature(file_path))
+    recent.put(file_path, {}, kept)
+    assert recent.take(file_path, {}) == (kept, None)
+    assert recent.hits == 1
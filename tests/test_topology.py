@@ -0,0 +1,45 @@
+# tests/test_topology.py
+# Topology validation: the documented memory budget, duplicate faces, and faces that reference missing vertices.
+
+import tracemalloc
+import numpy as np
+from bench_topology import quad_grid
+from obj_parser import parse_obj_bytes
+from topology import MEMORY_BYTES_PER_CORNER, duplicate_face_ids, validate_obj, validate_topology
+
+SQUARE = b'v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n'
+
+
+def test_peak_memory_within_budget():
+    positions, face_vertices, face_offsets = quad_grid(250000)
+    tracemalloc.start()
+    try:
+        validate_topology(positions, face_vertices, face_offsets)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak <= MEMORY_BYTES_PER_CORNER * len(face_vertices)
+
+
+def test_duplicates_ignore_rotation_and_winding():
+    face_vertices = np.array([0, 1, 2, 3, 2, 3, 0, 1, 3, 2, 1, 0, 0, 1, 2, 0, 2, 1])
+    face_offsets = np.array([0, 4, 8, 12, 15, 18])
+    assert duplicate_face_ids(face_vertices, face_offsets).tolist() == [1, 2, 4]
+
+
+def test_grid_has_no_problems():
+    report = validate_topology(*quad_grid(100))
+    summary = report.summary()
+    assert summary['components'] == 1
+    assert summary['boundary edges'] == 40
+    assert all(summary[name] == 0 for name in ('non-manifold edges', 'non-manifold vertices', 'inconsistent edges',
+                                               'flipped faces', 'duplicate faces', 'degenerate faces'))
+
+
+def test_faces_with_missing_vertices():
+    # Face 1 keeps two corners, on an edge of face 0, and face 2 three of its five
+    report = validate_obj(parse_obj_bytes(SQUARE + b'f 1 2 3 4\nf 1 2 9\nf 9 8 2 3 4\n'))
+    assert report.bad_index_faces.tolist() == [1, 2]
+    assert len(report.non_manifold_edges) == 0
+    assert report.degenerate_faces.tolist() == []
+    assert report.component_count == 1
@@ -0,0 +1,261 @@
+# topology.py
+# Mesh validation from the face index arrays: boundary and non-manifold edges, non-manifold vertices, duplicate and
+# degenerate faces, connected components and inconsistent winding. Adjacency comes from sorting packed edge keys, not
+# from dicts, and every check is a vectorized pass over flat arrays.
+#
+# Memory budget: validate_topology() allocates at most MEMORY_BYTES_PER_CORNER bytes per face corner on top of its
+# inputs (about 2.2 GB for 10M quads), in int32 arrays wherever indices allow. tests/test_topology.py asserts it on a
+# 250K-face grid, and benchmarks/bench_topology.py measures the peak at any size; both use tracemalloc.
+
+import numpy as np
+from normals import face_area_vectors
+
+MEMORY_BYTES_PER_CORNER = 56
+FACE_BLOCK = 1 << 18
+DEGENERATE_AREA = 1e-12  # Faces with less area, relative to the squared bounding box diagonal, are degenerate
+
+
+class TopologyReport:
+    def __init__(self, boundary_edges, non_manifold_edges, inconsistent_edges, non_manifold_vertices,
+                 duplicate_faces, degenerate_faces, flipped_faces, component_count, edge_count, bad_index_faces=None):
+        # Edges are (N, 2) OBJ vertex index pairs, vertices and faces zero-based index arrays
+        self.boundary_edges = boundary_edges  # Used by exactly one face
+        self.non_manifold_edges = non_manifold_edges  # Used by three or more faces
+        self.inconsistent_edges = inconsistent_edges  # Two faces traverse the edge in the same direction
+        self.non_manifold_vertices = non_manifold_vertices  # On a non-manifold edge, or where fans only touch
+        self.duplicate_faces = duplicate_faces  # Same vertex set as an earlier face
+        self.degenerate_faces = degenerate_faces  # Under three corners, a repeated vertex or no area
+        self.flipped_faces = flipped_faces  # Wound against most of their neighbours
+        self.component_count = component_count  # Face-connected pieces
+        self.edge_count = edge_count
+        # Reference a vertex the file does not define (see validate_obj)
+        self.bad_index_faces = bad_index_faces if bad_index_faces is not None else np.zeros(0, dtype=np.int64)
+
+    def summary(self):
+        return {
+            'edges': self.edge_count,
+            'boundary edges': len(self.boundary_edges),
+            'non-manifold edges': len(self.non_manifold_edges),
+            'non-manifold vertices': len(self.non_manifold_vertices),
+            'inconsistent edges': len(self.inconsistent_edges),
+            'flipped faces': len(self.flipped_faces),
+            'duplicate faces': len(self.duplicate_faces),
+            'degenerate faces': len(self.degenerate_faces),
+            'bad index faces': len(self.bad_index_faces),
+            'components': self.component_count,
+        }
+
+
+def index_dtype(count):
+    return np.int32 if count < 2 ** 31 else np.int64
+
+
+def connected_components(node_count, first, second):
+    # Component label (smallest member) of every node for the undirected links first[i] - second[i].
+    # Hooks each link's larger root onto the smaller one, then compresses paths by pointer jumping.
+    parent = np.arange(node_count, dtype=index_dtype(node_count))
+    while True:
+        root_first = parent[first]
+        root_second = parent[second]
+        unequal = root_first != root_second
+        if not np.any(unequal):
+            return parent
+        np.minimum.at(parent, np.maximum(root_first[unequal], root_second[unequal]),
+                      np.minimum(root_first[unequal], root_second[unequal]))
+        del root_first, root_second, unequal
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+
+def same_edge_as_next(edge_starts, half_edge_count):
+    # Positions s in sorted half-edge order whose successor s + 1 belongs to the same edge
+    same = np.ones(half_edge_count, dtype=bool)
+    same[edge_starts[1:] - 1] = False
+    same[-1:] = False
+    return same
+
+
+def face_corner_arrays(face_vertices, face_offsets):
+    # (start vertex, end vertex, next corner, face) for every corner: each corner starts one half-edge
+    dtype = index_dtype(len(face_vertices))
+    starts = face_vertices.astype(dtype)
+    sizes = np.diff(face_offsets)
+    following = np.arange(1, len(face_vertices) + 1, dtype=dtype)
+    closing = face_offsets[1:][sizes > 0] - 1
+    following[closing] = face_offsets[:-1][sizes > 0]
+    ends = starts[following]
+    faces = np.repeat(np.arange(len(sizes), dtype=dtype), sizes)
+    return starts, ends, following, faces
+
+
+def face_blocks(face_count):
+    # Face ranges for the per-face checks, which work block by block to stay inside the budget
+    for first in range(0, face_count, FACE_BLOCK):
+        yield first, min(first + FACE_BLOCK, face_count)
+
+
+def duplicate_face_ids(face_vertices, face_offsets):
+    # Faces whose vertex set matches an earlier face. Candidates share size, min, max, sum and
+    # sum of squares of their vertex ids; they are then confirmed on their sorted vertex lists,
+    # one np.unique per face size.
+    sizes = np.diff(face_offsets)
+    present = np.flatnonzero(sizes > 0)
+    keys = np.zeros((len(present), 5), dtype=np.int64)
+    keys[:, 0] = sizes[present]
+    for first, last in face_blocks(len(present)):
+        faces = present[first:last]
+        corner_start = face_offsets[faces[0]]
+        vertices = face_vertices[corner_start:face_offsets[faces[-1] + 1]].astype(np.int64)
+        block_starts = face_offsets[faces] - corner_start
+        keys[first:last, 1] = np.minimum.reduceat(vertices, block_starts)
+        keys[first:last, 2] = np.maximum.reduceat(vertices, block_starts)
+        keys[first:last, 3] = np.add.reduceat(vertices, block_starts)
+        vertices *= vertices
+        keys[first:last, 4] = np.add.reduceat(vertices, block_starts)
+    order = np.lexsort(keys.T[::-1])
+    keys = keys[order]
+    same = np.all(keys[1:] == keys[:-1], axis=1)
+    del keys
+    candidate = np.zeros(len(present), dtype=bool)
+    candidate[order[1:][same]] = True
+    candidate[order[:-1][same]] = True
+    candidates = present[candidate]  # In face order, so the first of each vertex set is the earliest face
+    del order, same, candidate
+
+    duplicates = [np.zeros(0, dtype=np.int64)]
+    candidate_sizes = sizes[candidates]
+    for size in np.unique(candidate_sizes).tolist():
+        faces = candidates[candidate_sizes == size]
+        vertex_lists = np.sort(face_vertices[face_offsets[faces][:, None] + np.arange(size)], axis=1)
+        _, first, inverse = np.unique(vertex_lists, axis=0, return_index=True, return_inverse=True)
+        duplicates.append(faces[first[inverse.ravel()] != np.arange(len(faces))])
+    return np.sort(np.concatenate(duplicates)).astype(np.int64)
+
+
+def degenerate_face_ids(positions, face_vertices, face_offsets, repeated_vertex):
+    # Faces with under three corners, a repeated consecutive vertex, or (next to) no area
+    degenerate = (np.diff(face_offsets) < 3) | repeated_vertex
+    if len(positions) and len(face_vertices):
+        squared_diagonal = float(np.sum((positions.max(axis=0) - positions.min(axis=0)) ** 2)) or 1.0
+        for first, last in face_blocks(len(degenerate)):
+            corner_start = face_offsets[first]
+            vertices = face_vertices[corner_start:face_offsets[last]]
+            area = np.linalg.norm(face_area_vectors(positions, vertices, face_offsets[first:last + 1] - corner_start), axis=1) / 2
+            degenerate[first:last] |= area < DEGENERATE_AREA * squared_diagonal
+    return np.flatnonzero(degenerate)
+
+
+def decode_edges(keys):
+    # (N, 2) vertex pairs from packed low << 32 | high edge keys
+    return np.stack([keys >> 32, keys & 0xFFFFFFFF], axis=1).astype(np.int64)
+
+
+def validate_topology(positions, face_vertices, face_offsets, progress=None):
+    # TopologyReport for zero-based face corner arrays whose vertex indices are all valid (see
+    # validate_obj). progress(percent, stage) is called between checks.
+    def report(percent, stage):
+        if progress is not None:
+            progress(percent, stage)
+
+    face_count = len(face_offsets) - 1
+    report(0, 'Building edge table')
+    starts, ends, following, faces = face_corner_arrays(face_vertices, face_offsets)
+    repeated_vertex = np.zeros(face_count, dtype=bool)
+    repeated_vertex[faces[starts == ends]] = True
+    keys = np.minimum(starts, ends).astype(np.int64) << 32
+    keys |= np.maximum(starts, ends)
+    order = np.argsort(keys).astype(index_dtype(len(keys)))
+    keys = keys[order]
+
+    # Runs of equal keys are the half-edges of one undirected edge. Zero-length edges (repeated
+    # vertices) are left out; they are reported with the degenerate faces instead.
+    edge_starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])).astype(order.dtype)
+    edge_uses = np.diff(np.append(edge_starts, order.dtype.type(len(keys))))
+    edge_keys = keys[edge_starts]
+    proper = (edge_keys >> 32) != (edge_keys & 0xFFFFFFFF)
+    del keys
+
+    report(20, 'Checking edges')
+    boundary_edges = decode_edges(edge_keys[proper & (edge_uses == 1)])
+    non_manifold_edges = decode_edges(edge_keys[proper & (edge_uses > 2)])
+    del edge_keys
+
+    # Edges shared by exactly two faces: the half-edges at positions s and s + 1 of the sorted order
+    paired = edge_starts[proper & (edge_uses == 2)]
+    first_half = order[paired]
+    second_half = order[paired + 1]
+    del paired
+    same_direction = starts[first_half] == starts[second_half]
+    inconsistent_edges = np.stack([starts[first_half[same_direction]], ends[first_half[same_direction]]], axis=1)
+
+    # A face is flipped when more of its shared edges disagree with the neighbour than agree
+    disagree = np.bincount(faces[first_half[same_direction]], minlength=face_count) + \
+        np.bincount(faces[second_half[same_direction]], minlength=face_count)
+    agree = np.bincount(faces[first_half[~same_direction]], minlength=face_count) + \
+        np.bincount(faces[second_half[~same_direction]], minlength=face_count)
+    flipped_faces = np.flatnonzero(disagree > agree)
+    del disagree, agree
+
+    report(40, 'Finding components')
+    # Faces sharing any edge are connected; consecutive half-edges of an edge link their faces
+    linked = np.flatnonzero(same_edge_as_next(edge_starts, len(order))).astype(order.dtype)
+    del edge_starts, edge_uses
+    component_labels = connected_components(face_count, faces[order[linked]], faces[order[linked + 1]])
+    del linked, order
+    # Labels are each component's smallest face, so counting self-labelled used faces counts components
+    used_faces = np.diff(face_offsets) > 0
+    component_count = int(np.count_nonzero(used_faces & (component_labels == np.arange(face_count))))
+    del component_labels, used_faces, faces
+
+    report(60, 'Checking vertices')
+    # Corners around a vertex are joined when their faces share a two-face edge at that vertex.
+    # A manifold vertex ends up with one group of corners (one fan); more means fans only touch.
+    # Half-edge corner c sits at its start vertex and following[c] at its end vertex.
+    second_next = following[second_half]
+    join_a = np.concatenate([first_half, following[first_half]])
+    join_b = np.concatenate([np.where(same_direction, second_half, second_next),
+                             np.where(same_direction, second_next, second_half)])
+    del second_next, first_half, second_half, same_direction, following
+    corner_labels = connected_components(len(starts), join_a, join_b)
+    del join_a, join_b
+    # Each fan is labelled by its smallest corner, so a vertex's fans are its self-labelled corners
+    fan_roots = starts[corner_labels == np.arange(len(starts), dtype=corner_labels.dtype)]
+    del corner_labels
+    fans = np.bincount(fan_roots)
+    del fan_roots
+    non_manifold_vertices = np.unique(np.concatenate([np.flatnonzero(fans > 1), non_manifold_edges.ravel()]))
+    del fans, starts, ends
+
+    report(80, 'Checking faces')
+    degenerate_faces = degenerate_face_ids(positions, face_vertices, face_offsets, repeated_vertex)
+    duplicate_faces = duplicate_face_ids(face_vertices, face_offsets)
+
+    report(100, 'Done')
+    return TopologyReport(boundary_edges, non_manifold_edges, inconsistent_edges, non_manifold_vertices,
+                          duplicate_faces, degenerate_faces, flipped_faces, component_count,
+                          int(np.count_nonzero(proper)))
+
+
+def validate_obj(obj, progress=None):
+    # validate_topology for an ObjData. Faces that reference missing vertices are reported as bad
+    # index faces: those keeping three or more corners are checked without the missing ones, the
+    # rest are left out of every other check. Face numbering is unchanged, so reported faces match
+    # the file.
+    valid = (obj.face_vertices >= 0) & (obj.face_vertices < len(obj.positions))
+    if np.all(valid):
+        return validate_topology(obj.positions, obj.face_vertices, obj.face_offsets, progress)
+    sizes = obj.face_sizes
+    valid_counts = np.add.reduceat(np.append(valid, False), obj.face_offsets[:-1]) * (sizes > 0)
+    bad_index = valid_counts < sizes
+    dropped = bad_index & (valid_counts < 3)
+    valid &= ~np.repeat(dropped, sizes)
+    face_offsets = np.zeros(obj.face_count + 1, dtype=np.int64)
+    np.cumsum(np.where(dropped, 0, valid_counts), out=face_offsets[1:])
+    report = validate_topology(obj.positions, obj.face_vertices[valid], face_offsets, progress)
+    # Dropped faces are empty now, which validate_topology counts as degenerate
+    report.degenerate_faces = report.degenerate_faces[~dropped[report.degenerate_faces]]
+    report.bad_index_faces = np.flatnonzero(bad_index)
+    return report
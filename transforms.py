@@ -0,0 +1,52 @@
+# transforms.py
+# NumPy versions of the fixed-function matrix helpers (gluPerspective, gluLookAt, glRotatef, glTranslatef) for the shader path.
+# Matrices are row-major float32 and act on column vectors, so upload them with transpose=GL_TRUE.
+
+import math
+import numpy as np
+
+
+def perspective(fovy_degrees, aspect, near, far):
+    f = 1.0 / math.tan(math.radians(fovy_degrees) / 2.0)
+    matrix = np.zeros((4, 4), dtype=np.float32)
+    matrix[0, 0] = f / aspect
+    matrix[1, 1] = f
+    matrix[2, 2] = (far + near) / (near - far)
+    matrix[2, 3] = 2.0 * far * near / (near - far)
+    matrix[3, 2] = -1.0
+    return matrix
+
+
+def look_at(eye, target, up):
+    eye = np.asarray(eye, dtype=np.float64)
+    forward = np.asarray(target, dtype=np.float64) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, up)
+    side /= np.linalg.norm(side)
+    true_up = np.cross(side, forward)
+
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[0, :3] = side
+    matrix[1, :3] = true_up
+    matrix[2, :3] = -forward
+    matrix[:3, 3] = -matrix[:3, :3] @ eye
+    return matrix
+
+
+def rotation(angle_degrees, axis):
+    x, y, z = np.asarray(axis, dtype=np.float64) / np.linalg.norm(axis)
+    c = math.cos(math.radians(angle_degrees))
+    s = math.sin(math.radians(angle_degrees))
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[:3, :3] = [
+        [x * x * (1 - c) + c, x * y * (1 - c) - z * s, x * z * (1 - c) + y * s],
+        [y * x * (1 - c) + z * s, y * y * (1 - c) + c, y * z * (1 - c) - x * s],
+        [x * z * (1 - c) - y * s, y * z * (1 - c) + x * s, z * z * (1 - c) + c],
+    ]
+    return matrix
+
+
+def translation(x, y, z):
+    matrix = np.identity(4, dtype=np.float32)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
@@ -0,0 +1,90 @@
+# vertex_format.py
+# Compact 12-byte vertices for the shader path: positions as normalized int16 inside the model's bounding box and normals
+# octahedral-encoded into two normalized int16, against 24 bytes of float32. The vertex shader dequantizes them.
+
+import numpy as np
+
+SNORM16 = 32767
+COMPACT_COMPONENTS = 6  # int16 x, y, z, padding, then the two octahedral normal components
+COMPACT_STRIDE = COMPACT_COMPONENTS * np.dtype(np.int16).itemsize
+NORMAL_OFFSET = 4 * np.dtype(np.int16).itemsize  # Keeps the normal attribute 4-byte aligned
+
+
+class CompactVertices:
+    def __init__(self, data, offset, scale, position_error, normal_error, float_bytes):
+        self.data = data  # (N * 6,) int16
+        # Position = offset + scale * (int16 / 32767), the model's box centre and half extent
+        self.offset = offset
+        self.scale = scale
+        self.position_error = position_error  # Largest per-axis position error, in model units
+        self.normal_error = normal_error  # Largest normal direction error, in degrees
+        self.float_bytes = float_bytes
+
+    @property
+    def compact_bytes(self):
+        return self.data.nbytes
+
+
+def snorm16(values):
+    return np.clip(np.round(values * SNORM16), -SNORM16, SNORM16).astype(np.int16)
+
+
+def from_snorm16(values):
+    return np.maximum(values.astype(np.float32) / SNORM16, -1.0)
+
+
+def octahedral_encode(normals):
+    # (N, 3) unit vectors to (N, 2) in [-1, 1]: project onto the octahedron |x| + |y| + |z| = 1 and
+    # fold the lower half over the upper one
+    normals = np.asarray(normals, dtype=np.float32)
+    length = np.abs(normals).sum(axis=1, keepdims=True)
+    projected = normals[:, :2] / np.where(length > 0, length, 1.0)
+    lower = normals[:, 2] < 0
+    folded = (1.0 - np.abs(projected[:, ::-1])) * np.where(projected >= 0, 1.0, -1.0)
+    projected[lower] = folded[lower]
+    return projected
+
+
+def octahedral_decode(encoded):
+    # Inverse of octahedral_encode, as the compact vertex shader does it
+    normals = np.empty((len(encoded), 3), dtype=np.float32)
+    normals[:, :2] = encoded
+    normals[:, 2] = 1.0 - np.abs(encoded).sum(axis=1)
+    fold = np.maximum(-normals[:, 2], 0.0)[:, None]
+    normals[:, :2] -= np.where(normals[:, :2] >= 0, fold, -fold)
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(length > 0, length, 1.0)
+
+
+def quantization_bounds(positions):
+    # (offset, scale) mapping the box of positions onto [-1, 1]; flat axes keep a scale of 1
+    low = positions.min(axis=0) if len(positions) else np.zeros(3, dtype=np.float32)
+    high = positions.max(axis=0) if len(positions) else np.zeros(3, dtype=np.float32)
+    offset = ((low + high) / 2).astype(np.float32)
+    scale = ((high - low) / 2).astype(np.float32)
+    return offset, np.where(scale > 0, scale, 1.0).astype(np.float32)
+
+
+def compact_vertices(vertex_data, bounds=None):
+    # vertex_data is float32 position/normal, six per vertex. bounds is (offset, scale) from
+    # quantization_bounds, so LOD levels can share the full model's.
+    vertices = np.asarray(vertex_data, dtype=np.float32).reshape(-1, 6)
+    positions = vertices[:, :3]
+    normals = vertices[:, 3:]
+    offset, scale = bounds if bounds is not None else quantization_bounds(positions)
+
+    data = np.zeros((len(vertices), COMPACT_COMPONENTS), dtype=np.int16)
+    data[:, :3] = snorm16((positions - offset) / scale)
+    data[:, 4:] = snorm16(octahedral_encode(normals))
+
+    position_error = 0.0
+    normal_error = 0.0
+    if len(vertices):
+        decoded = offset + scale * from_snorm16(data[:, :3])
+        position_error = float(np.abs(decoded - positions).max())
+        lengths = np.linalg.norm(normals, axis=1)
+        unit = lengths > 0
+        cosines = np.einsum('ij,ij->i', octahedral_decode(from_snorm16(data[unit, 4:])), normals[unit] / lengths[unit, None])
+        if len(cosines):
+            normal_error = float(np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)).max()))
+    return CompactVertices(data.ravel(), offset, scale, position_error, normal_error, vertices.nbytes)